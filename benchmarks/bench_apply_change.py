@@ -0,0 +1,133 @@
+"""Measure the cost of applyChange(), for:
+
+- the test cases from test-common/apply-change-test-data.json, many times over
+- the final change of a drag: many "=xy" changes to the path of a glyph, and
+  the same as a single "=xys" change per layer
+- many "=" changes to the advance widths of the sources of a glyph
+
+Usage: python benchmarks/bench_apply_change.py
+"""
+
+import json
+import pathlib
+import timeit
+from copy import deepcopy
+
+from fontra.core.changes import applyChange
+from fontra.core.classes import Font, Layer, Source, StaticGlyph, VariableGlyph
+from fontra.core.packedpath import PackedPath
+
+repoRoot = pathlib.Path(__file__).resolve().parent.parent
+testDataPath = repoRoot / "test-common" / "apply-change-test-data.json"
+
+
+def makeFont(numLayers, numPoints):
+    layers = {
+        f"layer{i}": Layer(
+            glyph=StaticGlyph(
+                path=PackedPath.fromUnpackedContours(
+                    [
+                        dict(
+                            points=[dict(x=j, y=j) for j in range(numPoints)],
+                            isClosed=True,
+                        )
+                    ]
+                )
+            )
+        )
+        for i in range(numLayers)
+    }
+    sources = [Source(name=name, layerName=name) for name in layers]
+    glyph = VariableGlyph(name="A", sources=sources, layers=layers)
+    return Font(glyphs={"A": glyph})
+
+
+def makeDragChange(numLayers, numPoints):
+    return {
+        "p": ["glyphs", "A", "layers"],
+        "c": [
+            {
+                "p": [f"layer{i}", "glyph", "path"],
+                "f": "=xy",
+                "a": [j, j + 10, j + 20],
+            }
+            for i in range(numLayers)
+            for j in range(numPoints)
+        ],
+    }
+
+
+def makeMultiplePointsDragChange(numLayers, pointIndices):
+    return {
+        "p": ["glyphs", "A", "layers"],
+        "c": [
+            {
+                "p": [f"layer{i}", "glyph", "path"],
+                "f": "=xys",
+                "a": [
+                    pointIndices,
+                    [c for j in pointIndices for c in (j + 10, j + 20)],
+                ],
+            }
+            for i in range(numLayers)
+        ],
+    }
+
+
+def makeAdvanceChange(numLayers):
+    return {
+        "p": ["glyphs", "A"],
+        "c": [
+            {
+                "p": ["layers", f"layer{i}", "glyph"],
+                "f": "=",
+                "a": ["xAdvance", 500 + i],
+            }
+            for i in range(numLayers)
+        ],
+    }
+
+
+def timeApplyChanges(subjectsAndChanges):
+    start = timeit.default_timer()
+    for subject, change in subjectsAndChanges:
+        applyChange(subject, change)
+    return timeit.default_timer() - start
+
+
+def main():
+    testData = json.loads(testDataPath.read_text(encoding="utf-8"))
+    repeat = 20000
+    corpus = [
+        (deepcopy(testData["inputData"][testCase["inputDataName"]]), testCase["change"])
+        for i in range(repeat)
+        for testCase in testData["tests"]
+    ]
+    t = timeApplyChanges(corpus)
+    print(
+        f"test data x {repeat}: {t * 1e3:.1f}ms, {t / len(corpus) * 1e6:.2f}us/change"
+    )
+
+    numLayers, numPoints = 12, 400
+    font = makeFont(numLayers, numPoints)
+    number = 20
+    t = timeApplyChanges([(font, makeDragChange(numLayers, numPoints))] * number)
+    t /= number * numLayers * numPoints
+    print(f"drag, {numLayers * numPoints} x '=xy': {t * 1e6:.2f}us/point")
+
+    for label, pointIndices in [
+        ("all points", list(range(numPoints))),
+        ("every other point", list(range(0, numPoints, 2))),
+    ]:
+        change = makeMultiplePointsDragChange(numLayers, pointIndices)
+        t = timeApplyChanges([(font, change)] * number)
+        t /= number * numLayers * len(pointIndices)
+        print(f"drag, {numLayers} x '=xys', {label}: {t * 1e6:.2f}us/point")
+
+    t = timeApplyChanges([(font, makeAdvanceChange(numLayers))] * 1000)
+    t /= 1000 * numLayers
+    print(f"advance widths, {numLayers} x '=': {t * 1e6:.2f}us/change")
+
+
+if __name__ == "__main__":
+    main()
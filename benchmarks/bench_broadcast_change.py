@@ -0,0 +1,104 @@
+"""Measure the cost of routing a live change to the subscribed connections,
+for different numbers of connections.
+
+Each connection subscribes to live changes for a handful of glyphs. The change
+is made to a glyph that only a few connections subscribe to, which is the
+common case when many clients are connected. For reference, the linear scan over
+all connections that FontHandler used to do is measured as well.
+
+Usage: python benchmarks/bench_broadcast_change.py
+"""
+
+import asyncio
+import random
+import timeit
+from contextlib import ExitStack
+
+from fontra.core.changes import matchChangePattern
+from fontra.core.fonthandler import LIVE_CHANGES_PATTERN_KEY, FontHandler
+
+numGlyphs = 2000
+numGlyphsPerConnection = 20
+numSubscribersOfEditedGlyph = 3
+
+
+class DummyBackend:
+    pass
+
+
+class DummyProxy:
+    async def externalChange(self, change):
+        pass
+
+
+class DummyConnection:
+    def __init__(self, clientUUID):
+        self.clientUUID = clientUUID
+        self.proxy = self.droppableProxy = DummyProxy()
+
+
+async def setupFontHandler(numConnections, exitStack):
+    rng = random.Random(numConnections)
+    fontHandler = FontHandler(DummyBackend())
+    connections = []
+    for i in range(numConnections):
+        connection = DummyConnection(f"client-{i}")
+        exitStack.enter_context(fontHandler.useConnection(connection))
+        glyphNames = [
+            f"glyph{rng.randrange(1, numGlyphs)}" for j in range(numGlyphsPerConnection)
+        ]
+        if i < numSubscribersOfEditedGlyph:
+            glyphNames.append("glyph0")
+        for glyphName in glyphNames:
+            await fontHandler.subscribeChanges(
+                ["glyphs", glyphName], True, connection=connection
+            )
+        connections.append(connection)
+    return fontHandler, connections
+
+
+def linearScan(fontHandler, connections, change, sourceConnection):
+    index = fontHandler._matchPatternIndexes[LIVE_CHANGES_PATTERN_KEY]
+    return [
+        connection
+        for connection in connections
+        if connection != sourceConnection
+        and matchChangePattern(change, index.getPattern(connection.clientUUID))
+    ]
+
+
+async def benchmark(numConnections, change, number=2000):
+    with ExitStack() as exitStack:
+        fontHandler, connections = await setupFontHandler(numConnections, exitStack)
+        sourceConnection = connections[0]
+
+        start = timeit.default_timer()
+        for i in range(number):
+            await fontHandler.broadcastChange(change, sourceConnection, True)
+        broadcastTime = (timeit.default_timer() - start) / number
+
+        scanTime = timeit.timeit(
+            lambda: linearScan(fontHandler, connections, change, sourceConnection),
+            number=number,
+        )
+        scanTime /= number
+
+    print(
+        f"{numConnections:>12} {broadcastTime * 1e6:>14.1f}us "
+        f"{scanTime * 1e6:>10.1f}us"
+    )
+
+
+async def main():
+    change = {
+        "p": ["glyphs", "glyph0", "layers", "default", "glyph", "path"],
+        "f": "=xy",
+        "a": [0, 100, 200],
+    }
+    print(f"{'connections':>12} {'broadcastChange':>16} {'linear scan':>12}")
+    for numConnections in [1, 50, 500]:
+        await benchmark(numConnections, change)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
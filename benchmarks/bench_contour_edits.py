@@ -0,0 +1,78 @@
+"""Measure the cost of inserting and deleting points and contours in a
+PackedPath with many contours, such as a traced or CJK glyph, and the cost of
+reading the contours back afterwards.
+
+The edits are done near the start of the path, as that is the worst case when
+the end points of all following contours need to be updated.
+
+Usage: python benchmarks/bench_contour_edits.py
+"""
+
+import random
+import timeit
+
+from fontra.core.packedpath import PackedPath, packedPathToDict
+
+
+def makePath(numContours, numPointsPerContour):
+    return PackedPath.fromUnpackedContours(
+        [
+            dict(
+                points=[
+                    dict(x=i * 10 + j, y=j * 10) for j in range(numPointsPerContour)
+                ],
+                isClosed=True,
+            )
+            for i in range(numContours)
+        ]
+    )
+
+
+def insertAndDeletePoints(path, contourIndices):
+    for contourIndex in contourIndices:
+        path.insertPoint(contourIndex, 1, dict(x=5, y=5))
+    for contourIndex in reversed(contourIndices):
+        path.deletePoint(contourIndex, 1)
+
+
+def insertAndDeleteContours(path, contourIndices):
+    contour = dict(coordinates=[0, 0, 10, 0, 10, 10], pointTypes=[0, 0, 0])
+    contour["isClosed"] = True
+    for contourIndex in contourIndices:
+        path.insertContour(contourIndex, contour)
+    for contourIndex in reversed(contourIndices):
+        path.deleteContour(contourIndex)
+
+
+def timeIt(func, repeat=5):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    rng = random.Random(0)
+    numEdits = 500
+    for numContours in [200, 2000, 10000]:
+        path = makePath(numContours, 12)
+        expectedPath = makePath(numContours, 12)
+        sameContour = [3] * numEdits
+        randomContours = [rng.randrange(10) for i in range(numEdits)]
+        for label, func, contourIndices in [
+            ("points, same contour", insertAndDeletePoints, sameContour),
+            ("points, random contours", insertAndDeletePoints, randomContours),
+            ("contours", insertAndDeleteContours, randomContours),
+        ]:
+            t = timeIt(lambda: func(path, contourIndices))
+            t /= 2 * numEdits
+            print(f"{numContours:6} contours, {label:>24}: {t * 1e6:7.2f}us/edit")
+        # The edits are undone: the path must be the same as before
+        assert packedPathToDict(path) == packedPathToDict(expectedPath)
+
+        path.insertPoint(3, 1, dict(x=5, y=5))
+        t = timeIt(lambda: packedPathToDict(path), repeat=1)
+        print(
+            f"{numContours:6} contours, {'first read after edit':>24}: {t * 1e6:7.2f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Measure the memory used by the paths of a large font: PackedPath, which
+stores the coordinates and point types in arrays, compared to the same data in
+lists, as PackedPath used to store it.
+
+By default a synthetic font is used. Alternatively, pass the path of a font
+that Fontra can read, to measure the paths of all its glyphs.
+
+Usage: python benchmarks/bench_packedpath_memory.py [font]
+"""
+
+import asyncio
+import random
+import sys
+import tracemalloc
+
+from fontra.core.packedpath import ContourInfo, PackedPath, PointType
+
+
+def makeSyntheticPaths(numGlyphs, numLayers, numPoints):
+    rng = random.Random(0)
+    pointTypes = [PointType.ON_CURVE, PointType.OFF_CURVE_CUBIC] * (numPoints // 2)
+    paths = []
+    for i in range(numGlyphs * numLayers):
+        coordinates = [rng.randint(-200, 1200) for j in range(numPoints * 2)]
+        paths.append(
+            PackedPath(
+                coordinates,
+                pointTypes,
+                [ContourInfo(endPoint=numPoints - 1, isClosed=True)],
+            )
+        )
+    return paths
+
+
+async def loadFontPaths(fontPath):
+    from fontra.filesystem.projectmanager import getFileSystemBackend
+
+    backend = getFileSystemBackend(fontPath)
+    try:
+        glyphMap = await backend.getGlyphMap()
+        paths = []
+        for glyphName in glyphMap:
+            glyph = await backend.getGlyph(glyphName)
+            paths.extend(layer.glyph.path for layer in glyph.layers.values())
+    finally:
+        backend.close()
+    return paths
+
+
+def asListPath(path):
+    # The coordinates as they come from the font file, and the point types as
+    # enum values, as PackedPathPointPen used to produce them
+    return dict(
+        coordinates=[int(c) if c.is_integer() else c for c in path.coordinates],
+        pointTypes=[PointType(pointType) for pointType in path.pointTypes],
+        contourInfo=path.contourInfo,
+    )
+
+
+def asArrayPath(path):
+    return PackedPath(path.coordinates[:], path.pointTypes[:], path.contourInfo)
+
+
+def measure(paths, convert):
+    tracemalloc.start()
+    converted = [convert(path) for path in paths]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del converted
+    return size
+
+
+def main():
+    if len(sys.argv) > 1:
+        paths = asyncio.run(loadFontPaths(sys.argv[1]))
+    else:
+        paths = makeSyntheticPaths(numGlyphs=5000, numLayers=4, numPoints=80)
+    numPoints = sum(len(path.pointTypes) for path in paths)
+    print(f"{len(paths)} paths, {numPoints} points")
+    for name, convert in [("lists", asListPath), ("arrays", asArrayPath)]:
+        size = measure(paths, convert)
+        print(
+            f"{name:>8}: {size / 1024 / 1024:8.1f}MB, "
+            f"{size / max(numPoints, 1):5.1f} bytes/point"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Measure the cost of building PackedPath objects with PackedPathPointPen, for
+the glyphs of the MutatorSans test font, repeated until there are 10,000 of
+them.
+
+Compared are the current pen and the pen as it used to be, which collected the
+points of a contour in a list of tuples and built the point types in a second
+pass. Both are timed on their own, by replaying recorded point pen calls, and
+as part of parsing the GLIF data. The replay times include the cost of the
+replay itself, which is measured separately with a pen that does nothing.
+
+Usage: python benchmarks/bench_point_pen.py [numGlyphs]
+"""
+
+import pathlib
+import sys
+import timeit
+from array import array
+
+from fontTools.pens.recordingPen import RecordingPointPen
+from fontTools.ufoLib.glifLib import readGlyphFromString
+
+from fontra.core.packedpath import (
+    ContourInfo,
+    PackedPath,
+    PackedPathPointPen,
+    PointType,
+)
+
+repoRoot = pathlib.Path(__file__).resolve().parent.parent
+mutatorSansDir = repoRoot / "test-py" / "data" / "mutatorsans"
+
+
+class PreviousPackedPathPointPen:
+    def __init__(self):
+        self.coordinates = []
+        self.pointTypes = []
+        self.contourInfo = []
+        self.components = []
+        self._currentContour = None
+
+    def getPath(self):
+        return PackedPath(
+            array("d", self.coordinates),
+            array("B", self.pointTypes),
+            self.contourInfo,
+        )
+
+    def beginPath(self, **kwargs):
+        self._currentContour = []
+
+    def addPoint(self, pt, segmentType=None, smooth=False, *args, **kwargs):
+        self._currentContour.append((pt, segmentType, smooth))
+
+    def endPath(self):
+        if not self._currentContour:
+            return
+        isClosed = self._currentContour[0][1] != "move"
+        isQuadBlob = all(
+            segmentType is None for _, segmentType, _ in self._currentContour
+        )
+        if isQuadBlob:
+            self.pointTypes.extend(
+                [PointType.OFF_CURVE_QUAD] * len(self._currentContour)
+            )
+            for pt, _, _ in self._currentContour:
+                self.coordinates.extend(pt)
+        else:
+            pointTypes = []
+            for pt, segmentType, smooth in self._currentContour:
+                if segmentType is None:
+                    pointTypes.append(PointType.OFF_CURVE_CUBIC)
+                elif segmentType in {"move", "line", "curve", "qcurve"}:
+                    pointTypes.append(
+                        PointType.ON_CURVE_SMOOTH if smooth else PointType.ON_CURVE
+                    )
+                else:
+                    raise TypeError(f"unexpected segment type: {segmentType}")
+
+                self.coordinates.extend(pt)
+            for i, (_, segmentType, _) in enumerate(self._currentContour):
+                if segmentType == "qcurve":
+                    stopIndex = i - len(pointTypes) if isClosed else -1
+                    for j in range(i - 1, stopIndex, -1):
+                        if pointTypes[j] != PointType.OFF_CURVE_CUBIC:
+                            break
+                        pointTypes[j] = PointType.OFF_CURVE_QUAD
+            self.pointTypes.extend(pointTypes)
+        self.contourInfo.append(
+            ContourInfo(endPoint=len(self.coordinates) // 2 - 1, isClosed=isClosed)
+        )
+        self._currentContour = None
+
+    def addComponent(self, glyphName, transformation, **kwargs):
+        pass
+
+
+class NullPointPen:
+    def beginPath(self, **kwargs):
+        pass
+
+    def addPoint(self, pt, segmentType=None, smooth=False, *args, **kwargs):
+        pass
+
+    def endPath(self):
+        pass
+
+    def addComponent(self, glyphName, transformation, **kwargs):
+        pass
+
+    def getPath(self):
+        return None
+
+
+class GlyphObject:
+    pass
+
+
+def loadGLIFData(numGlyphs):
+    glifPaths = sorted(mutatorSansDir.glob("*.ufo/glyphs*/*.glif"))
+    glifData = [path.read_bytes() for path in glifPaths]
+    return [glifData[i % len(glifData)] for i in range(numGlyphs)]
+
+
+def recordPointPenCalls(glifData):
+    recordings = []
+    for data in glifData:
+        pen = RecordingPointPen()
+        readGlyphFromString(data, GlyphObject(), pen)
+        recordings.append(pen)
+    return recordings
+
+
+def replay(recordings, penClass):
+    paths = []
+    for recording in recordings:
+        pen = penClass()
+        recording.replay(pen)
+        paths.append(pen.getPath())
+    return paths
+
+
+def parse(glifData, penClass):
+    paths = []
+    for data in glifData:
+        pen = penClass()
+        readGlyphFromString(data, GlyphObject(), pen)
+        paths.append(pen.getPath())
+    return paths
+
+
+def timeIt(func, repeat=10):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    numGlyphs = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    glifData = loadGLIFData(numGlyphs)
+    recordings = recordPointPenCalls(glifData)
+    numPoints = sum(
+        len(path.pointTypes) for path in replay(recordings, PackedPathPointPen)
+    )
+    print(f"{numGlyphs} glyphs, {numPoints} points")
+
+    assert replay(recordings, PackedPathPointPen) == replay(
+        recordings, PreviousPackedPathPointPen
+    )
+
+    replayTime = timeIt(lambda: replay(recordings, NullPointPen))
+    print(f"{'replay only':>26}: {replayTime * 1e3:7.1f}ms")
+    for penClass in [PreviousPackedPathPointPen, PackedPathPointPen]:
+        name = penClass.__name__
+        t = timeIt(lambda: replay(recordings, penClass)) - replayTime
+        print(f"{name:>26}: {t * 1e3:7.1f}ms, {t / numPoints * 1e9:5.0f}ns/point")
+    for penClass in [PreviousPackedPathPointPen, PackedPathPointPen]:
+        name = penClass.__name__
+        t = timeIt(lambda: parse(glifData, penClass))
+        print(f"{name:>26}: {t * 1e3:7.1f}ms, parsing GLIF included")
+
+
+if __name__ == "__main__":
+    main()
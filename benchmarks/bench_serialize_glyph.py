@@ -0,0 +1,91 @@
+"""Measure the cost of encoding a getGlyph() return value as JSON, for glyphs
+of different sizes.
+
+Compared are the way remote.py used to do it (dataclasses.asdict() followed by
+json.dumps()), and encodeJSON(), both with json and, if it is installed, with
+orjson, and with the binary path encoding that clients can ask for. The size
+of the encoded message is printed as well.
+
+Usage: python benchmarks/bench_serialize_glyph.py
+"""
+
+import json
+import timeit
+from array import array
+from dataclasses import asdict
+from functools import partial
+
+from fontra.core import remote
+from fontra.core.classes import Layer, Source, StaticGlyph, VariableGlyph
+from fontra.core.packedpath import PackedPath
+
+
+def makeGlyph(numSources, numContours, numPointsPerContour):
+    contours = [
+        dict(
+            points=[
+                dict(x=i * 10, y=j * 10, type="cubic" if j % 3 else None)
+                for j in range(numPointsPerContour)
+            ],
+            isClosed=True,
+        )
+        for i in range(numContours)
+    ]
+    sources = []
+    layers = {}
+    for i in range(numSources):
+        layerName = f"layer{i}"
+        sources.append(
+            Source(name=f"source{i}", layerName=layerName, location={"wght": i})
+        )
+        layers[layerName] = Layer(
+            glyph=StaticGlyph(
+                path=PackedPath.fromUnpackedContours(contours), xAdvance=500
+            )
+        )
+    return VariableGlyph(name="glyph", sources=sources, layers=layers)
+
+
+def encodeWithAsdict(glyph):
+    return json.dumps(
+        {"client-call-id": 0, "return-value": asdict(glyph)},
+        separators=(",", ":"),
+        default=array.tolist,
+    )
+
+
+def makeEncodeFunc(encodeJSON):
+    return lambda glyph: encodeJSON({"client-call-id": 0, "return-value": glyph})
+
+
+def main():
+    encodeFuncs = {
+        "asdict+json": encodeWithAsdict,
+        "encodeJSON json": makeEncodeFunc(remote._encodeJSONWithJSON),
+    }
+    if remote.orjson is not None:
+        encodeFuncs["encodeJSON orjson"] = makeEncodeFunc(remote._encodeJSONWithOrjson)
+    encodeFuncs["binary paths"] = makeEncodeFunc(
+        partial(remote.encodeJSON, binaryPaths=True)
+    )
+
+    print(f"{'points':>8}" + "".join(f"{name:>20}" for name in encodeFuncs))
+    for numSources, numContours, numPointsPerContour in [
+        (2, 2, 20),
+        (4, 10, 50),
+        (16, 20, 100),
+    ]:
+        glyph = makeGlyph(numSources, numContours, numPointsPerContour)
+        numPoints = numSources * numContours * numPointsPerContour
+        number = max(1, 200_000 // numPoints)
+        times = [
+            timeit.timeit(lambda: encodeFunc(glyph), number=number) / number
+            for encodeFunc in encodeFuncs.values()
+        ]
+        sizes = [len(encodeFunc(glyph)) for encodeFunc in encodeFuncs.values()]
+        print(f"{numPoints:>8}" + "".join(f"{t * 1e6:>18.1f}us" for t in times))
+        print(f"{'':>8}" + "".join(f"{size / 1024:>18.1f}KB" for size in sizes))
+
+
+if __name__ == "__main__":
+    main()
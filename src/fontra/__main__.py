@@ -4,7 +4,11 @@ import secrets
 from importlib.metadata import entry_points
 
 from . import __version__ as fontraVersion
-from .core.server import FontraServer, findFreeTCPPort
+from .core.server import (
+    DEFAULT_WEBSOCKET_COMPRESSION_THRESHOLD,
+    FontraServer,
+    findFreeTCPPort,
+)
 
 DEFAULT_PORT = 8000
 
@@ -23,6 +27,18 @@ def main():
     parser.add_argument(
         "--launch", action="store_true", help="Launch the default browser"
     )
+    parser.add_argument(
+        "--websocket-compression",
+        action="store_true",
+        help="Compress websocket messages, if the browser supports it",
+    )
+    parser.add_argument(
+        "--websocket-compression-threshold",
+        type=int,
+        default=DEFAULT_WEBSOCKET_COMPRESSION_THRESHOLD,
+        help="Don't compress websocket messages smaller than this many bytes "
+        f"(default: {DEFAULT_WEBSOCKET_COMPRESSION_THRESHOLD})",
+    )
     parser.add_argument(
         "-V",
         "--version",
@@ -53,6 +69,8 @@ def main():
         projectManager=manager,
         launchWebBrowser=args.launch,
         versionToken=secrets.token_hex(4),
+        websocketCompression=args.websocket_compression,
+        websocketCompressionThreshold=args.websocket_compression_threshold,
     )
     server.setup()
     server.run()
@@ -2,19 +2,20 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import math
 import os
 import pathlib
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from copy import copy
 from dataclasses import asdict, dataclass
 from datetime import datetime
-from functools import cache, cached_property
+from functools import cache, cached_property, partial
 from types import SimpleNamespace
 
 import watchfiles
 from fontTools.designspaceLib import DesignSpaceDocument
-from fontTools.misc.transform import Transform
 from fontTools.pens.recordingPen import RecordingPointPen
 from fontTools.ufoLib import UFOReaderWriter
 from fontTools.ufoLib.glifLib import GlyphSet
@@ -29,9 +30,10 @@ from ..core.classes import (
     StaticGlyph,
     Transformation,
     VariableGlyph,
+    makeAffineTransform,
 )
 from ..core.packedpath import PackedPathPointPen
-from .ufo_utils import extractGlyphNameAndUnicodes
+from .ufo_utils import extractComponentNames, extractGlyphNameAndUnicodes
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +41,8 @@ logger = logging.getLogger(__name__)
 VARIABLE_COMPONENTS_LIB_KEY = "com.black-foundry.variable-components"
 GLYPH_DESIGNSPACE_LIB_KEY = "com.black-foundry.glyph-designspace"
 
+DEFAULT_IO_MAX_WORKERS = 4
+
 
 infoAttrsToCopy = [
     "unitsPerEm",
@@ -53,6 +57,9 @@ infoAttrsToCopy = [
 
 
 class DesignspaceBackend:
+    # The maximum number of threads used for reading and writing UFO data
+    ioMaxWorkers = DEFAULT_IO_MAX_WORKERS
+
     @classmethod
     def fromPath(cls, path):
         return cls(DesignSpaceDocument.fromfile(path))
@@ -92,9 +99,33 @@ class DesignspaceBackend:
             self.dsSources.findItem(isDefault=True).layer.glyphSet
         )
         self.savedGlyphModificationTimes = {}
+        self._deferredContentsWrites = None
+        self._ioExecutor = None
+        # Glyph sets are read, and written or rebuilt, in executor threads
+        self._glyphSetLock = ReadWriteLock()
 
     def close(self):
-        pass
+        if self._ioExecutor is not None:
+            self._ioExecutor.shutdown(wait=True)
+            self._ioExecutor = None
+
+    async def aclose(self):
+        # Like close(), but wait for the running I/O without blocking the
+        # event loop
+        executor, self._ioExecutor = self._ioExecutor, None
+        if executor is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, partial(executor.shutdown, wait=True))
+
+    async def _runInExecutor(self, func, *args):
+        # Run blocking file I/O in a thread, so the event loop stays responsive
+        if self._ioExecutor is None:
+            self._ioExecutor = ThreadPoolExecutor(
+                max_workers=self.ioMaxWorkers,
+                thread_name_prefix="fontra-designspace-io",
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._ioExecutor, partial(func, *args))
 
     @property
     def defaultDSSource(self):
@@ -157,18 +188,62 @@ class DesignspaceBackend:
         self.glifFileNames = glifFileNames
 
     def updateGlyphSetContents(self, glyphSet):
+        if self._deferredContentsWrites is not None:
+            # We're writing a batch of glyphs, write contents.plist once
+            # at the end
+            self._deferredContentsWrites[glyphSet] = None
+            return
         glyphSet.writeContents()
         glifFileNames = self.glifFileNames
         for glyphName, fileName in glyphSet.contents.items():
             glifFileNames[fileName] = glyphName
 
+    def writeLayerContents(self, reader):
+        if self._deferredContentsWrites is not None:
+            # We're writing a batch of glyphs, write layercontents.plist once
+            # at the end
+            self._deferredContentsWrites[reader] = None
+            return
+        reader.writeLayerContents()
+
+    @contextmanager
+    def _deferContentsWrites(self):
+        # Within this context, updateGlyphSetContents() and writeLayerContents()
+        # only record what needs writing, and the contents.plist and
+        # layercontents.plist files are written once when it exits, instead of
+        # once per new or deleted glyph. Until then, the new .glif files are on
+        # disk but not listed in contents.plist: glyph set reads and rebuilds
+        # must wait for the batch, see _glyphSetLock.
+        assert self._deferredContentsWrites is None
+        self._deferredContentsWrites = {}
+        try:
+            yield
+        finally:
+            deferredWrites = self._deferredContentsWrites
+            self._deferredContentsWrites = None
+            # Write layercontents.plist files first: new layers are new
+            # glyph sets
+            for item in deferredWrites:
+                if isinstance(item, UFOReaderWriter):
+                    self.writeLayerContents(item)
+            for item in deferredWrites:
+                if isinstance(item, GlyphSet):
+                    self.updateGlyphSetContents(item)
+
     async def getGlyphMap(self):
         return dict(self.glyphMap)
 
     async def getGlyph(self, glyphName):
         if glyphName not in self.glyphMap:
             return None
+        return await self._runInExecutor(self._readGlyph, glyphName)
 
+    def _readGlyph(self, glyphName):
+        # Don't read while a writer thread is changing the glyph sets
+        with self._glyphSetLock.reading():
+            return self._readGlyphLocked(glyphName)
+
+    def _readGlyphLocked(self, glyphName):
         glyph = VariableGlyph(glyphName)
 
         sources = []
@@ -197,6 +272,68 @@ class DesignspaceBackend:
 
         return glyph
 
+    async def getGlyphValidationKey(self, glyphName):
+        # The key changes whenever the .glif files that contribute to the glyph
+        # change, or when the global sources change. It is used to validate
+        # persistent glyph cache entries.
+        if glyphName not in self.glyphMap:
+            return None
+        return await self._runInExecutor(self._getGlyphValidationKey, glyphName)
+
+    def _getGlyphValidationKey(self, glyphName):
+        with self._glyphSetLock.reading():
+            return self._getGlyphValidationKeyLocked(glyphName)
+
+    def _getGlyphValidationKeyLocked(self, glyphName):
+        sourcesKey = [
+            [dsSource.name, dsSource.layer.fontraLayerName, dsSource.locationTuple]
+            for dsSource in self.dsSources
+        ]
+        layersKey = [
+            [
+                ufoLayer.fontraLayerName,
+                ufoLayer.glyphSet.contents[glyphName],
+                ufoLayer.glyphSet.getGLIFModificationTime(glyphName),
+            ]
+            for ufoLayer in self.ufoLayers
+            if glyphName in ufoLayer.glyphSet
+        ]
+        return [sourcesKey, layersKey]
+
+    async def getComponentGraph(self, glyphNames=None):
+        # Return a {glyphName: componentNames} dict for all composite glyphs,
+        # or for the composite glyphs among glyphNames, taking all layers into
+        # account. This does a quick scan of the .glif data instead of fully
+        # parsing it.
+        return await self._runInExecutor(self._scanComponentGraph, glyphNames)
+
+    def _scanComponentGraph(self, glyphNames):
+        componentGraph = defaultdict(set)
+        # This scans the whole font: take the lock for each read only, so
+        # writes don't have to wait for the scan to finish
+        with self._glyphSetLock.reading():
+            glyphSets = list(self.ufoLayers.iterAttrs("glyphSet"))
+        for glyphSet in glyphSets:
+            with self._glyphSetLock.reading():
+                layerGlyphNames = (
+                    list(glyphSet.keys())
+                    if glyphNames is None
+                    else [
+                        glyphName for glyphName in glyphNames if glyphName in glyphSet
+                    ]
+                )
+            for glyphName in layerGlyphNames:
+                try:
+                    with self._glyphSetLock.reading():
+                        glifData = glyphSet.getGLIF(glyphName)
+                except KeyError:
+                    # The glyph was deleted in the meantime
+                    continue
+                componentNames = extractComponentNames(glifData)
+                if componentNames:
+                    componentGraph[glyphName].update(componentNames)
+        return dict(componentGraph)
+
     def _unpackLocalDesignSpace(self, dsDict, ufoPath, defaultLayerName):
         axes = [
             LocalAxis(
@@ -228,54 +365,69 @@ class DesignspaceBackend:
             )
         return axes, sources
 
+    async def putGlyphs(self, glyphs):
+        # Write multiple glyphs, given a list of (glyphName, glyph, unicodes)
+        # tuples. contents.plist and layercontents.plist files are written only
+        # once per batch, instead of for every new glyph.
+        await self._runInExecutor(self._writeGlyphs, glyphs)
+
+    def _writeGlyphs(self, glyphs):
+        with self._glyphSetLock.writing(), self._deferContentsWrites():
+            for glyphName, glyph, unicodes in glyphs:
+                self._writeGlyph(glyphName, glyph, unicodes)
+
     async def putGlyph(self, glyphName, glyph, unicodes):
         assert isinstance(unicodes, list)
         assert all(isinstance(cp, int) for cp in unicodes)
-        modTimes = set()
-        self.glyphMap[glyphName] = unicodes
-        layerNameMapping = {}
-        localDS = self._packLocalDesignSpace(glyph)
-        for source in glyph.sources:
-            globalSource = self._getGlobalSource(source, not localDS)
-            if globalSource is not None:
-                layerNameMapping[source.layerName] = globalSource.layerName
-
-        usedLayers = set()
-        for layerName, layer in glyph.layers.items():
-            layerName = layerNameMapping.get(layerName, layerName)
-            glyphSet = self.ufoLayers.findItem(fontraLayerName=layerName).glyphSet
-            usedLayers.add(layerName)
-            writeGlyphSetContents = glyphName not in glyphSet
-            layerGlyph, drawPointsFunc = buildUFOLayerGlyph(
-                glyphSet, glyphName, layer.glyph, unicodes
-            )
-            if glyphSet == self.defaultUFOLayer.glyphSet:
-                if localDS:
-                    layerGlyph.lib[GLYPH_DESIGNSPACE_LIB_KEY] = localDS
-                else:
-                    layerGlyph.lib.pop(GLYPH_DESIGNSPACE_LIB_KEY, None)
-
-            glyphSet.writeGlyph(glyphName, layerGlyph, drawPointsFunc=drawPointsFunc)
-            if writeGlyphSetContents:
-                # FIXME: this is inefficient if we write many glyphs
-                self.updateGlyphSetContents(glyphSet)
+        await self._runInExecutor(self._writeGlyph, glyphName, glyph, unicodes)
+
+    def _writeGlyph(self, glyphName, glyph, unicodes):
+        with self._glyphSetLock.writing():
+            modTimes = set()
+            self.glyphMap[glyphName] = unicodes
+            layerNameMapping = {}
+            localDS = self._packLocalDesignSpace(glyph)
+            for source in glyph.sources:
+                globalSource = self._getGlobalSource(source, not localDS)
+                if globalSource is not None:
+                    layerNameMapping[source.layerName] = globalSource.layerName
+
+            usedLayers = set()
+            for layerName, layer in glyph.layers.items():
+                layerName = layerNameMapping.get(layerName, layerName)
+                glyphSet = self.ufoLayers.findItem(fontraLayerName=layerName).glyphSet
+                usedLayers.add(layerName)
+                writeGlyphSetContents = glyphName not in glyphSet
+                layerGlyph, drawPointsFunc = buildUFOLayerGlyph(
+                    glyphSet, glyphName, layer.glyph, unicodes
+                )
+                if glyphSet == self.defaultUFOLayer.glyphSet:
+                    if localDS:
+                        layerGlyph.lib[GLYPH_DESIGNSPACE_LIB_KEY] = localDS
+                    else:
+                        layerGlyph.lib.pop(GLYPH_DESIGNSPACE_LIB_KEY, None)
+
+                glyphSet.writeGlyph(
+                    glyphName, layerGlyph, drawPointsFunc=drawPointsFunc
+                )
+                if writeGlyphSetContents:
+                    self.updateGlyphSetContents(glyphSet)
 
-            modTimes.add(glyphSet.getGLIFModificationTime(glyphName))
+                modTimes.add(glyphSet.getGLIFModificationTime(glyphName))
 
-        relevantLayerNames = set(
-            layer.fontraLayerName
-            for layer in self.ufoLayers
-            if glyphName in layer.glyphSet
-        )
-        layersToDelete = relevantLayerNames - usedLayers
-        for layerName in layersToDelete:
-            glyphSet = self.ufoLayers.findItem(fontraLayerName=layerName).glyphSet
-            glyphSet.deleteGlyph(glyphName)
-            # FIXME: this is inefficient if we write many glyphs
-            self.updateGlyphSetContents(glyphSet)
-            modTimes.add(None)
+            relevantLayerNames = set(
+                layer.fontraLayerName
+                for layer in self.ufoLayers
+                if glyphName in layer.glyphSet
+            )
+            layersToDelete = relevantLayerNames - usedLayers
+            for layerName in layersToDelete:
+                glyphSet = self.ufoLayers.findItem(fontraLayerName=layerName).glyphSet
+                glyphSet.deleteGlyph(glyphName)
+                self.updateGlyphSetContents(glyphSet)
+                modTimes.add(None)
 
-        self.savedGlyphModificationTimes[glyphName] = modTimes
+            self.savedGlyphModificationTimes[glyphName] = modTimes
 
     def _getGlobalSource(self, source, create=False):
         sourceLocation = {**self.defaultLocation, **source.location}
@@ -300,7 +452,7 @@ class DesignspaceBackend:
                     if value is not None:
                         setattr(info, infoAttr, value)
                 _ = reader.getGlyphSet()  # this creates the default layer
-                reader.writeLayerContents()
+                self.writeLayerContents(reader)
                 ufoLayerName = reader.getDefaultLayerName()
                 assert os.path.isdir(ufoPath)
             else:
@@ -310,7 +462,7 @@ class DesignspaceBackend:
                 # Create the new UFO layer now
                 ufoPath = self.dsDoc.default.path
                 _ = manager.getGlyphSet(ufoPath, ufoLayerName)
-                self.defaultReader.writeLayerContents()
+                self.writeLayerContents(self.defaultReader)
 
             self.dsDoc.addSourceDescriptor(
                 styleName=source.name,
@@ -325,6 +477,8 @@ class DesignspaceBackend:
                 path=ufoPath,
                 name=ufoLayerName,
             )
+            # Instantiate the glyph set before other threads can see the layer
+            _ = ufoLayer.glyphSet
 
             dsSource = DSSource(
                 name=source.name,
@@ -445,11 +599,18 @@ class DesignspaceBackend:
             # TODO: come up with a better solution.
             #
             await asyncio.sleep(0.15)
-            for glyphSet in self.ufoLayers.iterAttrs("glyphSet"):
-                glyphSet.rebuildContents()
+            # A batch of our own writes may still be in progress: wait for it
+            # to finish, including its contents.plist writes, before
+            # rebuilding, so the rebuild doesn't drop the glyphs it adds
+            await self._runInExecutor(self._rebuildGlyphSetContents)
 
         return changedItems
 
+    def _rebuildGlyphSetContents(self):
+        with self._glyphSetLock.writing():
+            for glyphSet in self.ufoLayers.iterAttrs("glyphSet"):
+                glyphSet.rebuildContents()
+
     def _analyzeExternalGlyphChanges(self, change, path, changedItems):
         fileName = os.path.basename(path)
         glyphName = self.glifFileNames.get(fileName)
@@ -725,21 +886,6 @@ def uniqueNameMaker(existingNames=()):
     return makeUniqueName
 
 
-def makeAffineTransform(transformation: Transformation) -> Transform:
-    t = Transform()
-    t = t.translate(
-        transformation.translateX + transformation.tCenterX,
-        transformation.translateY + transformation.tCenterY,
-    )
-    t = t.rotate(transformation.rotation * (math.pi / 180))
-    t = t.scale(transformation.scaleX, transformation.scaleY)
-    t = t.skew(
-        -transformation.skewX * (math.pi / 180), transformation.skewY * (math.pi / 180)
-    )
-    t = t.translate(-transformation.tCenterX, -transformation.tCenterY)
-    return t
-
-
 def cleanAffine(t):
     """Convert any integer float values into ints. This is to prevent glifLib
     from writing float values that can be integers."""
@@ -773,3 +919,58 @@ def isLocationAtPole(location, poles):
         if value not in poles.get(name, ()):
             return False
     return True
+
+
+class ReadWriteLock:
+    """A lock for threads that can be held by many readers at once, or by a
+    single writer. The writer may take the lock again, for reading or writing.
+    Waiting writers go before new readers, so a stream of reads can't hold up
+    writes forever.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._numReaders = 0
+        self._numWaitingWriters = 0
+        self._writer = None
+        self._writerDepth = 0
+
+    @contextmanager
+    def reading(self):
+        if self._writer == threading.get_ident():
+            # The writer is reading
+            yield
+            return
+        with self._condition:
+            while self._writer is not None or self._numWaitingWriters:
+                self._condition.wait()
+            self._numReaders += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._numReaders -= 1
+                if not self._numReaders:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        threadID = threading.get_ident()
+        with self._condition:
+            if self._writer != threadID:
+                self._numWaitingWriters += 1
+                try:
+                    while self._writer is not None or self._numReaders:
+                        self._condition.wait()
+                finally:
+                    self._numWaitingWriters -= 1
+                self._writer = threadID
+            self._writerDepth += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writerDepth -= 1
+                if not self._writerDepth:
+                    self._writer = None
+                    self._condition.notify_all()
@@ -8,6 +8,9 @@ logger = logging.getLogger(__name__)
 
 _glyphNamePat = re.compile(rb'<glyph\s+name\s*=\s*"([^"]+)"')
 _unicodePat = re.compile(rb'<unicode\s+hex\s*=\s*"([^"]+)"')
+_componentBasePat = re.compile(rb'<component\s+[^>]*?base\s*=\s*"([^"]+)"')
+_variableComponentsKey = b"<key>com.black-foundry.variable-components</key>"
+_variableComponentBasePat = re.compile(rb"<key>base</key>\s*<string>([^<]+)</string>")
 
 
 def extractGlyphNameAndUnicodes(data, fileName=None):
@@ -24,3 +27,20 @@ def extractGlyphNameAndUnicodes(data, fileName=None):
             )
     unicodes = [int(u, 16) for u in _unicodePat.findall(data)]
     return glyphName, unicodes
+
+
+def extractComponentNames(data):
+    """Return a list of the base glyph names of all components, including
+    variable components, without fully parsing the .glif data.
+    """
+    componentNames = [m.decode("utf-8") for m in _componentBasePat.findall(data)]
+    startIndex = data.find(_variableComponentsKey)
+    if startIndex >= 0:
+        endIndex = data.find(b"</array>", startIndex)
+        if endIndex < 0:
+            endIndex = len(data)
+        componentNames.extend(
+            m.decode("utf-8")
+            for m in _variableComponentBasePat.findall(data, startIndex, endIndex)
+        )
+    return componentNames
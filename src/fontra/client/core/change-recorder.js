@@ -68,6 +68,15 @@ function getVarPackedPathProxyMethods(subject, changes) {
       );
       subject.setPointPosition(pointIndex, x, y);
     },
+    setPointPositions(pointIndices, coordinates) {
+      changes.addChange("=xys", pointIndices, coordinates);
+      changes.addRollbackChange(
+        "=xys",
+        pointIndices,
+        pointIndices.flatMap((pointIndex) => subject.getPointPosition(pointIndex))
+      );
+      subject.setPointPositions(pointIndices, coordinates);
+    },
   };
 }
 
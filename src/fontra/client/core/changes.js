@@ -241,6 +241,8 @@ const baseChangeFunctions = {
 const changeFunctions = {
   ...baseChangeFunctions,
   "=xy": (path, itemCast, pointIndex, x, y) => path.setPointPosition(pointIndex, x, y),
+  "=xys": (path, itemCast, pointIndices, coordinates) =>
+    path.setPointPositions(pointIndices, coordinates),
   "insertContour": (path, itemCast, contourIndex, contour) =>
     path.insertContour(contourIndex, contour),
   "deleteContour": (path, itemCast, contourIndex) => path.deleteContour(contourIndex),
@@ -290,6 +292,279 @@ export function applyChange(subject, change, subjectClassDef) {
   }
 }
 
+export function squashChanges(changes) {
+  //
+  // Return a single change that has the same effect as applying `changes` in
+  // order, but without the parts that are made redundant by later changes:
+  //
+  // - changes that are overwritten by later "=", "=xy" or "=xys" changes to
+  //   the same targets, or to a parent of them
+  // - an insertion that is undone by a later deletion of the same items
+  //
+  // The changes are assumed to be valid for the subject they are applied to.
+  // The argument values are not copied.
+  //
+  // This is the same as squashChanges() in changes.py
+  //
+  let flatChanges = [];
+  for (const change of changes) {
+    flattenChange(change, [], flatChanges);
+  }
+  while (true) {
+    const numChanges = flatChanges.length;
+    flatChanges = dropOverwrittenChanges(flatChanges);
+    // Dropping insert-delete pairs may make more overwritten changes
+    // droppable, and vice versa
+    flatChanges = dropInsertDeletePairs(flatChanges);
+    if (flatChanges.length === numChanges) {
+      break;
+    }
+  }
+  return buildChange(flatChanges);
+}
+
+// Change functions that replace the values at their targets. See
+// getChangeTargets()
+const overwritingChangeFunctions = new Set(["=", "=xy", "=xys"]);
+
+// Delete function -> [insert function, function to compare the arguments]
+const insertDeletePairs = {
+  "-": [
+    "+",
+    (deleteArgs, insertArgs) =>
+      isIndex(deleteArgs[0]) &&
+      deleteArgs[0] === insertArgs[0] &&
+      (deleteArgs.length > 1 ? deleteArgs[1] : 1) === insertArgs.length - 1,
+  ],
+  "deletePoint": [
+    "insertPoint",
+    (deleteArgs, insertArgs) =>
+      isIndex(deleteArgs[0]) &&
+      isIndex(deleteArgs[1]) &&
+      deleteArgs[0] === insertArgs[0] &&
+      deleteArgs[1] === insertArgs[1],
+  ],
+  "deleteContour": [
+    "insertContour",
+    (deleteArgs, insertArgs) =>
+      isIndex(deleteArgs[0]) && deleteArgs[0] === insertArgs[0],
+  ],
+};
+
+function isIndex(value) {
+  // Negative indices can't be compared, as they depend on the size of the list
+  return Number.isInteger(value) && value >= 0;
+}
+
+function flattenChange(change, prefix, flatChanges) {
+  const path = prefix.concat(change.p || []);
+  if (change.f !== undefined) {
+    flatChanges.push({ p: path, f: change.f, a: change.a || [] });
+  }
+  for (const childChange of change.c || []) {
+    flattenChange(childChange, path, flatChanges);
+  }
+}
+
+const pointTargetKeys = new Map();
+
+function getPointTargetKey(pointIndex) {
+  // Use a unique object per point index, so this can't clash with a real
+  // path element
+  let pointKey = pointTargetKeys.get(pointIndex);
+  if (pointKey === undefined) {
+    pointKey = { pointIndex };
+    pointTargetKeys.set(pointIndex, pointKey);
+  }
+  return pointKey;
+}
+
+function getChangeTargets(flatChange) {
+  // Return the paths of the values that are replaced or modified by a change
+  const path = flatChange.p;
+  const functionName = flatChange.f;
+  if (functionName === "=" || functionName === "d") {
+    return [path.concat([flatChange.a[0]])];
+  } else if (functionName === "=xy") {
+    return [path.concat([getPointTargetKey(flatChange.a[0])])];
+  } else if (functionName === "=xys") {
+    return Array.from(flatChange.a[0], (pointIndex) =>
+      path.concat([getPointTargetKey(pointIndex)])
+    );
+  }
+  return [path];
+}
+
+const OVERWRITTEN = Symbol("overwritten");
+
+function dropOverwrittenChanges(flatChanges) {
+  // Walk the changes backwards, and keep track of the targets that will be
+  // overwritten by a later change, in a tree of nested Maps. A change whose
+  // target is in or below an overwritten target can be dropped. Any other
+  // change to a target above an overwritten target may change what the
+  // target's path refers to, so the targets below it are no longer safe.
+  const overwritten = new Map();
+  const keptChanges = [];
+  for (let i = flatChanges.length - 1; i >= 0; i--) {
+    const flatChange = flatChanges[i];
+    const targets = getChangeTargets(flatChange);
+    if (targets.every((target) => isOverwritten(overwritten, target))) {
+      continue;
+    }
+    keptChanges.push(flatChange);
+    const isOverwrite = overwritingChangeFunctions.has(flatChange.f);
+    for (const target of targets) {
+      if (!target.length) {
+        overwritten.clear();
+      } else {
+        setTreeItem(overwritten, target, isOverwrite ? OVERWRITTEN : undefined);
+      }
+    }
+  }
+  keptChanges.reverse();
+  return keptChanges;
+}
+
+function dropInsertDeletePairs(flatChanges) {
+  const keptChanges = [];
+  for (const flatChange of flatChanges) {
+    const insertInfo = insertDeletePairs[flatChange.f];
+    if (insertInfo !== undefined) {
+      const insertIndex = findMatchingInsert(keptChanges, flatChange, ...insertInfo);
+      if (insertIndex !== undefined) {
+        keptChanges.splice(insertIndex, 1);
+        continue;
+      }
+    }
+    keptChanges.push(flatChange);
+  }
+  return keptChanges;
+}
+
+function findMatchingInsert(flatChanges, deleteChange, insertFunctionName, argsMatch) {
+  // Only the most recent change that involves the object at the path of
+  // `deleteChange` can be the matching insertion: any other change may have
+  // shifted the indices, or may have modified the inserted items.
+  const path = deleteChange.p;
+  for (let index = flatChanges.length - 1; index >= 0; index--) {
+    const otherChange = flatChanges[index];
+    const otherTargets = getChangeTargets(otherChange);
+    if (
+      !otherTargets.some(
+        (otherTarget) =>
+          isPathPrefix(otherTarget, path) || isPathPrefix(path, otherTarget)
+      )
+    ) {
+      continue;
+    }
+    if (
+      otherChange.f === insertFunctionName &&
+      equalPath(otherChange.p, path) &&
+      argsMatch(deleteChange.a, otherChange.a)
+    ) {
+      return index;
+    }
+    return undefined;
+  }
+  return undefined;
+}
+
+function isPathPrefix(prefix, path) {
+  if (prefix.length > path.length) {
+    return false;
+  }
+  for (let i = 0; i < prefix.length; i++) {
+    if (prefix[i] !== path[i]) {
+      return false;
+    }
+  }
+  return true;
+}
+
+function buildChange(flatChanges) {
+  // Group consecutive changes with the same path
+  const changes = [];
+  for (const flatChange of flatChanges) {
+    const functionChange = { f: flatChange.f, a: flatChange.a };
+    const previous = lastItem(changes);
+    if (previous && equalPath(previous.path, flatChange.p)) {
+      previous.children.push(functionChange);
+    } else {
+      changes.push({ path: flatChange.p, children: [functionChange] });
+    }
+  }
+
+  if (!changes.length) {
+    return {};
+  }
+  let commonPrefix;
+  let change;
+  if (changes.length === 1) {
+    commonPrefix = changes[0].path;
+    change = groupedChange(changes[0].children);
+  } else {
+    commonPrefix = commonPathPrefix(changes.map((change) => change.path));
+    const children = changes.map(({ path, children }) => {
+      const childPath = path.slice(commonPrefix.length);
+      const childChange = groupedChange(children);
+      return childPath.length ? { p: childPath, ...childChange } : childChange;
+    });
+    change = { c: children };
+  }
+  return commonPrefix.length ? { p: commonPrefix, ...change } : change;
+}
+
+function groupedChange(children) {
+  return children.length === 1 ? children[0] : { c: children };
+}
+
+function commonPathPrefix(paths) {
+  let prefix = paths[0];
+  for (const path of paths.slice(1)) {
+    let i = 0;
+    while (i < prefix.length && i < path.length && prefix[i] === path[i]) {
+      i++;
+    }
+    prefix = prefix.slice(0, i);
+  }
+  return prefix;
+}
+
+function isOverwritten(tree, target) {
+  let node = tree;
+  for (const element of target) {
+    node = node.get(element);
+    if (node === undefined) {
+      return false;
+    }
+    if (node === OVERWRITTEN) {
+      return true;
+    }
+  }
+  return false;
+}
+
+function setTreeItem(tree, target, value) {
+  // Set the item at `target` to `value`, or remove it if `value` is undefined
+  let node = tree;
+  for (const element of target.slice(0, -1)) {
+    let childNode = node.get(element);
+    if (childNode === undefined) {
+      if (value === undefined) {
+        return;
+      }
+      childNode = new Map();
+      node.set(element, childNode);
+    }
+    node = childNode;
+  }
+  if (value === undefined) {
+    node.delete(lastItem(target));
+  } else {
+    node.set(lastItem(target), value);
+  }
+}
+
 export function matchChangePath(change, matchPath) {
   return matchChangePattern(change, patternFromPath(matchPath));
 }
@@ -4,6 +4,7 @@ import {
   consolidateChanges,
   filterChangePattern,
   matchChangePath,
+  squashChanges,
 } from "./changes.js";
 import { getClassSchema } from "../core/classes.js";
 import { getGlyphMapProxy, makeCharacterMapFromGlyphMap } from "./cmap.js";
@@ -107,46 +108,61 @@ export class FontController {
     // Load all glyphs named in the glyphNames array, as well as
     // all of their dependencies (made-of). Return a promise that
     // will resolve once all requested glyphs have been loaded.
-    // The loading will be done in parallel: this is much faster if
-    // the server supports parallelism (for example fontra-rcjk).
+    // The glyphs that aren't cached yet are fetched with a single
+    // getGlyphs() call, which also returns the glyphs they are made
+    // of, recursively.
     const done = new Set();
-    const loading = new Set();
-
-    let allDoneFunc;
-    let allDonePromise = new Promise((resolve) => {
-      allDoneFunc = resolve;
-    });
-
-    function checkAllDone() {
-      if (!loading.length) {
-        allDoneFunc();
+    let todo = [...new Set(glyphNames)];
+    try {
+      while (todo.length) {
+        todo.forEach((glyphName) => done.add(glyphName));
+        this._fetchGlyphs(
+          todo.filter(
+            (glyphName) =>
+              this.hasGlyph(glyphName) && !this._glyphsPromiseCache.map.has(glyphName)
+          )
+        );
+        await Promise.all(todo.map((glyphName) => this.getGlyph(glyphName)));
+        const subGlyphNames = new Set();
+        for (const glyphName of todo) {
+          for (const subGlyphName of this.glyphMadeOf[glyphName] || []) {
+            if (!done.has(subGlyphName)) {
+              subGlyphNames.add(subGlyphName);
+            }
+          }
+        }
+        todo = [...subGlyphNames];
       }
-    }
-
-    function reportError(error) {
+    } catch (error) {
       console.error(error);
-      allDoneFunc();
     }
+  }
 
-    const loadGlyph = async (glyphName) => {
-      if (done.has(glyphName)) {
-        return;
-      }
-      done.add(glyphName);
-      loading.add(glyphName);
-      await this.getGlyph(glyphName);
-      for (const subGlyphName of this.iterGlyphMadeOf(glyphName)) {
-        loadGlyph(subGlyphName).then(checkAllDone).catch(reportError);
-      }
-      loading.delete(glyphName);
-    };
-
-    glyphNames.forEach((glyphName) =>
-      loadGlyph(glyphName).then(checkAllDone).catch(reportError)
+  _fetchGlyphs(glyphNames) {
+    if (!glyphNames.length) {
+      return;
+    }
+    const glyphsPromise = this.font.getGlyphs(glyphNames, true);
+    glyphsPromise.then(
+      (glyphs) => {
+        // Cache the component glyphs that were sent along
+        for (const [glyphName, glyph] of Object.entries(glyphs)) {
+          if (!this._glyphsPromiseCache.map.has(glyphName)) {
+            this._glyphsPromiseCache.put(
+              glyphName,
+              Promise.resolve(this._makeGlyphController(glyph))
+            );
+          }
+        }
+      },
+      // Errors are reported via the individual glyph promises
+      () => {}
     );
-
-    if (glyphNames.length) {
-      return allDonePromise;
+    for (const glyphName of glyphNames) {
+      this._glyphsPromiseCache.put(
+        glyphName,
+        glyphsPromise.then((glyphs) => this._makeGlyphController(glyphs[glyphName]))
+      );
     }
   }
 
@@ -168,7 +184,10 @@ export class FontController {
   }
 
   async _getGlyph(glyphName) {
-    let glyph = await this.font.getGlyph(glyphName);
+    return this._makeGlyphController(await this.font.getGlyph(glyphName));
+  }
+
+  _makeGlyphController(glyph) {
     if (glyph !== null) {
       glyph = VariableGlyph.fromObject(glyph);
       glyph = new VariableGlyphController(glyph, this.globalAxes);
@@ -552,8 +571,10 @@ class GlyphEditContext {
     if (broadcast) {
       await this.fontController.glyphChanged(this.glyphName);
     }
-    change = consolidateChanges(change, this.baseChangePath);
-    rollback = consolidateChanges(rollback, this.baseChangePath);
+    // The final change and the rollback are stored in the undo stack and may
+    // be stored by the backend, so drop the redundant parts
+    change = squashChanges([consolidateChanges(change, this.baseChangePath)]);
+    rollback = squashChanges([consolidateChanges(rollback, this.baseChangePath)]);
     const error = await this.fontController.font.editFinal(
       change,
       rollback,
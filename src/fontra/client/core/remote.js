@@ -71,6 +71,9 @@ export class RemoteObject {
         this.websocket.onerror = (event) => this._onerror(event);
         const message = {
           "client-uuid": this.clientUUID,
+          // We can decode base64-encoded path coordinates and point types,
+          // see VarPackedPath.fromObject()
+          "path-encoding": "base64",
         };
         this.websocket.send(JSON.stringify(message));
       };
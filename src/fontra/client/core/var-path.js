@@ -29,8 +29,8 @@ export class VarPackedPath {
 
   static fromObject(obj) {
     const path = new VarPackedPath();
-    path.coordinates = VarArray.from(obj.coordinates);
-    path.pointTypes = [...obj.pointTypes];
+    path.coordinates = VarArray.from(decodeArray(obj.coordinates));
+    path.pointTypes = Array.from(decodeArray(obj.pointTypes));
     path.contourInfo = obj.contourInfo.map((item) => {
       return { ...item };
     });
@@ -261,6 +261,17 @@ export class VarPackedPath {
     this.coordinates[pointIndex * 2 + 1] = y;
   }
 
+  setPointPositions(pointIndices, coordinates) {
+    if (coordinates.length !== 2 * pointIndices.length) {
+      throw new Error("the number of coordinates doesn't match the points");
+    }
+    for (let i = 0; i < pointIndices.length; i++) {
+      const coordIndex = pointIndices[i] * 2;
+      this.coordinates[coordIndex] = coordinates[i * 2];
+      this.coordinates[coordIndex + 1] = coordinates[i * 2 + 1];
+    }
+  }
+
   setPointType(pointIndex, type, smooth) {
     this.pointTypes[pointIndex] = packPointType(type, smooth);
   }
@@ -923,6 +934,28 @@ function coordinatesToPoints(coordinates) {
   return points;
 }
 
+const typedArrayClasses = {
+  int16: Int16Array,
+  float32: Float32Array,
+  float64: Float64Array,
+  uint8: Uint8Array,
+};
+
+function decodeArray(array) {
+  // The server may send the coordinates and point types as base64-encoded
+  // little-endian typed arrays: { type: "float32", data: "AAAAAAAAyEI..." }
+  // See packedPathToBinaryDict() in packedpath.py
+  if (Array.isArray(array)) {
+    return array;
+  }
+  const binaryString = atob(array.data);
+  const bytes = new Uint8Array(binaryString.length);
+  for (let i = 0; i < binaryString.length; i++) {
+    bytes[i] = binaryString.charCodeAt(i);
+  }
+  return new typedArrayClasses[array.type](bytes.buffer);
+}
+
 export function joinPaths(pathsIterable) {
   const result = new VarPackedPath();
   for (const path of pathsIterable) {
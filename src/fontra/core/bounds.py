@@ -0,0 +1,120 @@
+from fontTools.misc.arrayTools import calcBounds, unionRect
+from fontTools.pens.boundsPen import BoundsPen, ControlBoundsPen
+from fontTools.pens.pointPen import PointToSegmentPen
+from fontTools.pens.transformPen import TransformPointPen
+
+from .classes import makeAffineTransform
+
+
+def getGlyphBounds(glyphs, glyphName, layerNames=None):
+    """Return the bounds of the layers of `glyphName`, as a
+    {layerName: {"controlBounds": bounds, "bounds": bounds}} dict, for the
+    layers in `layerNames`, or for all layers if `layerNames` is None. Layer
+    names that the glyph doesn't have are skipped. The bounds are
+    (xMin, yMin, xMax, yMax) tuples, or None for empty layers.
+
+    `glyphs` is a {glyphName: VariableGlyph} dict, which must contain the glyph
+    and all glyphs it is made of. Components are included in the bounds, see
+    getLayerBounds().
+    """
+    glyph = glyphs[glyphName]
+    if layerNames is None:
+        layerNames = list(glyph.layers)
+    return {
+        layerName: {
+            "controlBounds": getLayerBounds(glyphs, glyphName, layerName, False),
+            "bounds": getLayerBounds(glyphs, glyphName, layerName, True),
+        }
+        for layerName in layerNames
+        if layerName in glyph.layers
+    }
+
+
+def getLayerBounds(glyphs, glyphName, layerName, exact):
+    """Return the exact or control bounds of the layer `layerName` of
+    `glyphName`, including its components, or None if it is empty.
+
+    The bounds of the path come from the PackedPath, which caches them. A
+    component is measured in the layer with the same name of the base glyph,
+    or, if it doesn't have one, in the layer of its first source. The
+    component's location is not taken into account: there is no interpolation
+    here.
+    """
+    return _getLayerBounds(glyphs, glyphName, layerName, exact, frozenset())
+
+
+def _getLayerBounds(glyphs, glyphName, layerName, exact, seenGlyphNames):
+    staticGlyph = _getStaticGlyph(glyphs, glyphName, layerName)
+    if staticGlyph is None:
+        return None
+    path = staticGlyph.path
+    bounds = path.getBounds() if exact else path.getControlBounds()
+    seenGlyphNames = seenGlyphNames | {glyphName}
+    for component in staticGlyph.components:
+        if component.name in seenGlyphNames:
+            # Avoid infinite recursion
+            continue
+        componentBounds = _getComponentBounds(
+            glyphs, component, layerName, exact, seenGlyphNames
+        )
+        bounds = _unionBounds(bounds, componentBounds)
+    return bounds
+
+
+def _getComponentBounds(glyphs, component, layerName, exact, seenGlyphNames):
+    t = makeAffineTransform(component.transformation)
+    if not t.xy and not t.yx:
+        # Only scaling and translation: the transformed bounds of the base
+        # glyph are the bounds of the transformed base glyph
+        bounds = _getLayerBounds(
+            glyphs, component.name, layerName, exact, seenGlyphNames
+        )
+        if bounds is None:
+            return None
+        xMin, yMin, xMax, yMax = bounds
+        return calcBounds(t.transformPoints([(xMin, yMin), (xMax, yMax)]))
+    pen = BoundsPen(None) if exact else ControlBoundsPen(None)
+    _drawLayer(
+        glyphs,
+        component.name,
+        layerName,
+        TransformPointPen(PointToSegmentPen(pen), t),
+        seenGlyphNames,
+    )
+    return pen.bounds
+
+
+def _drawLayer(glyphs, glyphName, layerName, pointPen, seenGlyphNames):
+    staticGlyph = _getStaticGlyph(glyphs, glyphName, layerName)
+    if staticGlyph is None:
+        return
+    staticGlyph.path.drawPoints(pointPen)
+    seenGlyphNames = seenGlyphNames | {glyphName}
+    for component in staticGlyph.components:
+        if component.name in seenGlyphNames:
+            continue
+        _drawLayer(
+            glyphs,
+            component.name,
+            layerName,
+            TransformPointPen(pointPen, makeAffineTransform(component.transformation)),
+            seenGlyphNames,
+        )
+
+
+def _getStaticGlyph(glyphs, glyphName, layerName):
+    glyph = glyphs.get(glyphName)
+    if glyph is None:
+        return None
+    layer = glyph.layers.get(layerName)
+    if layer is None and glyph.sources:
+        layer = glyph.layers.get(glyph.sources[0].layerName)
+    return layer.glyph if layer is not None else None
+
+
+def _unionBounds(bounds1, bounds2):
+    if bounds1 is None:
+        return bounds2
+    if bounds2 is None:
+        return bounds1
+    return unionRect(bounds1, bounds2)
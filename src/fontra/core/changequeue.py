@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from collections import deque
+
+from .changes import squashChanges
+
+logger = logging.getLogger(__name__)
+
+
+# Change functions that overwrite values: a newer change with the same target
+# makes an older one redundant
+_overwritingChangeFunctions = {"=", "=xy", "=xys"}
+
+
+class ChangeQueueClosedError(Exception):
+    pass
+
+
+class OutgoingChangeQueue:
+    """Send changes to a single connection, one at a time, in order.
+
+    Live changes are not awaited. When a live change is queued while older live
+    changes to the same targets have not been sent yet, the older changes are
+    dropped, so a slow client doesn't fall further and further behind during
+    a drag. Any remaining consecutive live changes are squashed into a single
+    change when they are sent. Other changes, such as final changes, are never
+    dropped, and live changes are never coalesced across them.
+
+    Optionally, a pre-encoded version of the change can be passed, which is
+    then sent instead of the change itself. This allows the same change to be
+    encoded only once for all connections.
+
+    When the queue is closed, the changes that are waiting to be sent, or
+    are being sent, fail with ChangeQueueClosedError.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._pending = deque()  # (change, message, targets, future) tuples
+        self._senderTask = None
+        self._inFlightFuture = None
+        self._closed = False
+        self.numDroppedChanges = 0
+        self.numSquashedChanges = 0
+
+    def putLiveChange(self, change, encodedChange=None):
+        if self._closed:
+            return
+        targets = getChangeTargets(change)
+        if targets is not None:
+            self._dropRedundantChanges(targets)
+        message = encodedChange if encodedChange is not None else change
+        self._pending.append((change, message, targets, None))
+        self._ensureSender()
+
+    async def putChange(self, change, encodedChange=None):
+        """Queue `change`, and wait until it has been sent."""
+        if self._closed:
+            raise ChangeQueueClosedError("the change queue is closed")
+        future = asyncio.get_running_loop().create_future()
+        message = encodedChange if encodedChange is not None else change
+        self._pending.append((change, message, None, future))
+        self._ensureSender()
+        await future
+
+    def close(self):
+        self._closed = True
+        if self._senderTask is not None:
+            self._senderTask.cancel()
+        futures = [future for _, _, _, future in self._pending]
+        futures.append(self._inFlightFuture)
+        self._pending.clear()
+        for future in futures:
+            _failFuture(future, ChangeQueueClosedError("the change queue is closed"))
+
+    def _dropRedundantChanges(self, targets):
+        # Walk back from the most recent change, but stop at the first change
+        # that can't be dropped: changes must not be reordered across it
+        index = len(self._pending) - 1
+        while index >= 0:
+            _, _, pendingTargets, future = self._pending[index]
+            if pendingTargets is None or future is not None:
+                break
+            if pendingTargets <= targets:
+                del self._pending[index]
+                self.numDroppedChanges += 1
+            index -= 1
+
+    def _ensureSender(self):
+        if self._senderTask is None:
+            self._senderTask = asyncio.create_task(self._sendChanges())
+
+    async def _sendChanges(self):
+        try:
+            while self._pending:
+                change, message, _, future = self._pending.popleft()
+                if future is None and self._pending and self._pending[0][3] is None:
+                    # More live changes are waiting: send them all at once
+                    changes = [change]
+                    while self._pending and self._pending[0][3] is None:
+                        changes.append(self._pending.popleft()[0])
+                    message = squashChanges(changes)
+                    self.numSquashedChanges += len(changes) - 1
+                # Live changes may be dropped altogether by the connection, if
+                # the client can't keep up
+                proxy = (
+                    self.connection.proxy
+                    if future is not None
+                    else self.connection.droppableProxy
+                )
+                self._inFlightFuture = future
+                error = None
+                try:
+                    await proxy.externalChange(message)
+                except Exception as e:
+                    error = e
+                    if future is None:
+                        logger.error("error while sending live change: %r", e)
+                except BaseException:
+                    # Cancelled by close()
+                    error = ChangeQueueClosedError("the change queue is closed")
+                    raise
+                finally:
+                    self._inFlightFuture = None
+                    if error is not None:
+                        _failFuture(future, error)
+                    elif future is not None and not future.done():
+                        future.set_result(None)
+        finally:
+            self._senderTask = None
+
+
+def _failFuture(future, error):
+    if future is not None and not future.done():
+        future.set_exception(error)
+
+
+def getChangeTargets(change):
+    """Return the set of targets that `change` overwrites, or None if the change
+    does anything else than overwriting values with "=", "=xy" or "=xys". A
+    target is a (path, changeFunction, key) tuple. For "=xys", the key is the
+    tuple of point indices.
+    """
+    targets = set()
+    if not _collectChangeTargets(change, (), targets):
+        return None
+    return targets
+
+
+def _collectChangeTargets(change, prefix, targets):
+    path = prefix + tuple(change.get("p", ()))
+    changeFunction = change.get("f")
+    if changeFunction is not None:
+        if changeFunction not in _overwritingChangeFunctions:
+            return False
+        key = change["a"][0]
+        if changeFunction == "=xys":
+            key = tuple(key)
+        targets.add((path, changeFunction, key))
+    return all(
+        _collectChangeTargets(childChange, path, targets)
+        for childChange in change.get("c", ())
+    )
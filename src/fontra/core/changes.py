@@ -1,21 +1,48 @@
+from array import array
+from itertools import groupby
+from operator import itemgetter
 from typing import Mapping, MutableMapping, MutableSequence, Sequence
 
 from .classes import classCastFuncs, classSchema
+from .packedpath import PackedPath
+
+
+def _makeTypeCheck(classes):
+    """Return a function that does the same as `isinstance(obj, classes)`, but
+    caches the result per type. That is much faster than isinstance() for ABCs
+    such as Mapping, which we do a lot of in _applyChange().
+    """
+    results = {}
+
+    def typeCheck(obj):
+        cls = type(obj)
+        result = results.get(cls)
+        if result is None:
+            result = results[cls] = issubclass(cls, classes)
+        return result
+
+    return typeCheck
+
+
+_isContainer = _makeTypeCheck((Mapping, Sequence))
+_isMutableContainer = _makeTypeCheck((MutableMapping, MutableSequence))
+_isSequence = _makeTypeCheck(Sequence)
+_isMutableMapping = _makeTypeCheck(MutableMapping)
 
 
 def setItem(subject, key, item, *, itemCast=None):
     if itemCast is not None:
         item = itemCast(item)
-    if isinstance(subject, (MutableMapping, MutableSequence)):
+    if _isMutableContainer(subject):
         subject[key] = item
     else:
         setattr(subject, key, item)
 
 
 def delAttr(subject, key, *, itemCast=None):
-    if isinstance(subject, Sequence):
+    if _isSequence(subject):
         raise TypeError("can't call delattr on list")
-    elif isinstance(subject, MutableMapping):
+    elif _isMutableMapping(subject):
         del subject[key]
     else:
         delattr(subject, key)
@@ -32,6 +59,9 @@ def insertItems(subject, index, *items, itemCast=None):
 def spliceItems(subject, index, deleteCount, *items, itemCast=None):
     if itemCast is not None:
         items = [itemCast(item) for item in items]
+    if type(subject) is array:
+        # Such as the coordinates of a PackedPath
+        items = array(subject.typecode, items)
     subject[index : index + deleteCount] = items
 
 
@@ -49,6 +79,9 @@ baseChangeFunctions = {
 changeFunctions = {
     **baseChangeFunctions,
     "=xy": lambda path, pointIndex, x, y: path.setPointPosition(pointIndex, x, y),
+    "=xys": lambda path, pointIndices, coordinates: path.setPointPositions(
+        pointIndices, coordinates
+    ),
     "insertContour": lambda path, contourIndex, contour: path.insertContour(
         contourIndex, contour
     ),
@@ -83,43 +116,326 @@ def applyChange(subject, change):
     _applyChange(subject, change)
 
 
+def applyChanges(subject, changes):
+    """Apply the `changes` to `subject`, in order. This is the same as applying
+    a change that has `changes` as its children.
+    """
+    _applyChildChanges(subject, changes, None)
+
+
 def _applyChange(subject, change, *, itemCast=None):
-    path = change.get("p", [])
-    functionName = change.get("f")
-    children = change.get("c", [])
+    """Apply `change` to `subject`. Return True if a base change function (see
+    baseChangeFunctions) was applied, as that may have replaced or removed
+    objects.
+    """
+    path = change.get("p")
+    if path:
+        subject, itemCast = _resolvePath(subject, path, itemCast)
+    return _applyResolvedChange(subject, change, itemCast)
 
-    for pathElement in path:
-        itemCast = None
-        if isinstance(subject, (Mapping, Sequence)):
-            subject = subject[pathElement]
-        else:
-            itemCast = getItemCast(subject, pathElement, "subtype")
-            subject = getattr(subject, pathElement)
 
+def _applyResolvedChange(subject, change, itemCast):
+    appliedBaseChange = False
+
+    functionName = change.get("f")
     if functionName is not None:
         changeFunc = changeFunctions[functionName]
-        args = change.get("a", [])
+        args = change.get("a", ())
         if functionName in baseChangeFunctions:
             if itemCast is None and args:
                 itemCast = getItemCast(subject, args[0], "type")
             changeFunc(subject, *args, itemCast=itemCast)
+            if type(subject) is PackedPath:
+                # The base change functions don't know about the arrays and the
+                # cached bounds of PackedPath
+                subject.fieldsChanged()
+            appliedBaseChange = True
         else:
             changeFunc(subject, *args)
 
-    for subChange in children:
-        _applyChange(subject, subChange, itemCast=itemCast)
+    children = change.get("c")
+    if children:
+        if _applyChildChanges(subject, children, itemCast):
+            appliedBaseChange = True
+
+    return appliedBaseChange
+
+
+def _applyChildChanges(subject, changes, itemCast):
+    appliedBaseChange = False
+    # Consecutive changes often have the same path, for example when many
+    # points of a glyph were moved. Remember the object the previous path
+    # resolved to, until a base change function may have replaced it.
+    previousPath = previousResolved = None
+    for change in changes:
+        path = change.get("p")
+        if not path:
+            changeSubject, changeItemCast = subject, itemCast
+        else:
+            if path != previousPath:
+                previousResolved = _resolvePath(subject, path, itemCast)
+                previousPath = path
+            changeSubject, changeItemCast = previousResolved
+        if _applyResolvedChange(changeSubject, change, changeItemCast):
+            appliedBaseChange = True
+            previousPath = None
+    return appliedBaseChange
+
+
+def _resolvePath(subject, path, itemCast):
+    for pathElement in path:
+        if _isContainer(subject):
+            itemCast = None
+            subject = subject[pathElement]
+        else:
+            if type(subject) is PackedPath:
+                # The change will modify the coordinates, point types or
+                # contour info in place
+                subject.invalidateBounds()
+                if pathElement == "coordinates":
+                    subject.clearFloatFlags()
+            itemCast = getItemCast(subject, pathElement, "subtype")
+            subject = getattr(subject, pathElement)
+    return subject, itemCast
 
 
 def getItemCast(subject, attrName, fieldKey):
-    classFields = classSchema.get(type(subject))
-    if classFields is not None:
-        fieldDef = classFields[attrName]
-        subtype = fieldDef.get(fieldKey)
-        if subtype is not None:
-            return classCastFuncs.get(subtype)
+    fieldCasts = _classFieldCasts.get(type(subject))
+    if fieldCasts is not None:
+        return fieldCasts[attrName][fieldKey]
     return None
 
 
+def _makeClassFieldCasts(schema, castFuncs):
+    # {cls: {fieldName: {"type": castFunc, "subtype": castFunc}}}
+    return {
+        cls: {
+            fieldName: {
+                fieldKey: castFuncs.get(fieldDef.get(fieldKey))
+                for fieldKey in ["type", "subtype"]
+            }
+            for fieldName, fieldDef in classFields.items()
+        }
+        for cls, classFields in schema.items()
+    }
+
+
+_classFieldCasts = _makeClassFieldCasts(classSchema, classCastFuncs)
+
+
+def squashChanges(changes):
+    """Return a single change that has the same effect as applying `changes` in
+    order, but without the parts that are made redundant by later changes:
+
+    - changes that are overwritten by later "=", "=xy" or "=xys" changes to the
+      same targets, or to a parent of them
+    - an insertion that is undone by a later deletion of the same items
+
+    The changes are assumed to be valid for the subject they are applied to.
+    The argument values are not copied.
+    """
+    flatChanges = []
+    for change in changes:
+        _flattenChange(change, (), flatChanges)
+    while True:
+        numChanges = len(flatChanges)
+        flatChanges = _dropOverwrittenChanges(flatChanges)
+        # Dropping insert-delete pairs may make more overwritten changes
+        # droppable, and vice versa
+        flatChanges = _dropInsertDeletePairs(flatChanges)
+        if len(flatChanges) == numChanges:
+            break
+    return _buildChange(flatChanges)
+
+
+# Change functions that replace the values at their targets. See
+# _getChangeTargets()
+_overwritingChangeFunctions = {"=", "=xy", "=xys"}
+
+# Delete function -> (insert function, function to compare the arguments)
+_insertDeletePairs = {
+    "-": (
+        "+",
+        lambda deleteArgs, insertArgs: (
+            _isIndex(deleteArgs[0])
+            and deleteArgs[0] == insertArgs[0]
+            and (deleteArgs[1] if len(deleteArgs) > 1 else 1) == len(insertArgs) - 1
+        ),
+    ),
+    "deletePoint": (
+        "insertPoint",
+        lambda deleteArgs, insertArgs: (
+            _isIndex(deleteArgs[0])
+            and _isIndex(deleteArgs[1])
+            and deleteArgs[:2] == insertArgs[:2]
+        ),
+    ),
+    "deleteContour": (
+        "insertContour",
+        lambda deleteArgs, insertArgs: (
+            _isIndex(deleteArgs[0]) and deleteArgs[0] == insertArgs[0]
+        ),
+    ),
+}
+
+
+def _isIndex(value):
+    # Negative indices can't be compared, as they depend on the size of the list
+    return isinstance(value, int) and value >= 0
+
+
+def _flattenChange(change, prefix, flatChanges):
+    path = prefix + tuple(change.get("p", ()))
+    functionName = change.get("f")
+    if functionName is not None:
+        flatChanges.append((path, functionName, change.get("a", [])))
+    for childChange in change.get("c", ()):
+        _flattenChange(childChange, path, flatChanges)
+
+
+def _getChangeTargets(path, functionName, args):
+    # Return the paths of the values that are replaced or modified by a change
+    if functionName in {"=", "d"}:
+        return [path + (args[0],)]
+    elif functionName == "=xy":
+        # A tuple can't occur as a path element, so this doesn't clash
+        return [path + (("=xy", args[0]),)]
+    elif functionName == "=xys":
+        return [path + (("=xy", pointIndex),) for pointIndex in args[0]]
+    return [path]
+
+
+_OVERWRITTEN = object()
+
+
+def _dropOverwrittenChanges(flatChanges):
+    # Walk the changes backwards, and keep track of the targets that will be
+    # overwritten by a later change, in a tree of nested dicts. A change whose
+    # target is in or below an overwritten target can be dropped. Any other
+    # change to a target above an overwritten target may change what the
+    # target's path refers to, so the targets below it are no longer safe.
+    overwritten = {}
+    keptChanges = []
+    for flatChange in reversed(flatChanges):
+        path, functionName, args = flatChange
+        targets = _getChangeTargets(path, functionName, args)
+        if all(_isOverwritten(overwritten, target) for target in targets):
+            continue
+        keptChanges.append(flatChange)
+        isOverwrite = functionName in _overwritingChangeFunctions
+        for target in targets:
+            if not target:
+                overwritten.clear()
+            else:
+                _setTreeItem(overwritten, target, _OVERWRITTEN if isOverwrite else None)
+    keptChanges.reverse()
+    return keptChanges
+
+
+def _dropInsertDeletePairs(flatChanges):
+    keptChanges = []
+    for flatChange in flatChanges:
+        path, functionName, args = flatChange
+        insertInfo = _insertDeletePairs.get(functionName)
+        if insertInfo is not None:
+            insertIndex = _findMatchingInsert(keptChanges, path, args, *insertInfo)
+            if insertIndex is not None:
+                del keptChanges[insertIndex]
+                continue
+        keptChanges.append(flatChange)
+    return keptChanges
+
+
+def _findMatchingInsert(flatChanges, path, deleteArgs, insertFunctionName, argsMatch):
+    # Only the most recent change that involves the object at `path` can be the
+    # matching insertion: any other change may have shifted the indices, or
+    # may have modified the inserted items.
+    for index in range(len(flatChanges) - 1, -1, -1):
+        otherPath, otherFunctionName, otherArgs = flatChanges[index]
+        otherTargets = _getChangeTargets(otherPath, otherFunctionName, otherArgs)
+        if not any(
+            _isPathPrefix(otherTarget, path) or _isPathPrefix(path, otherTarget)
+            for otherTarget in otherTargets
+        ):
+            continue
+        if (
+            otherFunctionName == insertFunctionName
+            and otherPath == path
+            and argsMatch(deleteArgs, otherArgs)
+        ):
+            return index
+        return None
+    return None
+
+
+def _isPathPrefix(prefix, path):
+    return path[: len(prefix)] == prefix
+
+
+def _buildChange(flatChanges):
+    # Group consecutive changes with the same path
+    changes = []
+    for path, group in groupby(flatChanges, key=itemgetter(0)):
+        children = [{"f": functionName, "a": args} for _, functionName, args in group]
+        change = children[0] if len(children) == 1 else {"c": children}
+        changes.append((path, change))
+
+    if not changes:
+        return {}
+    if len(changes) == 1:
+        commonPrefix = changes[0][0]
+        change = changes[0][1]
+    else:
+        commonPrefix = _commonPathPrefix([path for path, _ in changes])
+        children = []
+        for path, childChange in changes:
+            childPath = path[len(commonPrefix) :]
+            children.append(
+                {"p": list(childPath), **childChange} if childPath else childChange
+            )
+        change = {"c": children}
+    return {"p": list(commonPrefix), **change} if commonPrefix else change
+
+
+def _commonPathPrefix(paths):
+    prefix = paths[0]
+    for path in paths[1:]:
+        i = 0
+        for a, b in zip(prefix, path):
+            if a != b:
+                break
+            i += 1
+        prefix = prefix[:i]
+    return prefix
+
+
+def _isOverwritten(tree, target):
+    node = tree
+    for element in target:
+        node = node.get(element)
+        if node is None:
+            return False
+        if node is _OVERWRITTEN:
+            return True
+    return False
+
+
+def _setTreeItem(tree, target, value):
+    # Set the item at `target` to `value`, or remove it if `value` is None
+    node = tree
+    for element in target[:-1]:
+        childNode = node.get(element)
+        if childNode is None:
+            if value is None:
+                return
+            childNode = node[element] = {}
+        node = childNode
+    if value is None:
+        node.pop(target[-1], None)
+    else:
+        node[target[-1]] = value
+
+
 _MISSING = object()
 
 
@@ -283,6 +599,86 @@ def patternIntersect(patternA, patternB):
     return result
 
 
+class MatchPatternIndex:
+    """An inverted index of the match patterns of multiple subscribers, to
+    efficiently find all subscribers whose pattern matches a change.
+
+    All patterns are merged into a single tree, where each node knows which
+    subscribers have a leaf node at that position. Finding the matching
+    subscribers for a change is proportional to the size of the change and the
+    number of subscribers found, not to the total number of subscribers.
+    """
+
+    def __init__(self):
+        self._root = _IndexNode()
+        self._patterns = {}
+
+    def getPattern(self, subscriber):
+        return self._patterns.get(subscriber, {})
+
+    def setPattern(self, subscriber, pattern):
+        oldPattern = self._patterns.get(subscriber, {})
+        if pattern:
+            self._patterns[subscriber] = pattern
+        else:
+            self._patterns.pop(subscriber, None)
+        _updateIndexNode(self._root, subscriber, oldPattern, pattern)
+
+    def removeSubscriber(self, subscriber):
+        self.setPattern(subscriber, {})
+
+    def matchChange(self, change):
+        """Return the set of subscribers whose pattern matches `change`, in
+        the same way as `matchChangePattern()` does.
+        """
+        subscribers = set()
+        _collectSubscribers(change, self._root, subscribers)
+        return subscribers
+
+
+class _IndexNode:
+    __slots__ = ["subscribers", "children"]
+
+    def __init__(self):
+        self.subscribers = set()
+        self.children = {}
+
+
+def _updateIndexNode(node, subscriber, oldPattern, newPattern):
+    for key in oldPattern.keys() | newPattern.keys():
+        oldValue = oldPattern.get(key, _MISSING)
+        newValue = newPattern.get(key, _MISSING)
+        if oldValue is newValue:
+            # Pattern operations share unchanged subtrees, so this skips
+            # everything that didn't change
+            continue
+        childNode = node.children.get(key)
+        if childNode is None:
+            childNode = node.children[key] = _IndexNode()
+        if newValue is None:
+            childNode.subscribers.add(subscriber)
+        else:
+            childNode.subscribers.discard(subscriber)
+        oldSubPattern = oldValue if isinstance(oldValue, dict) else {}
+        newSubPattern = newValue if isinstance(newValue, dict) else {}
+        if oldSubPattern or newSubPattern:
+            _updateIndexNode(childNode, subscriber, oldSubPattern, newSubPattern)
+        if not childNode.subscribers and not childNode.children:
+            del node.children[key]
+
+
+def _collectSubscribers(change, node, subscribers):
+    for pathElement in change.get("p", []):
+        node = node.children.get(pathElement)
+        if node is None:
+            return
+        subscribers.update(node.subscribers)
+
+    if node.children:
+        for childChange in change.get("c", []):
+            _collectSubscribers(childChange, node, subscribers)
+
+
 def collectChangePaths(change, depth):
     """Return a sorted list of paths of the specified `depth` that the `change`
     includes."""
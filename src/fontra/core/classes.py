@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import math
 import sys
-from dataclasses import dataclass, field, is_dataclass
+from dataclasses import dataclass, field, fields, is_dataclass
 from functools import partial
+from operator import attrgetter
 from typing import Any, Optional, get_args, get_type_hints
 
 import dacite
+from fontTools.misc.transform import Transform
 
-from .packedpath import PackedPath, PointType
+from .packedpath import PackedPath, PointType, packedPathToDict
 
 
 @dataclass(kw_only=True)
@@ -23,6 +26,21 @@ class Transformation:
     tCenterY: float = 0
 
 
+def makeAffineTransform(transformation: Transformation) -> Transform:
+    t = Transform()
+    t = t.translate(
+        transformation.translateX + transformation.tCenterX,
+        transformation.translateY + transformation.tCenterY,
+    )
+    t = t.rotate(transformation.rotation * (math.pi / 180))
+    t = t.scale(transformation.scaleX, transformation.scaleY)
+    t = t.skew(
+        -transformation.skewX * (math.pi / 180), transformation.skewY * (math.pi / 180)
+    )
+    t = t.translate(-transformation.tCenterX, -transformation.tCenterY)
+    return t
+
+
 Location = dict[str, float]
 CustomData = dict[str, Any]
 
@@ -147,12 +165,47 @@ def makeSchema(*classes, schema=None):
 
 
 def makeCastFuncs(schema, config=None):
+    typeHooks = config.type_hooks if config is not None else {}
     castFuncs = {}
     for cls in schema.keys():
-        castFuncs[cls] = partial(dacite.from_dict, cls, config=config)
+        castFuncs[cls] = typeHooks.get(cls) or partial(
+            dacite.from_dict, cls, config=config
+        )
     return castFuncs
 
 
+def makeUnstructureFuncs(schema):
+    return {cls: makeUnstructureFunc(cls) for cls in schema.keys()}
+
+
+def makeUnstructureFunc(cls):
+    """Return a function that converts an instance of the dataclass `cls` to a
+    dict of its field values. Unlike `dataclasses.asdict()`, this is shallow:
+    field values are not copied or converted, so nested dataclass instances
+    must be converted separately, for example by the `default` hook of a JSON
+    encoder.
+    """
+    fieldNames = tuple(f.name for f in fields(cls))
+    if len(fieldNames) == 1:
+        [fieldName] = fieldNames
+        return lambda obj: {fieldName: getattr(obj, fieldName)}
+    getFieldValues = attrgetter(*fieldNames)
+    return lambda obj: dict(zip(fieldNames, getFieldValues(obj)))
+
+
+def unstructure(obj):
+    """Shallowly convert the dataclass instance `obj` to a dict, see
+    makeUnstructureFunc(). Raise TypeError if `obj` is not a dataclass instance.
+    """
+    cls = type(obj)
+    unstructureFunc = classUnstructureFuncs.get(cls)
+    if unstructureFunc is None:
+        if not is_dataclass(cls):
+            raise TypeError(f"Object of type {cls.__name__} is not JSON serializable")
+        unstructureFunc = classUnstructureFuncs[cls] = makeUnstructureFunc(cls)
+    return unstructureFunc(obj)
+
+
 def classesToStrings(schema):
     return {
         cls.__name__: {
@@ -166,10 +219,21 @@ def classesToStrings(schema):
     }
 
 
-_castConfig = dacite.Config(cast=[PointType])
-from_dict = partial(dacite.from_dict, config=_castConfig)
+def from_dict(cls, data):
+    castFunc = classCastFuncs.get(cls)
+    if castFunc is None:
+        castFunc = partial(dacite.from_dict, cls, config=_castConfig)
+    return castFunc(data)
+
+
+# PackedPath converts its coordinates and point types to arrays itself
+_castConfig = dacite.Config(
+    cast=[PointType], type_hooks={PackedPath: PackedPath.fromDict}
+)
 classSchema = makeSchema(Font)
 classCastFuncs = makeCastFuncs(classSchema, config=_castConfig)
+classUnstructureFuncs = makeUnstructureFuncs(classSchema)
+classUnstructureFuncs[PackedPath] = packedPathToDict
 
 
 def serializableClassSchema():
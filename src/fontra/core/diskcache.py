@@ -0,0 +1,130 @@
+import asyncio
+import json
+import logging
+import os
+import pickle
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+
+# Bump this when the classes in classes.py change in an incompatible way
+FORMAT_VERSION = 5
+
+
+class GlyphDiskCache:
+    """A persistent glyph cache, stored in an SQLite database.
+
+    Each entry is stored along with a validation key, as provided by the backend,
+    which typically contains the modification times of the source files of the
+    glyph. An entry is only returned if the stored validation key matches the
+    current one.
+
+    Glyphs are stored as pickles, as that is by far the fastest way to get them
+    back. The cache file should therefore live in a private directory.
+
+    The async methods run the database I/O in a thread of their own, one call
+    at a time, in the order of the calls, so they don't block the event loop.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="fontra-glyph-disk-cache"
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        row = self.db.execute(
+            "SELECT value FROM meta WHERE key = 'formatVersion'"
+        ).fetchone()
+        if row is None or row[0] != FORMAT_VERSION:
+            self.db.execute("DROP TABLE IF EXISTS glyphs")
+            self.db.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('formatVersion', ?)",
+                (FORMAT_VERSION,),
+            )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS glyphs "
+            "(glyphName TEXT PRIMARY KEY, validationKey TEXT, data BLOB)"
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.db.close()
+
+    async def aclose(self):
+        # Like close(), but wait for the running I/O without blocking the
+        # event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.close)
+
+    async def getGlyphs(self, validationKeys):
+        """Return a {glyphName: glyph} dict with the cached glyphs for the
+        {glyphName: validationKey} dict `validationKeys`. Glyphs that aren't
+        cached, or not with the given validation key, are left out.
+        """
+        return await self._run(self._getGlyphs, validationKeys)
+
+    async def putGlyphs(self, items):
+        """Store the glyphs of `items`, a list of (glyphName, validationKey,
+        glyph) tuples.
+        """
+        await self._run(self._putGlyphs, items)
+
+    async def deleteGlyphs(self, glyphNames):
+        await self._run(self._deleteGlyphs, glyphNames)
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    def _getGlyphs(self, validationKeys):
+        glyphs = {}
+        for glyphName, validationKey in validationKeys.items():
+            glyph = self.get(glyphName, validationKey)
+            if glyph is not None:
+                glyphs[glyphName] = glyph
+        return glyphs
+
+    def _putGlyphs(self, items):
+        for glyphName, validationKey, glyph in items:
+            self.put(glyphName, validationKey, glyph)
+
+    def _deleteGlyphs(self, glyphNames):
+        for glyphName in glyphNames:
+            self.delete(glyphName)
+
+    def get(self, glyphName, validationKey):
+        row = self.db.execute(
+            "SELECT validationKey, data FROM glyphs WHERE glyphName = ?", (glyphName,)
+        ).fetchone()
+        if row is None or row[0] != _serializeValidationKey(validationKey):
+            return None
+        try:
+            return pickle.loads(row[1])
+        except Exception as e:
+            logger.info(f"can't read cached glyph {glyphName!r}: {e!r}")
+            self.delete(glyphName)
+            return None
+
+    def put(self, glyphName, validationKey, glyph):
+        self.db.execute(
+            "INSERT OR REPLACE INTO glyphs VALUES (?, ?, ?)",
+            (
+                glyphName,
+                _serializeValidationKey(validationKey),
+                pickle.dumps(glyph, pickle.HIGHEST_PROTOCOL),
+            ),
+        )
+
+    def delete(self, glyphName):
+        self.db.execute("DELETE FROM glyphs WHERE glyphName = ?", (glyphName,))
+
+
+def _serializeValidationKey(validationKey):
+    return json.dumps(validationKey)
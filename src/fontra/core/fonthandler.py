@@ -3,25 +3,30 @@ import functools
 import logging
 import traceback
 from collections import UserDict, defaultdict
-from contextlib import contextmanager
+from contextlib import AsyncExitStack, contextmanager
 from copy import deepcopy
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Optional
 
+from .bounds import getGlyphBounds
+from .changequeue import ChangeQueueClosedError, OutgoingChangeQueue
 from .changes import (
+    MatchPatternIndex,
     applyChange,
     collectChangePaths,
     filterChangePattern,
-    matchChangePattern,
     patternDifference,
     patternFromPath,
     patternIntersect,
     patternUnion,
 )
-from .classes import Font
+from .classes import Font, VariableGlyph
 from .clipboard import parseClipboard
+from .diskcache import GlyphDiskCache
 from .glyphnames import getSuggestedGlyphName, getUnicodeFromGlyphName
-from .lrucache import LRUCache
+from .journal import ChangeJournal
+from .lrucache import CacheBudget, SizedLRUCache
+from .remote import PreEncodedJSON, RemoteObjectConnectionException
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +34,15 @@ logger = logging.getLogger(__name__)
 CHANGES_PATTERN_KEY = "changes-match-pattern"
 LIVE_CHANGES_PATTERN_KEY = "live-changes-match-pattern"
 
+DEFAULT_LOCAL_DATA_MAX_BYTES = 256 * 1024 * 1024
+MAX_GLYPH_WRITE_BATCH_SIZE = 200
+DEFAULT_WRITE_DELAY = 0.5  # seconds
+DEFAULT_MAX_WRITE_LATENCY = 5  # seconds
+
+
+class FontHandlerClosedError(Exception):
+    pass
+
 
 def remoteMethod(method):
     method.fontraRemoteMethod = True
@@ -53,6 +67,20 @@ backendDeleterNames = {
 class FontHandler:
     backend: Any  # TODO: need Backend protocol
     readOnly: bool = False
+    localDataMaxBytes: int = DEFAULT_LOCAL_DATA_MAX_BYTES
+    localDataBudget: Optional[CacheBudget] = None
+    prefetchComponents: bool = True
+    glyphDiskCache: Optional[GlyphDiskCache] = None
+    # Pending writes are delayed until no new writes were scheduled for
+    # writeDelay seconds, so that rapid successive edits of the same data
+    # result in a single write. No write is delayed more than maxWriteLatency
+    # seconds.
+    writeDelay: float = DEFAULT_WRITE_DELAY
+    maxWriteLatency: float = DEFAULT_MAX_WRITE_LATENCY
+    # Final changes are added to the journal before they are applied, and are
+    # acknowledged once they have been written to the backend. Changes that
+    # were never written are replayed by startTasks().
+    changeJournal: Optional[ChangeJournal] = None
 
     def __post_init__(self):
         if not hasattr(self.backend, "putGlyph"):
@@ -60,29 +88,98 @@ class FontHandler:
         self.connections = set()
         self.glyphUsedBy = {}
         self.glyphMadeOf = {}
-        self.clientData = defaultdict(dict)
-        self.localData = LRUCache()
+        self._connectionsByClientUUID = defaultdict(set)
+        self._outgoingChangeQueues = {}
+        self._matchPatternIndexes = {
+            LIVE_CHANGES_PATTERN_KEY: MatchPatternIndex(),
+            CHANGES_PATTERN_KEY: MatchPatternIndex(),
+        }
+        self.localData = SizedLRUCache(
+            self.localDataMaxBytes, estimateLocalDataSize, self.localDataBudget
+        )
         self._dataScheduledForWriting = {}
+        self._writeScheduleTimes = {}
+        self._lastWriteScheduleTime = None
+        self._numFlushRequests = 0
+        # The live objects for scheduled or in-progress writes, by write key.
+        # Scheduled writes reference these objects without copying them; a
+        # snapshot is taken once, right before the data is written.
+        self._unwrittenData = {}
+        # The journal entries whose changes have not yet been written, by write
+        # key, and the write keys that are still to be written, by entry ID
+        self._journalEntriesByWriteKey = defaultdict(list)
+        self._unwrittenJournalWriteKeys = {}
+        self._prefetchingGlyphNames = set()
+        self._backgroundTasks = set()
+        self._componentGraphTask = None
+        self._loadingTasks = {}
+        self._closed = False
 
     async def startTasks(self):
+        self._ensureComponentGraphTask()
         if hasattr(self.backend, "watchExternalChanges"):
             self._watcherTask = asyncio.create_task(self.processExternalChanges())
             self._watcherTask.add_done_callback(taskDoneHelper)
         self._processWritesError = None
         self._processWritesEvent = asyncio.Event()
+        self._flushWritesEvent = asyncio.Event()
         self._processWritesTask = asyncio.create_task(self.processWrites())
         self._processWritesTask.add_done_callback(self._processWritesTaskDone)
         self._processWritesTask.add_done_callback(taskDoneHelper)
         self._writingInProgressEvent = asyncio.Event()
         self._writingInProgressEvent.set()
+        if self.changeJournal is not None and not self.readOnly:
+            await self._replayChangeJournal()
+
+    async def _replayChangeJournal(self):
+        entries = self.changeJournal.getUnacknowledgedEntries()
+        if entries:
+            logger.info(f"replaying {len(entries)} unsaved edit(s) from the journal")
+        for entry in entries:
+            # Don't apply the change again to the items that were written
+            change = entry["change"]
+            if entry["writtenPaths"]:
+                writtenPattern = {}
+                for path in entry["writtenPaths"]:
+                    writtenPattern = patternUnion(writtenPattern, patternFromPath(path))
+                change = filterChangePattern(change, writtenPattern, inverse=True)
+            if change is None:
+                await self.changeJournal.acknowledge([entry["id"]])
+                continue
+            try:
+                await self._updateLocalDataAndWriteToBackend(
+                    change, None, False, entry["id"]
+                )
+            except Exception as e:
+                logger.error("can't replay journal entry %s: %r", entry["id"], e)
 
     async def close(self):
-        self.backend.close()
+        self._closed = True
+        for task in list(self._backgroundTasks):
+            task.cancel()
+        if self._componentGraphTask is not None:
+            self._componentGraphTask.cancel()
         if hasattr(self, "_watcherTask"):
             self._watcherTask.cancel()
-        if hasattr(self, "_processWritesTask"):
-            await self.finishWriting()  # shield for cancel?
-            self._processWritesTask.cancel()
+        async with AsyncExitStack() as stack:
+            # The callbacks run in reverse order, also if an earlier step
+            # fails. Close the backend last, pending writes need it, and the
+            # disk cache after the writes, as a failed write reloads data.
+            stack.push_async_callback(self._closeBackend)
+            if self.glyphDiskCache is not None:
+                stack.push_async_callback(self.glyphDiskCache.aclose)
+            if self.changeJournal is not None:
+                stack.callback(self.changeJournal.close)
+                stack.push_async_callback(self.changeJournal.flush)
+            if hasattr(self, "_processWritesTask"):
+                stack.callback(self._processWritesTask.cancel)
+                await self.finishWriting()  # shield for cancel?
+
+    async def _closeBackend(self):
+        if hasattr(self.backend, "aclose"):
+            await self.backend.aclose()
+        else:
+            self.backend.close()
 
     async def processExternalChanges(self):
         async for change, reloadPattern in self.backend.watchExternalChanges():
@@ -103,13 +200,23 @@ class FontHandler:
     async def finishWriting(self):
         if self._processWritesError is not None:
             raise self._processWritesError
-        await self._writingInProgressEvent.wait()
+        # Write all pending data now, without waiting for the write delay
+        self._numFlushRequests += 1
+        self._flushWritesEvent.set()
+        try:
+            await self._writingInProgressEvent.wait()
+        finally:
+            self._numFlushRequests -= 1
+            if not self._numFlushRequests:
+                self._flushWritesEvent.clear()
 
     async def processWrites(self):
         while True:
             await self._processWritesEvent.wait()
             try:
-                await self._processWritesOneCycle()
+                while self._dataScheduledForWriting:
+                    await self._waitForWriteDelay()
+                    await self._processWritesOneCycle()
             except Exception as e:
                 self._processWritesError = e
                 raise
@@ -117,28 +224,62 @@ class FontHandler:
                 self._processWritesEvent.clear()
                 self._writingInProgressEvent.set()
 
-    async def _processWritesOneCycle(self):
-        while self._dataScheduledForWriting:
-            writeKey, (writeFunc, connection) = popFirstItem(
-                self._dataScheduledForWriting
+    async def _waitForWriteDelay(self):
+        loop = asyncio.get_running_loop()
+        while self._dataScheduledForWriting and not self._flushWritesEvent.is_set():
+            oldestScheduleTime = next(iter(self._writeScheduleTimes.values()))
+            deadline = min(
+                self._lastWriteScheduleTime + self.writeDelay,
+                oldestScheduleTime + self.maxWriteLatency,
             )
-            reloadPattern = _writeKeyToPattern(writeKey)
-            logger.info(f"write {writeKey} to backend")
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._flushWritesEvent.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _processWritesOneCycle(self):
+        # Only process the writes that are currently scheduled: writes that get
+        # scheduled in the meantime are subject to the write delay again
+        numWrites = len(self._dataScheduledForWriting)
+        while numWrites > 0 and self._dataScheduledForWriting:
+            writeKeys, writeFunc, connections = self._popNextWrite(numWrites)
+            # The write snapshot contains the changes of these journal entries
+            journalWrites = self._popJournalWrites(writeKeys)
+            numWrites -= len(writeKeys)
+            reloadPattern = _writeKeysToPattern(writeKeys)
+            if len(writeKeys) == 1:
+                logger.info(f"write {writeKeys[0]} to backend")
+            else:
+                logger.info(f"write {len(writeKeys)} glyphs to backend")
             try:
                 errorMessage = await writeFunc()
             except Exception as e:
+                self._forgetUnwrittenData(writeKeys)
                 logger.error("exception while writing data: %r", e)
                 traceback.print_exc()
                 await self.reloadData(reloadPattern)
-                if connection is not None:
-                    await connection.proxy.messageFromServer(
-                        "The data could not be saved due to an error.",
-                        f"The edit has been reverted.\n\n{e!r}",
+                if connections:
+                    for connection in connections:
+                        await self._messageFromServer(
+                            connection,
+                            "The data could not be saved due to an error.",
+                            f"The edit has been reverted.\n\n{e!r}",
+                        )
+                elif any(entryIDs for _, entryIDs in journalWrites):
+                    # Such as a replayed journal entry: there is no one to
+                    # inform, but the other writes must go on
+                    logger.error(
+                        "the changes of journal entries %s have been reverted",
+                        sorted({i for _, entryIDs in journalWrites for i in entryIDs}),
                     )
                 else:
                     # No connection to inform, let's error
                     raise
             else:
+                self._forgetUnwrittenData(writeKeys)
                 if errorMessage:
                     messageDetail = f"The edit has been reverted.\n\n{errorMessage}"
                     try:
@@ -149,52 +290,348 @@ class FontHandler:
                             "The edit could not be reverted due to an additional error."
                             f"\n\n{e!r}"
                         )
-                    if connection is not None:
-                        await connection.proxy.messageFromServer(
-                            "The data could not be saved.",
-                            messageDetail,
-                        )
+                    if connections:
+                        for connection in connections:
+                            await self._messageFromServer(
+                                connection,
+                                "The data could not be saved.",
+                                messageDetail,
+                            )
                     else:
                         # This ideally can't happen
                         assert False, errorMessage
+            # Either the data was written, or the edit has been reverted: the
+            # journal entries should not be replayed
+            await self._acknowledgeJournalWrites(journalWrites)
             await asyncio.sleep(0)
 
+    async def _messageFromServer(self, connection, message, detail):
+        # The client may have disconnected since the write was scheduled: that
+        # must not stop the writes of the other clients
+        try:
+            await connection.proxy.messageFromServer(message, detail)
+        except Exception as e:
+            _logConnectionError(connection, "sending message to", e)
+
+    def _popNextWrite(self, maxWrites):
+        # Pop the next scheduled write. If the backend supports it, consecutive
+        # glyph writes are combined into a single putGlyphs() call.
+        writeKey, (writeFunc, connection) = popFirstItem(self._dataScheduledForWriting)
+        del self._writeScheduleTimes[writeKey]
+        writeKeys = [writeKey]
+        connections = [connection]
+        if self._isPutGlyphWrite(writeFunc) and hasattr(self.backend, "putGlyphs"):
+            glyphs = [writeFunc.args]
+            while self._dataScheduledForWriting and len(glyphs) < min(
+                maxWrites, MAX_GLYPH_WRITE_BATCH_SIZE
+            ):
+                nextWriteKey = next(iter(self._dataScheduledForWriting))
+                nextWriteFunc, nextConnection = self._dataScheduledForWriting[
+                    nextWriteKey
+                ]
+                if not self._isPutGlyphWrite(nextWriteFunc):
+                    break
+                del self._dataScheduledForWriting[nextWriteKey]
+                del self._writeScheduleTimes[nextWriteKey]
+                writeKeys.append(nextWriteKey)
+                connections.append(nextConnection)
+                glyphs.append(nextWriteFunc.args)
+            if len(glyphs) > 1:
+                writeFunc = functools.partial(self.backend.putGlyphs, glyphs)
+        connections = [
+            connection
+            for connection in dict.fromkeys(connections)
+            if connection is not None
+        ]
+        return writeKeys, _snapshotWriteFunc(writeFunc), connections
+
+    def _popJournalWrites(self, writeKeys):
+        return [
+            (writeKey, self._journalEntriesByWriteKey.pop(writeKey, ()))
+            for writeKey in writeKeys
+        ]
+
+    async def _acknowledgeJournalWrites(self, journalWrites):
+        acknowledgedEntryIDs = []
+        writtenPaths = defaultdict(list)
+        for writeKey, entryIDs in journalWrites:
+            for entryID in entryIDs:
+                unwrittenWriteKeys = self._unwrittenJournalWriteKeys[entryID]
+                unwrittenWriteKeys.discard(writeKey)
+                if not unwrittenWriteKeys:
+                    del self._unwrittenJournalWriteKeys[entryID]
+                    acknowledgedEntryIDs.append(entryID)
+                else:
+                    # Other items of the entry are still to be written
+                    writtenPaths[entryID].append(_writeKeyToPath(writeKey))
+        if acknowledgedEntryIDs or writtenPaths:
+            await self.changeJournal.acknowledge(acknowledgedEntryIDs, writtenPaths)
+
+    def _forgetUnwrittenData(self, writeKeys):
+        for writeKey in writeKeys:
+            if writeKey not in self._dataScheduledForWriting:
+                # No new write was scheduled in the meantime
+                self._unwrittenData.pop(writeKey, None)
+
+    def _isPutGlyphWrite(self, writeFunc):
+        return (
+            isinstance(writeFunc, functools.partial)
+            and writeFunc.func == self.backend.putGlyph
+        )
+
     @contextmanager
     def useConnection(self, connection):
         self.connections.add(connection)
+        connectionsForClient = self._connectionsByClientUUID[connection.clientUUID]
+        connectionsForClient.add(connection)
+        self._outgoingChangeQueues[connection] = OutgoingChangeQueue(connection)
         try:
             yield
         finally:
             self.connections.remove(connection)
+            self._outgoingChangeQueues.pop(connection).close()
+            connectionsForClient.discard(connection)
+            if not connectionsForClient:
+                del self._connectionsByClientUUID[connection.clientUUID]
 
     @remoteMethod
     async def getGlyph(self, glyphName, *, connection=None):
-        glyph = self.localData.get(("glyphs", glyphName))
+        glyph = self._getLocalData(("glyphs", glyphName))
         if glyph is None:
-            glyph = await self._getGlyph(glyphName)
-            self.localData[("glyphs", glyphName)] = glyph
+            glyphs = await self._loadOnce([("glyphs", glyphName)], self._loadGlyphs)
+            glyph = glyphs[("glyphs", glyphName)]
         return glyph
 
-    def _getGlyph(self, glyphName):
-        return asyncio.create_task(self._getGlyphFromBackend(glyphName))
+    @remoteMethod
+    async def getGlyphs(self, glyphNames, includeComponents=False, *, connection=None):
+        """Return a dict with the glyphs for `glyphNames`, in one go. Glyphs that
+        are not in the cache are loaded concurrently. Glyphs that don't exist are
+        returned as None.
+
+        If `includeComponents` is True, the result will also contain all glyphs
+        that the requested glyphs are made of, recursively.
+        """
+        glyphs = await self._getGlyphs(glyphNames)
+        if includeComponents:
+            todo = glyphNames
+            while todo:
+                componentNames = set()
+                for glyphName in todo:
+                    componentNames.update(self.glyphMadeOf.get(glyphName, ()))
+                todo = sorted(componentNames.difference(glyphs))
+                glyphs.update(await self._getGlyphs(todo))
+        return glyphs
 
-    async def _getGlyphFromBackend(self, glyphName):
-        glyph = await self.backend.getGlyph(glyphName)
-        if glyph is not None:
-            self.updateGlyphDependencies(glyphName, glyph)
-        return glyph
+    @remoteMethod
+    async def getGlyphBounds(self, glyphNames, layerNames=None, *, connection=None):
+        """Return a dict with the bounds of the glyphs for `glyphNames`, in one
+        go. For each glyph, the value is a {layerName: {"controlBounds": bounds,
+        "bounds": bounds}} dict, for the layers in `layerNames`, or for all
+        layers if `layerNames` is None. Bounds are (xMin, yMin, xMax, yMax)
+        tuples, or None for empty layers. Glyphs that don't exist are returned
+        as None.
+
+        Components are included: the glyphs they refer to are found via
+        glyphMadeOf, and loaded along with the requested glyphs. The bounds of
+        the paths are cached, so this is cheap for glyphs that are loaded
+        already.
+        """
+        glyphs = await self.getGlyphs(glyphNames, includeComponents=True)
+        return {
+            glyphName: (
+                getGlyphBounds(glyphs, glyphName, layerNames)
+                if glyphs[glyphName] is not None
+                else None
+            )
+            for glyphName in glyphNames
+        }
+
+    async def _getGlyphs(self, glyphNames):
+        glyphs = {}
+        for glyphName in glyphNames:
+            glyph = self._getLocalData(("glyphs", glyphName))
+            if glyph is not None:
+                glyphs[glyphName] = glyph
+        missingGlyphNames = [
+            glyphName
+            for glyphName in dict.fromkeys(glyphNames)
+            if glyphName not in glyphs
+        ]
+        if missingGlyphNames:
+            loadedGlyphs = await self._loadOnce(
+                [("glyphs", glyphName) for glyphName in missingGlyphNames],
+                self._loadGlyphs,
+            )
+            for (_, glyphName), glyph in loadedGlyphs.items():
+                glyphs[glyphName] = glyph
+        return {glyphName: glyphs.get(glyphName) for glyphName in glyphNames}
+
+    async def _loadOnce(self, keys, loadFunc):
+        # Load the data for `keys` with `loadFunc(keys)`, which returns a
+        # {key: data} dict. Loads are shared: keys that are already being
+        # loaded by a concurrent request are not loaded again, but the result
+        # of the in-flight load is awaited instead.
+        newKeys = [key for key in dict.fromkeys(keys) if key not in self._loadingTasks]
+        if newKeys:
+            task = asyncio.create_task(loadFunc(newKeys))
+            for key in newKeys:
+                self._loadingTasks[key] = task
+            task.add_done_callback(functools.partial(self._loadingTaskDone, newKeys))
+        tasks = {key: self._loadingTasks[key] for key in keys}
+        for task in dict.fromkeys(tasks.values()):
+            # Cancelling one request should not cancel the load for the others
+            await asyncio.shield(task)
+        return {key: task.result()[key] for key, task in tasks.items()}
+
+    def _loadingTaskDone(self, keys, task):
+        for key in keys:
+            if self._loadingTasks.get(key) is task:
+                del self._loadingTasks[key]
+
+    def _isCurrentLoad(self, key):
+        # Called from a load function: reloadData() drops the loading task of
+        # `key` while the backend data is being reloaded. The result of the
+        # load may then be stale, and must not be stored.
+        return self._loadingTasks.get(key) is asyncio.current_task()
+
+    async def _loadGlyphs(self, keys):
+        glyphs = await self._getGlyphsFromBackend([glyphName for _, glyphName in keys])
+        for glyphName, glyph in glyphs.items():
+            key = ("glyphs", glyphName)
+            if glyph is not None and self._isCurrentLoad(key):
+                self.localData[key] = glyph
+        return {("glyphs", glyphName): glyph for glyphName, glyph in glyphs.items()}
+
+    async def _getGlyphsFromBackend(self, glyphNames):
+        glyphs = {}
+        validationKeys = {}
+        if self.glyphDiskCache is not None and hasattr(
+            self.backend, "getGlyphValidationKey"
+        ):
+            allValidationKeys = await asyncio.gather(
+                *[
+                    self.backend.getGlyphValidationKey(glyphName)
+                    for glyphName in glyphNames
+                ]
+            )
+            validationKeys = {
+                glyphName: validationKey
+                for glyphName, validationKey in zip(glyphNames, allValidationKeys)
+                if validationKey is not None
+            }
+            glyphs.update(await self.glyphDiskCache.getGlyphs(validationKeys))
+
+        missingGlyphNames = [
+            glyphName for glyphName in glyphNames if glyphName not in glyphs
+        ]
+        if missingGlyphNames:
+            loadedGlyphs = await self._readGlyphsFromBackend(missingGlyphNames)
+            cacheItems = [
+                (glyphName, validationKeys[glyphName], glyph)
+                for glyphName, glyph in loadedGlyphs.items()
+                if glyph is not None
+                and glyphName in validationKeys
+                and self._isCurrentLoad(("glyphs", glyphName))
+            ]
+            if cacheItems:
+                await self.glyphDiskCache.putGlyphs(cacheItems)
+            glyphs.update(loadedGlyphs)
+
+        for glyphName, glyph in glyphs.items():
+            if glyph is not None:
+                self.updateGlyphDependencies(glyphName, glyph)
+                self._schedulePrefetch(glyphName)
+        return {glyphName: glyphs.get(glyphName) for glyphName in glyphNames}
+
+    async def _readGlyphsFromBackend(self, glyphNames):
+        if hasattr(self.backend, "getGlyphs"):
+            return await self.backend.getGlyphs(glyphNames)
+        glyphs = await asyncio.gather(
+            *[self.backend.getGlyph(glyphName) for glyphName in glyphNames]
+        )
+        return dict(zip(glyphNames, glyphs))
+
+    def _schedulePrefetch(self, glyphName):
+        # Load the components of glyphName in the background. As the prefetched
+        # glyphs in turn schedule their components, this loads the complete
+        # component closure into the cache.
+        if not self.prefetchComponents:
+            return
+        componentNames = [
+            componentName
+            for componentName in sorted(self.glyphMadeOf.get(glyphName, ()))
+            if ("glyphs", componentName) not in self.localData
+            and componentName not in self._prefetchingGlyphNames
+        ]
+        if not componentNames:
+            return
+        self._prefetchingGlyphNames.update(componentNames)
+        task = asyncio.create_task(self._prefetchGlyphs(componentNames))
+        self._backgroundTasks.add(task)
+        task.add_done_callback(self._backgroundTasks.discard)
+        task.add_done_callback(taskDoneHelper)
+
+    async def _prefetchGlyphs(self, glyphNames):
+        try:
+            await self._getGlyphs(glyphNames)
+        finally:
+            self._prefetchingGlyphNames.difference_update(glyphNames)
 
     async def getData(self, key):
-        data = self.localData.get(key)
+        data = self._getLocalData(key)
         if data is None:
+            loadedData = await self._loadOnce([key], self._loadData)
+            data = loadedData[key]
+        return data
+
+    async def _loadData(self, keys):
+        loadedData = {}
+        for key in keys:
             data = await self._getData(key)
-            self.localData[key] = data
+            if self._isCurrentLoad(key):
+                self.localData[key] = data
+            loadedData[key] = data
+        return loadedData
+
+    def _getLocalData(self, key):
+        data = self.localData.get(key)
+        if data is None:
+            # The data may have been evicted from the cache before it was
+            # written: the backend doesn't have the current version yet
+            data = self._unwrittenData.get(key)
+            if data is not None:
+                self.localData[key] = data
         return data
 
     async def _getData(self, key):
         getterName = backendGetterNames[key]
         return await getattr(self.backend, getterName)()
 
+    @remoteMethod
+    async def getCacheStatistics(self, *, connection):
+        return self.localData.getStatistics()
+
+    @remoteMethod
+    async def getConnectionStatistics(self, *, connection):
+        """Return a list with statistics about the outgoing message queue and
+        the traffic of each connected client.
+        """
+        statistics = []
+        for otherConnection, changeQueue in self._outgoingChangeQueues.items():
+            connectionStatistics = dict(
+                clientUUID=otherConnection.clientUUID,
+                numDroppedLiveChanges=changeQueue.numDroppedChanges,
+                numSquashedLiveChanges=changeQueue.numSquashedChanges,
+            )
+            if hasattr(otherConnection, "getOutgoingQueueStatistics"):
+                connectionStatistics.update(
+                    otherConnection.getOutgoingQueueStatistics()
+                )
+            if hasattr(otherConnection, "getTrafficStatistics"):
+                connectionStatistics.update(otherConnection.getTrafficStatistics())
+            statistics.append(connectionStatistics)
+        return statistics
+
     @remoteMethod
     async def getGlyphMap(self, *, connection):
         return await self.getData("glyphMap")
@@ -211,12 +648,6 @@ class FontHandler:
     async def getFontLib(self, *, connection):
         return await self.getData("lib")
 
-    def _getClientData(self, connection, key, default=None):
-        return self.clientData[connection.clientUUID].get(key, default)
-
-    def _setClientData(self, connection, key, value):
-        self.clientData[connection.clientUUID][key] = value
-
     @remoteMethod
     async def subscribeChanges(self, pathOrPattern, wantLiveChanges, *, connection):
         pattern = _ensurePattern(pathOrPattern)
@@ -231,8 +662,11 @@ class FontHandler:
 
     def _adjustMatchPattern(self, func, pathOrPattern, wantLiveChanges, connection):
         key = LIVE_CHANGES_PATTERN_KEY if wantLiveChanges else CHANGES_PATTERN_KEY
-        matchPattern = self._getClientData(connection, key, {})
-        self._setClientData(connection, key, func(matchPattern, pathOrPattern))
+        matchPatternIndex = self._matchPatternIndexes[key]
+        matchPattern = matchPatternIndex.getPattern(connection.clientUUID)
+        matchPatternIndex.setPattern(
+            connection.clientUUID, func(matchPattern, pathOrPattern)
+        )
 
     @remoteMethod
     async def editIncremental(self, liveChange, *, connection):
@@ -244,7 +678,14 @@ class FontHandler:
     ):
         # TODO: use finalChange, rollbackChange, editLabel for history recording
         # TODO: locking/checking
-        await self.updateLocalDataAndWriteToBackend(finalChange, connection)
+        journalEntryID = None
+        if self.changeJournal is not None and not self.readOnly:
+            journalEntryID = await self.changeJournal.addEntry(
+                finalChange, rollbackChange, editLabel
+            )
+        await self._updateLocalDataAndWriteToBackend(
+            finalChange, connection, False, journalEntryID
+        )
         # return {"error": "computer says no"}
         if broadcast:
             await self.broadcastChange(finalChange, connection, False)
@@ -255,19 +696,44 @@ class FontHandler:
         else:
             matchPatternKeys = [LIVE_CHANGES_PATTERN_KEY, CHANGES_PATTERN_KEY]
 
+        clientUUIDs = set()
+        for key in matchPatternKeys:
+            clientUUIDs.update(self._matchPatternIndexes[key].matchChange(change))
+
         connections = [
             connection
-            for connection in self.connections
+            for clientUUID in clientUUIDs
+            for connection in self._connectionsByClientUUID.get(clientUUID, ())
             if connection != sourceConnection
-            and any(
-                matchChangePattern(change, self._getClientData(connection, k, {}))
-                for k in matchPatternKeys
-            )
         ]
 
-        await asyncio.gather(
-            *[connection.proxy.externalChange(change) for connection in connections]
-        )
+        if not connections:
+            return
+
+        # Encode the change only once for all connections
+        encodedChange = PreEncodedJSON(change)
+        queues = [self._outgoingChangeQueues[connection] for connection in connections]
+        if isLiveChange:
+            # Don't wait for slow clients: unsent live changes get replaced
+            # by newer ones
+            for queue in queues:
+                queue.putLiveChange(change, encodedChange)
+        else:
+            # A recipient that disconnects or fails must not fail the edit of
+            # the sender
+            results = await asyncio.gather(
+                *[queue.putChange(change, encodedChange) for queue in queues],
+                return_exceptions=True,
+            )
+            for connection, result in zip(connections, results):
+                if isinstance(result, Exception) and not isinstance(
+                    result, ChangeQueueClosedError
+                ):
+                    logger.error(
+                        "error while sending change to %s: %r",
+                        connection.clientUUID,
+                        result,
+                    )
 
     async def updateLocalDataWithExternalChange(self, change):
         await self._updateLocalDataAndWriteToBackend(change, None, True)
@@ -276,7 +742,7 @@ class FontHandler:
         await self._updateLocalDataAndWriteToBackend(change, sourceConnection, False)
 
     async def _updateLocalDataAndWriteToBackend(
-        self, change, sourceConnection, isExternalChange
+        self, change, sourceConnection, isExternalChange, journalEntryID=None
     ):
         if isExternalChange:
             # The change is coming from the backend:
@@ -289,14 +755,23 @@ class FontHandler:
             if change is None:
                 return
 
-        rootKeys, rootObject = await self._prepareRootObject(change)
-        applyChange(rootObject, change)
-        await self._updateLocalData(
-            rootKeys,
-            rootObject,
-            sourceConnection,
-            not isExternalChange and not self.readOnly,
-        )
+        try:
+            rootKeys, rootObject = await self._prepareRootObject(change)
+            applyChange(rootObject, change)
+            await self._updateLocalData(
+                rootKeys,
+                rootObject,
+                sourceConnection,
+                not isExternalChange and not self.readOnly,
+                journalEntryID,
+            )
+        finally:
+            if (
+                journalEntryID is not None
+                and journalEntryID not in self._unwrittenJournalWriteKeys
+            ):
+                # Nothing was scheduled for writing
+                await self.changeJournal.acknowledge([journalEntryID])
 
     def _getLocalDataPattern(self):
         localPattern = {}
@@ -332,7 +807,7 @@ class FontHandler:
         return rootKeys, rootObject
 
     async def _updateLocalData(
-        self, rootKeys, rootObject, sourceConnection, writeToBackEnd
+        self, rootKeys, rootObject, sourceConnection, writeToBackEnd, journalEntryID
     ):
         for rootKey in rootKeys + sorted(rootObject._assignedAttributeNames):
             if rootKey == "glyphs":
@@ -340,24 +815,32 @@ class FontHandler:
                 glyphMap = await self.getData("glyphMap")
                 for glyphName in sorted(glyphSet.keys()):
                     writeKey = ("glyphs", glyphName)
-                    if glyphName in glyphSet.newKeys:
-                        self.localData[writeKey] = glyphSet[glyphName]
+                    # (Re-)insert, also for existing glyphs, so the estimated
+                    # size gets updated
+                    self.localData[writeKey] = glyphSet[glyphName]
                     if not writeToBackEnd:
                         continue
+                    self._unwrittenData[writeKey] = glyphSet[glyphName]
                     writeFunc = functools.partial(
                         self.backend.putGlyph,
                         glyphName,
-                        deepcopy(glyphSet[glyphName]),
+                        glyphSet[glyphName],
                         glyphMap.get(glyphName, []),
                     )
-                    await self.scheduleDataWrite(writeKey, writeFunc, sourceConnection)
+                    await self.scheduleDataWrite(
+                        writeKey, writeFunc, sourceConnection, journalEntryID
+                    )
                 for glyphName in sorted(glyphSet.deletedKeys):
                     writeKey = ("glyphs", glyphName)
                     _ = self.localData.pop(writeKey, None)
+                    _ = self._unwrittenData.pop(writeKey, None)
+                    self._setGlyphDependencies(glyphName, set())
                     if not writeToBackEnd:
                         continue
                     writeFunc = functools.partial(self.backend.deleteGlyph, glyphName)
-                    await self.scheduleDataWrite(writeKey, writeFunc, sourceConnection)
+                    await self.scheduleDataWrite(
+                        writeKey, writeFunc, sourceConnection, journalEntryID
+                    )
             else:
                 if rootKey in rootObject._assignedAttributeNames:
                     self.localData[rootKey] = getattr(rootObject, rootKey)
@@ -367,14 +850,20 @@ class FontHandler:
                 if method is None:
                     logger.info(f"No backend write method found for {rootKey}")
                     continue
-                writeFunc = functools.partial(method, deepcopy(rootObject[rootKey]))
-                await self.scheduleDataWrite(rootKey, writeFunc, sourceConnection)
-
-    async def scheduleDataWrite(self, writeKey, writeFunc, connection):
+                self._unwrittenData[rootKey] = rootObject[rootKey]
+                writeFunc = functools.partial(method, rootObject[rootKey])
+                await self.scheduleDataWrite(
+                    rootKey, writeFunc, sourceConnection, journalEntryID
+                )
+
+    async def scheduleDataWrite(
+        self, writeKey, writeFunc, connection, journalEntryID=None
+    ):
         if self._dataScheduledForWriting is None:
             # The write-"thread" is no longer running
             await self.reloadData(_writeKeyToPattern(writeKey))
-            await connection.proxy.messageFromServer(
+            await self._messageFromServer(
+                connection,
                 "The data could not be saved.",
                 "The edit has been reverted.\n\n"  # no trailing comma
                 "The Fontra server got itself into trouble, please contact an admin.",
@@ -382,26 +871,111 @@ class FontHandler:
             return
         shouldSignal = not self._dataScheduledForWriting
         self._dataScheduledForWriting[writeKey] = (writeFunc, connection)
+        if journalEntryID is not None:
+            self._journalEntriesByWriteKey[writeKey].append(journalEntryID)
+            self._unwrittenJournalWriteKeys.setdefault(journalEntryID, set()).add(
+                writeKey
+            )
+        now = asyncio.get_running_loop().time()
+        self._writeScheduleTimes.setdefault(writeKey, now)
+        self._lastWriteScheduleTime = now
         if shouldSignal:
             self._processWritesEvent.set()  # write: go!
             self._writingInProgressEvent.clear()
 
-    def iterGlyphMadeOf(self, glyphName):
+    def iterGlyphMadeOf(self, glyphName, seenGlyphNames=None):
+        if seenGlyphNames is None:
+            seenGlyphNames = set()
+        elif glyphName in seenGlyphNames:
+            # Avoid infinite recursion
+            return
+        seenGlyphNames.add(glyphName)
         for dependantGlyphName in self.glyphMadeOf.get(glyphName, ()):
             yield dependantGlyphName
-            yield from self.iterGlyphMadeOf(dependantGlyphName)
+            yield from self.iterGlyphMadeOf(dependantGlyphName, seenGlyphNames)
 
-    def iterGlyphUsedBy(self, glyphName):
+    def iterGlyphUsedBy(self, glyphName, seenGlyphNames=None):
+        if seenGlyphNames is None:
+            seenGlyphNames = set()
+        elif glyphName in seenGlyphNames:
+            # Avoid infinite recursion
+            return
+        seenGlyphNames.add(glyphName)
         for dependantGlyphName in self.glyphUsedBy.get(glyphName, ()):
             yield dependantGlyphName
-            yield from self.iterGlyphUsedBy(dependantGlyphName)
+            yield from self.iterGlyphUsedBy(dependantGlyphName, seenGlyphNames)
+
+    @remoteMethod
+    async def getGlyphsMadeOf(self, glyphName, *, connection=None):
+        """Return a sorted list of all glyph names that `glyphName` uses as a
+        component, recursively.
+        """
+        await self._waitForComponentGraph()
+        return sorted(set(self.iterGlyphMadeOf(glyphName)))
+
+    @remoteMethod
+    async def getGlyphsUsedBy(self, glyphName, *, connection=None):
+        """Return a sorted list of all glyph names that use `glyphName` as a
+        component, recursively.
+        """
+        await self._waitForComponentGraph()
+        return sorted(set(self.iterGlyphUsedBy(glyphName)))
+
+    def _ensureComponentGraphTask(self):
+        # Build the component dependencies for the entire font in the
+        # background, so glyphMadeOf and glyphUsedBy aren't limited to the
+        # glyphs that happen to be loaded.
+        if self._componentGraphTask is None:
+            if self._closed:
+                raise FontHandlerClosedError("the font handler is closed")
+            self._componentGraphTask = asyncio.create_task(self._buildComponentGraph())
+            self._componentGraphTask.add_done_callback(taskDoneHelper)
+        return self._componentGraphTask
+
+    async def _waitForComponentGraph(self):
+        task = self._ensureComponentGraphTask()
+        # Unlike awaiting the task, asyncio.wait() doesn't raise CancelledError
+        # when close() cancels the task
+        await asyncio.wait([task])
+        if task.cancelled():
+            raise FontHandlerClosedError("the font handler is closed")
+        task.result()
+
+    async def _buildComponentGraph(self):
+        if not hasattr(self.backend, "getComponentGraph"):
+            return
+        componentGraph = await self.backend.getComponentGraph()
+        for glyphName, componentNames in componentGraph.items():
+            writeKey = ("glyphs", glyphName)
+            if (
+                writeKey in self.localData
+                or writeKey in (self._dataScheduledForWriting or ())
+                or glyphName in self.glyphMadeOf
+            ):
+                # The glyph was loaded in the meantime: we already
+                # have up-to-date information
+                continue
+            self._setGlyphDependencies(glyphName, componentNames)
+        logger.info(f"found {len(componentGraph)} composite glyphs")
+
+    async def _updateComponentGraph(self, glyphNames):
+        if not hasattr(self.backend, "getComponentGraph"):
+            return
+        componentGraph = await self.backend.getComponentGraph(glyphNames)
+        for glyphName in glyphNames:
+            if ("glyphs", glyphName) not in self.localData:
+                self._setGlyphDependencies(
+                    glyphName, componentGraph.get(glyphName, set())
+                )
 
     def updateGlyphDependencies(self, glyphName, glyph):
+        self._setGlyphDependencies(glyphName, set(_iterAllComponentNames(glyph)))
+
+    def _setGlyphDependencies(self, glyphName, componentNames):
         # Zap previous used-by data for this glyph, if any
         for componentName in self.glyphMadeOf.get(glyphName, ()):
             if componentName in self.glyphUsedBy:
                 self.glyphUsedBy[componentName].discard(glyphName)
-        componentNames = set(_iterAllComponentNames(glyph))
         if componentNames:
             self.glyphMadeOf[glyphName] = componentNames
         elif glyphName in self.glyphMadeOf:
@@ -417,8 +991,17 @@ class FontHandler:
             if rootKey == "glyphs":
                 for glyphName in value:
                     self.localData.pop(("glyphs", glyphName), None)
+                    # Don't let new requests wait for possibly stale data
+                    self._loadingTasks.pop(("glyphs", glyphName), None)
+                    self._unwrittenData.pop(("glyphs", glyphName), None)
+                if self.glyphDiskCache is not None:
+                    await self.glyphDiskCache.deleteGlyphs(list(value))
+                if self._componentGraphTask is not None:
+                    await self._updateComponentGraph(list(value))
             else:
                 self.localData.pop(rootKey, None)
+                self._unwrittenData.pop(rootKey, None)
+                self._loadingTasks.pop(rootKey, None)
 
         logger.info(f"broadcasting external changes: {reloadPattern}")
 
@@ -428,16 +1011,20 @@ class FontHandler:
             connReloadPattern = patternIntersect(subscribePattern, reloadPattern)
             if connReloadPattern:
                 connections.append((connection, connReloadPattern))
-        await asyncio.gather(
+        results = await asyncio.gather(
             *[
                 connection.proxy.reloadData(connReloadPattern)
                 for connection, connReloadPattern in connections
-            ]
+            ],
+            return_exceptions=True,
         )
+        for (connection, _), result in zip(connections, results):
+            if isinstance(result, Exception):
+                _logConnectionError(connection, "reloading data on", result)
 
     def _getCombinedSubscribePattern(self, connection):
         patternA, patternB = [
-            self._getClientData(connection, key, {})
+            self._matchPatternIndexes[key].getPattern(connection.clientUUID)
             for key in [LIVE_CHANGES_PATTERN_KEY, CHANGES_PATTERN_KEY]
         ]
         return patternUnion(patternA, patternB)
@@ -461,6 +1048,42 @@ def _iterAllComponentNames(glyph):
             yield compo.name
 
 
+def estimateLocalDataSize(key, value):
+    """Return a rough estimate of the number of bytes `value` occupies in memory.
+    This does not need to be precise, but it needs to be cheap, and needs to
+    scale with the amount of data.
+    """
+    if isinstance(value, VariableGlyph):
+        return _estimateGlyphSize(value)
+    elif isinstance(value, dict):
+        # glyphMap, lib
+        return 256 + 160 * len(value)
+    return 1024
+
+
+def _estimateGlyphSize(glyph):
+    size = 512 + 256 * (len(glyph.axes) + len(glyph.sources))
+    for layer in glyph.layers.values():
+        path = layer.glyph.path
+        size += (
+            512
+            # The coordinates and point types are stored in arrays
+            + 8 * len(path.coordinates)
+            + len(path.pointTypes)
+            + 96 * len(path.contourInfo)
+            + 512 * len(layer.glyph.components)
+        )
+    return size
+
+
+def _logConnectionError(connection, action, error):
+    if isinstance(error, RemoteObjectConnectionException):
+        # The client disconnected, which is not an error of the server
+        logger.info("%s %s failed: %r", action, connection.clientUUID, error)
+    else:
+        logger.error("%s %s failed: %r", action, connection.clientUUID, error)
+
+
 def popFirstItem(d):
     key = next(iter(d))
     return (key, d.pop(key))
@@ -473,10 +1096,30 @@ def taskDoneHelper(task):
         )
 
 
+def _writeKeyToPath(writeKey):
+    return list(writeKey) if isinstance(writeKey, tuple) else [writeKey]
+
+
 def _writeKeyToPattern(writeKey):
-    if not isinstance(writeKey, tuple):
-        writeKey = (writeKey,)
-    return patternFromPath(writeKey)
+    return patternFromPath(_writeKeyToPath(writeKey))
+
+
+def _snapshotWriteFunc(writeFunc):
+    # Take a snapshot of the data to be written, so the write sees a consistent
+    # state, even if it runs in another thread and the live data gets edited in
+    # the meantime. This happens once per write, instead of once per edit.
+    if not isinstance(writeFunc, functools.partial):
+        return writeFunc
+    return functools.partial(
+        writeFunc.func, *deepcopy(writeFunc.args), **writeFunc.keywords
+    )
+
+
+def _writeKeysToPattern(writeKeys):
+    pattern = {}
+    for writeKey in writeKeys:
+        pattern = patternUnion(pattern, _writeKeyToPattern(writeKey))
+    return pattern
 
 
 def _ensurePattern(pathOrPattern):
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import logging
+import os
+import pathlib
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_COMPACT_THRESHOLD = 200
+
+
+class ChangeJournal:
+    """An append-only journal of final edits, stored as a JSON Lines file.
+
+    Each final change is added to the journal, along with its rollback change
+    and edit label, before it is applied. Once the backend has written all data
+    that the change touched, the entry is acknowledged. Unacknowledged entries
+    are the edits that would be lost if the server stopped before writing them:
+    they can be replayed after a restart.
+
+    Lines are written and fsynced in batches: concurrent addEntry() and
+    acknowledge() calls share a single fsync. The file is compacted by
+    rewriting it with only the unacknowledged entries, as soon as all entries
+    are acknowledged, or once compactThreshold entries have been acknowledged.
+
+    A change may touch several items that are written separately, such as
+    multiple glyphs. The paths of the items that have been written are
+    recorded with acknowledge(), so that only the unwritten part of the change
+    is replayed: many changes, such as list insertions, can't be applied
+    twice.
+
+    A crash after the backend wrote the data, but before the acknowledgement
+    was synced, causes the change to be replayed on data that already contains
+    it. The window is kept small by acknowledging right after each write.
+    """
+
+    def __init__(self, path, compactThreshold=DEFAULT_COMPACT_THRESHOLD):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.compactThreshold = compactThreshold
+        # entryID -> encoded line, for the unacknowledged entries
+        # entryID -> list of written paths, for partially written entries
+        self._entries, self._writtenPaths, isClean = _readEntries(self.path)
+        self._nextEntryID = max(self._entries, default=0) + 1
+        self._numAcknowledgedEntries = 0
+        self._file = open(self.path, "ab")
+        if not isClean:
+            # Don't append to a malformed line
+            self._rewriteFile(self._getCompactedLines())
+        self._pendingLines = []
+        self._compactRequested = False
+        self._numQueuedWrites = 0
+        self._numSyncedWrites = 0
+        self._writeTask = None
+
+    def close(self):
+        self._file.close()
+
+    def getUnacknowledgedEntries(self):
+        """Return a list of the unacknowledged entries, oldest first. Each entry
+        is a dict with "id", "change", "rollbackChange" and "editLabel" keys,
+        and a "writtenPaths" key, with the paths of the items that the change
+        touched, and that have already been written.
+        """
+        entries = []
+        for entryID, line in self._entries.items():
+            entry = json.loads(line)
+            entry["writtenPaths"] = self._writtenPaths.get(entryID, [])
+            entries.append(entry)
+        return entries
+
+    async def addEntry(self, change, rollbackChange, editLabel):
+        """Add an entry to the journal, and wait until it is on disk. Return the
+        entry ID, to be passed to acknowledge() once the change has been written.
+        """
+        entryID = self._nextEntryID
+        self._nextEntryID += 1
+        entry = dict(
+            id=entryID,
+            change=change,
+            rollbackChange=rollbackChange,
+            editLabel=editLabel,
+        )
+        line = _encodeLine(entry)
+        self._entries[entryID] = line
+        self._pendingLines.append(line)
+        await self._sync()
+        return entryID
+
+    async def acknowledge(self, entryIDs, writtenPaths=None):
+        """Mark the entries as written, and wait until that is on disk.
+
+        `writtenPaths` is an optional {entryID: paths} dict, for entries of
+        which only some items have been written so far. `paths` is a list of
+        paths, such as ["glyphs", "A"], of the written items.
+        """
+        entryIDs = [entryID for entryID in entryIDs if entryID in self._entries]
+        writtenPaths = [
+            [entryID, paths]
+            for entryID, paths in (writtenPaths or {}).items()
+            if entryID in self._entries and entryID not in entryIDs
+        ]
+        if not entryIDs and not writtenPaths:
+            return
+        for entryID in entryIDs:
+            del self._entries[entryID]
+            self._writtenPaths.pop(entryID, None)
+        for entryID, paths in writtenPaths:
+            self._writtenPaths.setdefault(entryID, []).extend(paths)
+        self._numAcknowledgedEntries += len(entryIDs)
+        if not self._entries or self._numAcknowledgedEntries >= self.compactThreshold:
+            self._compactRequested = True
+        else:
+            if entryIDs:
+                self._pendingLines.append(_encodeLine(dict(ack=entryIDs)))
+            if writtenPaths:
+                self._pendingLines.append(_encodeLine(dict(written=writtenPaths)))
+        await self._sync()
+
+    async def flush(self):
+        """Wait until everything that was added or acknowledged is on disk."""
+        if self._pendingLines or self._compactRequested:
+            await self._sync()
+
+    async def _sync(self):
+        self._numQueuedWrites += 1
+        target = self._numQueuedWrites
+        while self._numSyncedWrites < target:
+            if self._writeTask is None:
+                self._writeTask = asyncio.create_task(self._write())
+            # Cancelling one caller should not cancel the write for the others
+            await asyncio.shield(self._writeTask)
+
+    async def _write(self):
+        try:
+            numWrites = self._numQueuedWrites
+            loop = asyncio.get_running_loop()
+            if self._compactRequested:
+                # The unacknowledged entries include the pending ones: the
+                # pending lines don't need to be written separately
+                lines = self._getCompactedLines()
+                self._pendingLines = []
+                self._compactRequested = False
+                self._numAcknowledgedEntries = 0
+                await loop.run_in_executor(None, self._rewriteFile, lines)
+            else:
+                lines = self._pendingLines
+                self._pendingLines = []
+                await loop.run_in_executor(None, self._appendLines, lines)
+            self._numSyncedWrites = numWrites
+        finally:
+            self._writeTask = None
+
+    def _getCompactedLines(self):
+        lines = list(self._entries.values())
+        if self._writtenPaths:
+            lines.append(
+                _encodeLine(
+                    dict(written=[list(item) for item in self._writtenPaths.items()])
+                )
+            )
+        return lines
+
+    def _appendLines(self, lines):
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _rewriteFile(self, lines):
+        tempPath = self.path.with_name(self.path.name + ".tmp")
+        with open(tempPath, "wb") as f:
+            f.write(b"".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tempPath, self.path)
+        self._file = open(self.path, "ab")
+
+
+def _encodeLine(obj):
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def _readEntries(path):
+    entries = {}
+    writtenPaths = {}
+    isClean = True
+    if not path.exists():
+        return entries, writtenPaths, isClean
+    with open(path, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    if lines and not lines[-1].endswith(b"\n"):
+        isClean = False
+    for lineNumber, line in enumerate(lines, 1):
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            # A crash may have left an incomplete last line
+            logger.warning(f"skipping malformed line {lineNumber} in {path}")
+            isClean = False
+            continue
+        if "ack" in obj:
+            for entryID in obj["ack"]:
+                entries.pop(entryID, None)
+                writtenPaths.pop(entryID, None)
+        elif "written" in obj:
+            for entryID, paths in obj["written"]:
+                if entryID in entries:
+                    writtenPaths.setdefault(entryID, []).extend(paths)
+        else:
+            entries[obj["id"]] = line if line.endswith(b"\n") else line + b"\n"
+    return entries, writtenPaths, isClean
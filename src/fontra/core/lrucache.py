@@ -1,3 +1,7 @@
+import weakref
+from collections.abc import MutableMapping
+
+
 class LRUCache(dict):
     """A quick and dirty Least Recently Used cache, which leverages the fact
     that dictionaries keep their insertion order.
@@ -30,3 +34,158 @@ class LRUCache(dict):
         super().__setitem__(key, value)
         while len(self) > self._maxSize:
             del self[next(iter(self))]
+
+
+class CacheBudget:
+    """A memory budget in bytes, which can be shared by multiple SizedLRUCache
+    instances. When the combined size of the caches exceeds the budget, the
+    least recently used items of the largest cache get evicted first.
+    """
+
+    def __init__(self, maxBytes):
+        assert isinstance(maxBytes, int)
+        assert maxBytes > 0
+        self.maxBytes = maxBytes
+        # Keyed by id(), as the caches aren't hashable
+        self._caches = weakref.WeakValueDictionary()
+
+    def addCache(self, cache):
+        self._caches[id(cache)] = cache
+
+    @property
+    def totalBytes(self):
+        return sum(cache.totalBytes for cache in self._caches.values())
+
+    def enforce(self):
+        totalBytes = self.totalBytes
+        while totalBytes > self.maxBytes:
+            cache = max(self._caches.values(), key=lambda cache: cache.totalBytes)
+            numBytes = cache.evictOldest()
+            if numBytes is None:
+                break
+            totalBytes -= numBytes
+
+
+class SizedLRUCache(MutableMapping):
+    """A Least Recently Used cache that limits the total estimated size of its
+    values, instead of the number of items. `sizeFunc` is called with the key
+    and the value, and must return the estimated size of the value in bytes.
+
+    Optionally, the cache can participate in a `CacheBudget` that is shared
+    with other caches.
+
+    The items are kept in a wrapped dict rather than by subclassing dict, so
+    that all dict methods that add or remove items, such as update() and
+    setdefault(), go through the size accounting.
+    """
+
+    def __init__(self, maxBytes, sizeFunc, budget=None):
+        assert isinstance(maxBytes, int)
+        assert maxBytes > 0
+        self._maxBytes = maxBytes
+        self._sizeFunc = sizeFunc
+        self._items = {}
+        self._itemSizes = {}
+        self._budget = budget
+        self.totalBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if budget is not None:
+            budget.addCache(self)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._items!r})"
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __contains__(self, key):
+        # Don't count this as a use of the item
+        return key in self._items
+
+    def keys(self):
+        return self._items.keys()
+
+    def values(self):
+        return self._items.values()
+
+    def items(self):
+        return self._items.items()
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            self.misses += 1
+            value = default
+        else:
+            self.hits += 1
+        return value
+
+    def __getitem__(self, key):
+        items = self._items
+        value = items.pop(key)
+        # Move key/value to the end
+        items[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self._items:
+            # Ensure key/value get inserted at the end
+            del self[key]
+        size = self._sizeFunc(key, value)
+        self._items[key] = value
+        self._itemSizes[key] = size
+        self.totalBytes += size
+        while self.totalBytes > self._maxBytes and self.evictOldest() is not None:
+            pass
+        if self._budget is not None:
+            self._budget.enforce()
+
+    def __delitem__(self, key):
+        del self._items[key]
+        self.totalBytes -= self._itemSizes.pop(key)
+
+    def pop(self, key, *default):
+        if key in self._items:
+            value = self._items[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def clear(self):
+        self._items.clear()
+        self._itemSizes.clear()
+        self.totalBytes = 0
+
+    def evictOldest(self):
+        """Remove the least recently used item, and return its size, or return
+        None if the cache is empty.
+        """
+        if not self._items:
+            return None
+        key = next(iter(self._items))
+        size = self._itemSizes[key]
+        del self[key]
+        self.evictions += 1
+        return size
+
+    def getStatistics(self):
+        statistics = dict(
+            numItems=len(self),
+            totalBytes=self.totalBytes,
+            maxBytes=self._maxBytes,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
+        if self._budget is not None:
+            statistics["budgetTotalBytes"] = self._budget.totalBytes
+            statistics["budgetMaxBytes"] = self._budget.maxBytes
+        return statistics
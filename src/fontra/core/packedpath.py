@@ -1,8 +1,14 @@
+import base64
 import logging
 import math
+import sys
+from array import array
 from dataclasses import asdict, dataclass, field
 from enum import IntEnum
 
+from fontTools.pens.boundsPen import BoundsPen
+from fontTools.pens.pointPen import PointToSegmentPen
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,12 +25,126 @@ class PointType(IntEnum):
     ON_CURVE_SMOOTH = 0x08
 
 
+def _coordinatesArray():
+    return array("d")
+
+
+def _pointTypesArray():
+    return array("B")
+
+
 @dataclass
 class PackedPath:
-    coordinates: list[float] = field(default_factory=list)
-    pointTypes: list[PointType] = field(default_factory=list)
+    # The coordinates and point types are stored in arrays: array("d") for the
+    # coordinates, and array("B") for the point types, which are PointType
+    # values. Lists passed to the constructor are converted.
+    #
+    # Inserting or deleting points or contours changes the end points of all
+    # following contours. Rather than updating them right away, the shifts are
+    # recorded in _endPointShifts, and applied to the items of contourInfo in
+    # one go by _syncContourInfo(), when too many shifts have piled up, or when
+    # contourInfo is accessed: contourInfo is a property (see below) that
+    # syncs, around the list in _contourInfo. The methods that look up single
+    # end points use _contourInfo and the pending shifts instead.
+    #
+    # The arrays don't tell integral floats from ints, and drawPoints() writes
+    # integral coordinates as ints. So that a coordinate that was read as
+    # "12.0" is written back as "12.0", _floatFlags is an array("B") that has
+    # a 1 for each coordinate that was given as an integral float, or None if
+    # there are no such coordinates.
+    coordinates: array = field(default_factory=_coordinatesArray)
+    pointTypes: array = field(default_factory=_pointTypesArray)
     contourInfo: list[ContourInfo] = field(default_factory=list)
 
+    def __post_init__(self):
+        # {contourIndex: offset}: the end points of the contours from
+        # contourIndex onwards are to be shifted by offset
+        self._endPointShifts = {}
+        self._floatFlags = None
+        self.fieldsChanged()
+
+    def __eq__(self, other):
+        if type(other) is not PackedPath:
+            return NotImplemented
+        return (self.coordinates, self.pointTypes, self.contourInfo) == (
+            other.coordinates,
+            other.pointTypes,
+            other.contourInfo,
+        )
+
+    def _getContourInfo(self):
+        self._syncContourInfo()
+        return self._contourInfo
+
+    def _setContourInfo(self, contourInfo):
+        # The pending shifts apply to the items of the previous list
+        self._contourInfo = contourInfo
+        self._endPointShifts = {}
+
+    def _syncContourInfo(self):
+        # Apply the pending end point shifts to the items of _contourInfo
+        shifts = self._endPointShifts
+        if not shifts:
+            return
+        self._endPointShifts = {}
+        contourInfo = self._contourInfo
+        offset = 0
+        for contourIndex in range(min(shifts), len(contourInfo)):
+            offset += shifts.get(contourIndex, 0)
+            contourInfo[contourIndex].endPoint += offset
+
+    def fieldsChanged(self):
+        """Convert the coordinates and point types to arrays if they are not,
+        and invalidate the cached bounds. To be called after replacing fields
+        directly, rather than with the methods of PackedPath.
+        """
+        if type(self.coordinates) is not array:
+            self._floatFlags = _getFloatFlags(self.coordinates)
+            self.coordinates = array("d", self.coordinates)
+        elif self._floatFlags is not None and len(self._floatFlags) != len(
+            self.coordinates
+        ):
+            self._floatFlags = None
+        if type(self.pointTypes) is not array:
+            self.pointTypes = array("B", self.pointTypes)
+        # {"control": bounds, "exact": bounds}, see getControlBounds() and
+        # getBounds(). Not a field, so it is ignored by __eq__() and asdict().
+        self._boundsCache = None
+
+    def clearFloatFlags(self):
+        """Forget which coordinates were given as integral floats. To be called
+        before modifying the coordinates array directly.
+        """
+        self._floatFlags = None
+
+    @classmethod
+    def fromDict(cls, d):
+        """Return a PackedPath for `d`, a dict as produced by packedPathToDict(),
+        or as received from a client. A PackedPath instance is returned as is.
+        """
+        if isinstance(d, PackedPath):
+            return d
+        return cls(
+            coordinates=d.get("coordinates", ()),
+            pointTypes=d.get("pointTypes", ()),
+            contourInfo=[ContourInfo(**info) for info in d.get("contourInfo", ())],
+        )
+
+    def __deepcopy__(self, memo):
+        # Much faster than the generic deepcopy: the coordinates and point types
+        # are numbers, which don't need to be copied individually
+        path = PackedPath(
+            coordinates=self.coordinates[:],
+            pointTypes=self.pointTypes[:],
+            contourInfo=[
+                ContourInfo(endPoint=info.endPoint, isClosed=info.isClosed)
+                for info in self.contourInfo
+            ],
+        )
+        if self._floatFlags is not None:
+            path._floatFlags = self._floatFlags[:]
+        return path
+
     @classmethod
     def fromUnpackedContours(cls, unpackedContours):
         coordinates = []
@@ -45,7 +165,7 @@ class PackedPath:
 
     def unpackedContours(self):
         unpackedContours = []
-        coordinates = self.coordinates
+        coordinates = _coordinatesToList(self.coordinates, self._floatFlags)
         pointTypes = self.pointTypes
         startIndex = 0
         for contourInfo in self.contourInfo:
@@ -56,12 +176,18 @@ class PackedPath:
         return unpackedContours
 
     def drawPoints(self, pen):
+        floatFlags = self._floatFlags
         startPoint = 0
         for contourInfo in self.contourInfo:
             endIndex = contourInfo.endPoint + 1
-            coordinates = self.coordinates[startPoint * 2 : endIndex * 2]
+            coordinates = _coordinatesToList(
+                self.coordinates[startPoint * 2 : endIndex * 2],
+                None
+                if floatFlags is None
+                else floatFlags[startPoint * 2 : endIndex * 2],
+            )
             points = list(pairwise(coordinates))
-            pointTypes = self.pointTypes[startPoint:endIndex]
+            pointTypes = self.pointTypes[startPoint:endIndex].tolist()
             if not contourInfo.isClosed:
                 # strip leading and trailing off-curve points, they cause
                 # validation problems
@@ -99,30 +225,121 @@ class PackedPath:
             pen.endPath()
             startPoint = endIndex
 
+    def getControlBounds(self):
+        """Return the bounds of all points, including the off-curve points, as
+        an (xMin, yMin, xMax, yMax) tuple, or None if the path has no points.
+
+        The result is cached until the path is changed with one of its methods,
+        or with applyChange(), which invalidates the cache when needed.
+        """
+        return self._getCachedBounds("control", self._computeControlBounds)
+
+    def getBounds(self):
+        """Return the exact bounds of the outline, as an (xMin, yMin, xMax, yMax)
+        tuple, or None if the path has no points. The result is cached, see
+        getControlBounds().
+        """
+        return self._getCachedBounds("exact", self._computeBounds)
+
+    def invalidateBounds(self):
+        self._boundsCache = None
+
+    def _getCachedBounds(self, key, computeFunc):
+        if self._boundsCache is None:
+            self._boundsCache = {}
+        bounds = self._boundsCache.get(key, _notCached)
+        if bounds is _notCached:
+            bounds = self._boundsCache[key] = computeFunc()
+        return bounds
+
+    def _computeControlBounds(self):
+        coordinates = self.coordinates
+        if not coordinates:
+            return None
+        xs = coordinates[0::2]
+        ys = coordinates[1::2]
+        return (min(xs), min(ys), max(xs), max(ys))
+
+    def _computeBounds(self):
+        if _OFF_CURVE_CUBIC not in self.pointTypes and (
+            _OFF_CURVE_QUAD not in self.pointTypes
+        ):
+            # Only on-curve points: the outline goes through all points
+            return self.getControlBounds()
+        pen = BoundsPen(None)
+        self.drawPoints(PointToSegmentPen(pen))
+        return pen.bounds
+
     def setPointPosition(self, pointIndex, x, y):
+        pointIndex = self._normalizePointIndex(pointIndex)
+        self._boundsCache = None
         coords = self.coordinates
         i = pointIndex * 2
+        self._updateFloatFlags(i, i + 2, (x, y))
         coords[i] = x
         coords[i + 1] = y
 
+    def setPointPositions(self, pointIndices, coordinates):
+        """Set the positions of the points at `pointIndices`. `coordinates` is a
+        flat sequence of x, y pairs, one for each point index.
+        """
+        if len(coordinates) != 2 * len(pointIndices):
+            raise ValueError("the number of coordinates doesn't match the points")
+        if not pointIndices:
+            return
+        pointIndices = [self._normalizePointIndex(i) for i in pointIndices]
+        self._boundsCache = None
+        coords = self.coordinates
+        firstIndex = pointIndices[0]
+        numPoints = len(pointIndices)
+        if pointIndices[-1] == firstIndex + numPoints - 1 and all(
+            b - a == 1 for a, b in zip(pointIndices, pointIndices[1:])
+        ):
+            # A contiguous run of points, such as a whole contour: a single
+            # slice assignment
+            self._updateFloatFlags(
+                firstIndex * 2, (firstIndex + numPoints) * 2, coordinates
+            )
+            coords[firstIndex * 2 : (firstIndex + numPoints) * 2] = array(
+                "d", coordinates
+            )
+            return
+        for pointIndex, (x, y) in zip(pointIndices, pairwise(coordinates)):
+            i = pointIndex * 2
+            self._updateFloatFlags(i, i + 2, (x, y))
+            coords[i] = x
+            coords[i + 1] = y
+
     def deleteContour(self, contourIndex):
         contourIndex = self._normalizeContourIndex(contourIndex)
-        contour = self.contourInfo[contourIndex]
         startPoint = self._getContourStartPoint(contourIndex)
-        numPoints = contour.endPoint + 1 - startPoint
+        numPoints = self._getEndPoint(contourIndex) + 1 - startPoint
         self._replacePoints(startPoint, numPoints, [], [])
-        del self.contourInfo[contourIndex]
+        del self._contourInfo[contourIndex]
+        # The shifts for the following contours move down with them
+        self._endPointShifts = _reindexShifts(
+            self._endPointShifts, contourIndex + 1, -1
+        )
         self._moveEndPoints(contourIndex, -numPoints)
 
     def insertContour(self, contourIndex, contour):
         contourIndex = self._normalizeContourIndex(contourIndex, True)
         startPoint = self._getContourStartPoint(contourIndex)
+        numPoints = len(contour["pointTypes"])
         self._replacePoints(
             startPoint, 0, contour["coordinates"], contour["pointTypes"]
         )
-        contourInfo = ContourInfo(endPoint=startPoint - 1, isClosed=contour["isClosed"])
-        self.contourInfo.insert(contourIndex, contourInfo)
-        self._moveEndPoints(contourIndex, len(contour["pointTypes"]))
+        # The shifts for the contours that follow the new one move up with
+        # them. The shifts for the preceding contours also apply to the new
+        # one, so they are subtracted from its end point.
+        self._endPointShifts = _reindexShifts(self._endPointShifts, contourIndex, 1)
+        endPoint = startPoint + numPoints - 1
+        for fromContourIndex, offset in self._endPointShifts.items():
+            if fromContourIndex < contourIndex:
+                endPoint -= offset
+        contourInfo = ContourInfo(endPoint=endPoint, isClosed=contour["isClosed"])
+        self._contourInfo.insert(contourIndex, contourInfo)
+        self._moveEndPoints(contourIndex + 1, numPoints)
 
     def deletePoint(self, contourIndex, contourPointIndex):
         contourIndex = self._normalizeContourIndex(contourIndex)
@@ -137,15 +354,19 @@ class PackedPath:
         self._replacePoints(pointIndex, 0, [point["x"], point["y"]], [pointType])
         self._moveEndPoints(contourIndex, 1)
 
+    def _getEndPoint(self, contourIndex):
+        endPoint = self._contourInfo[contourIndex].endPoint
+        for fromContourIndex, offset in self._endPointShifts.items():
+            if fromContourIndex <= contourIndex:
+                endPoint += offset
+        return endPoint
+
     def _getContourStartPoint(self, contourIndex):
-        return (
-            0 if contourIndex == 0 else self.contourInfo[contourIndex - 1].endPoint + 1
-        )
+        return 0 if contourIndex == 0 else self._getEndPoint(contourIndex - 1) + 1
 
     def _getAbsolutePointIndex(self, contourIndex, contourPointIndex, forInsert=False):
         startPoint = self._getContourStartPoint(contourIndex)
-        contour = self.contourInfo[contourIndex]
-        numPoints = contour.endPoint + 1 - startPoint
+        numPoints = self._getEndPoint(contourIndex) + 1 - startPoint
         originalContourPointIndex = contourPointIndex
         if contourPointIndex < 0:
             contourPointIndex += numPoints
@@ -157,9 +378,18 @@ class PackedPath:
             )
         return startPoint + contourPointIndex
 
+    def _normalizePointIndex(self, pointIndex):
+        originalPointIndex = pointIndex
+        numPoints = len(self.pointTypes)
+        if pointIndex < 0:
+            pointIndex += numPoints
+        if pointIndex < 0 or pointIndex >= numPoints:
+            raise IndexError(f"pointIndex out of bounds: {originalPointIndex}")
+        return pointIndex
+
     def _normalizeContourIndex(self, contourIndex, forInsert=False):
         originalContourIndex = contourIndex
-        numContours = len(self.contourInfo)
+        numContours = len(self._contourInfo)
         if contourIndex < 0:
             contourIndex += numContours
         bias = 1 if forInsert else 0
@@ -168,76 +398,212 @@ class PackedPath:
         return contourIndex
 
     def _replacePoints(self, startPoint, numPoints, coordinates, pointTypes):
+        self._boundsCache = None
         dblIndex = startPoint * 2
-        self.coordinates[dblIndex : dblIndex + numPoints * 2] = coordinates
-        self.pointTypes[startPoint : startPoint + numPoints] = pointTypes
+        self._updateFloatFlags(dblIndex, dblIndex + numPoints * 2, coordinates)
+        self.coordinates[dblIndex : dblIndex + numPoints * 2] = array("d", coordinates)
+        self.pointTypes[startPoint : startPoint + numPoints] = array("B", pointTypes)
+
+    def _updateFloatFlags(self, start, stop, coordinates):
+        # To be called before the coordinates from start to stop are replaced
+        # by `coordinates`
+        floatFlags = self._floatFlags
+        if floatFlags is None:
+            if not any(_isIntegralFloat(c) for c in coordinates):
+                return
+            floatFlags = self._floatFlags = array("B", bytes(len(self.coordinates)))
+        floatFlags[start:stop] = array("B", map(_isIntegralFloat, coordinates))
 
     def _moveEndPoints(self, fromContourIndex, offset):
-        for contourInfo in self.contourInfo[fromContourIndex:]:
-            contourInfo.endPoint += offset
+        numContours = len(self._contourInfo)
+        if fromContourIndex >= numContours:
+            return
+        shifts = self._endPointShifts
+        offset += shifts.get(fromContourIndex, 0)
+        if offset:
+            shifts[fromContourIndex] = offset
+        else:
+            shifts.pop(fromContourIndex, None)
+        # Looking up an end point costs O(len(shifts)), syncing O(numContours):
+        # sync once in a while to keep both in check
+        if len(shifts) > max(_MIN_MAX_END_POINT_SHIFTS, math.isqrt(numContours)):
+            self._syncContourInfo()
+
+
+# A property rather than a plain field, so that code outside this module, such
+# as dataclasses.asdict(), never sees end points with pending shifts. It is set
+# after the class is made, so the dataclass still sees contourInfo as a field.
+PackedPath.contourInfo = property(
+    PackedPath._getContourInfo, PackedPath._setContourInfo
+)
+
+
+_MIN_MAX_END_POINT_SHIFTS = 8
+
+
+def _reindexShifts(shifts, fromContourIndex, indexOffset):
+    # Return a copy of the end point shifts, in which the shifts for the
+    # contours from fromContourIndex onwards are moved by indexOffset. Shifts
+    # that end up at the same index are combined.
+    reindexedShifts = {}
+    for contourIndex, offset in shifts.items():
+        if contourIndex >= fromContourIndex:
+            contourIndex += indexOffset
+        offset += reindexedShifts.get(contourIndex, 0)
+        if offset:
+            reindexedShifts[contourIndex] = offset
+        else:
+            reindexedShifts.pop(contourIndex, None)
+    return reindexedShifts
+
+
+def packedPathToDict(path):
+    """Return a JSON-compatible version of `path`, with the coordinates and the
+    point types as lists. The items of contourInfo are left as they are.
+    """
+    return dict(
+        coordinates=_coordinatesToList(path.coordinates),
+        pointTypes=path.pointTypes.tolist(),
+        contourInfo=path.contourInfo,
+    )
+
+
+def packedPathToBinaryDict(path):
+    """Return a JSON-compatible version of `path`, in which the coordinates and
+    point types are base64-encoded little-endian typed arrays:
+
+        {"type": "float32", "data": "AAAAAAAAyEI..."}
+
+    The coordinates are encoded as int16 if they are all integers in range,
+    else as float32 if that doesn't lose precision, else as float64. The point
+    types are encoded as uint8. The items of contourInfo are left as they are.
+    The float64 coordinates and the point types are encoded straight from the
+    arrays of the path, without conversion.
+
+    This is more compact than the plain JSON number arrays, and much faster to
+    decode for the client. See VarPackedPath.fromObject() in var-path.js.
+    """
+    coordinates = path.coordinates
+    values = coordinates.tolist()
+    if (
+        all(map(float.is_integer, values))
+        and min(values, default=0) >= -0x8000
+        and max(values, default=0) < 0x8000
+    ):
+        coordinates = array("h", map(int, values))
+    else:
+        float32Coordinates = array("f", values)
+        if float32Coordinates == coordinates:
+            coordinates = float32Coordinates
+    return dict(
+        coordinates=_encodeTypedArray(coordinates),
+        pointTypes=_encodeTypedArray(path.pointTypes),
+        contourInfo=path.contourInfo,
+    )
+
+
+_typedArrayTypes = {"h": "int16", "f": "float32", "d": "float64", "B": "uint8"}
+
+
+def _encodeTypedArray(values):
+    if sys.byteorder == "big" and values.itemsize > 1:
+        values = values[:]  # don't swap the bytes of the original
+        values.byteswap()
+    return dict(
+        type=_typedArrayTypes[values.typecode],
+        data=base64.b64encode(values).decode("ascii"),
+    )
+
+
+_notCached = object()
+
+
+# Plain int versions of the point types, for the hot path of PackedPathPointPen
+_ON_CURVE = int(PointType.ON_CURVE)
+_ON_CURVE_SMOOTH = int(PointType.ON_CURVE_SMOOTH)
+_OFF_CURVE_CUBIC = int(PointType.OFF_CURVE_CUBIC)
+_OFF_CURVE_QUAD = int(PointType.OFF_CURVE_QUAD)
+
+_onCurveSegmentTypes = frozenset(["move", "line", "curve", "qcurve"])
 
 
 class PackedPathPointPen:
+    """A point pen that builds a PackedPath.
+
+    The coordinates and point types are collected in flat lists as the points
+    come in, and converted to arrays in one go by getPath(). Off-curve points
+    are assumed to be cubic: the points that precede a "qcurve" point are
+    changed to quadratic in endPath(), which is only needed for contours that
+    contain quadratic segments.
+    """
+
     def __init__(self):
         self.coordinates = []
         self.pointTypes = []
         self.contourInfo = []
         self.components = []
-        self._currentContour = None
+        self._contourStart = None
+        self._isClosed = True
+        self._qcurveIndices = None
 
     def getPath(self):
+        # The coordinates are passed as a list, so PackedPath can tell the
+        # integral floats from the ints
         return PackedPath(
             self.coordinates,
-            [PointType(tp) for tp in self.pointTypes],
+            array("B", self.pointTypes),
             self.contourInfo,
         )
 
     def beginPath(self, **kwargs):
-        self._currentContour = []
+        self._contourStart = len(self.pointTypes)
+        self._isClosed = True
+        self._qcurveIndices = []
 
     def addPoint(self, pt, segmentType=None, smooth=False, *args, **kwargs):
-        self._currentContour.append((pt, segmentType, smooth))
+        self.coordinates.extend(pt)
+        if segmentType is None:
+            self.pointTypes.append(_OFF_CURVE_CUBIC)
+            return
+        if segmentType not in _onCurveSegmentTypes:
+            raise TypeError(f"unexpected segment type: {segmentType}")
+        if segmentType == "qcurve":
+            self._qcurveIndices.append(len(self.pointTypes))
+        elif segmentType == "move":
+            self._isClosed = False
+        self.pointTypes.append(_ON_CURVE_SMOOTH if smooth else _ON_CURVE)
 
     def endPath(self):
-        if not self._currentContour:
+        contourStart = self._contourStart
+        self._contourStart = None
+        pointTypes = self.pointTypes
+        numPoints = len(pointTypes) - contourStart
+        if not numPoints:
             return
-        isClosed = self._currentContour[0][1] != "move"
-        isQuadBlob = all(
-            segmentType is None for _, segmentType, _ in self._currentContour
-        )
-        if isQuadBlob:
-            self.pointTypes.extend(
-                [PointType.OFF_CURVE_QUAD] * len(self._currentContour)
-            )
-            for pt, _, _ in self._currentContour:
-                self.coordinates.extend(pt)
-        else:
-            pointTypes = []
-            for pt, segmentType, smooth in self._currentContour:
-                if segmentType is None:
-                    pointTypes.append(PointType.OFF_CURVE_CUBIC)
-                elif segmentType in {"move", "line", "curve", "qcurve"}:
-                    pointTypes.append(
-                        PointType.ON_CURVE_SMOOTH if smooth else PointType.ON_CURVE
-                    )
-                else:
-                    raise TypeError(f"unexpected segment type: {segmentType}")
-
-                self.coordinates.extend(pt)
-            assert len(pointTypes) == len(self._currentContour)
-            # Fix the quad point types
-            for i, (_, segmentType, _) in enumerate(self._currentContour):
-                if segmentType == "qcurve":
-                    stopIndex = i - len(pointTypes) if isClosed else -1
-                    for j in range(i - 1, stopIndex, -1):
-                        if pointTypes[j] != PointType.OFF_CURVE_CUBIC:
-                            break
-                        pointTypes[j] = PointType.OFF_CURVE_QUAD
-            self.pointTypes.extend(pointTypes)
-        self.contourInfo.append(
-            ContourInfo(endPoint=len(self.coordinates) // 2 - 1, isClosed=isClosed)
-        )
-        self._currentContour = None
+        if (
+            pointTypes[contourStart] == _OFF_CURVE_CUBIC
+            and pointTypes[contourStart:].count(_OFF_CURVE_CUBIC) == numPoints
+        ):
+            # A contour without on-curve points is a closed quadratic "blob"
+            pointTypes[contourStart:] = [_OFF_CURVE_QUAD] * numPoints
+        elif self._qcurveIndices:
+            for pointIndex in self._qcurveIndices:
+                self._fixQuadPointTypes(pointIndex, contourStart, numPoints)
+        self.contourInfo.append(ContourInfo(len(pointTypes) - 1, self._isClosed))
+
+    def _fixQuadPointTypes(self, pointIndex, contourStart, numPoints):
+        # Change the off-curve points preceding the "qcurve" point at
+        # pointIndex to quadratic, wrapping around for closed contours
+        pointTypes = self.pointTypes
+        for i in range(1, numPoints):
+            j = pointIndex - i
+            if j < contourStart:
+                if not self._isClosed:
+                    break
+                j += numPoints
+            if pointTypes[j] != _OFF_CURVE_CUBIC:
+                break
+            pointTypes[j] = _OFF_CURVE_QUAD
 
     def addComponent(self, glyphName, transformation, **kwargs):
         from .classes import Component, Transformation
@@ -314,6 +680,29 @@ _pointToSegmentType = {
 }
 
 
+def _coordinatesToList(coordinates, floatFlags=None):
+    # Integral values as int, so they get written as "12" rather than "12.0",
+    # except for the ones flagged in floatFlags, see PackedPath
+    values = coordinates.tolist()
+    if floatFlags is not None and any(floatFlags):
+        return [
+            int(c) if c.is_integer() and not isFloat else c
+            for c, isFloat in zip(values, floatFlags)
+        ]
+    if all(map(float.is_integer, values)):
+        return list(map(int, values))
+    return [int(c) if c.is_integer() else c for c in values]
+
+
+def _isIntegralFloat(value):
+    return type(value) is float and value.is_integer()
+
+
+def _getFloatFlags(coordinates):
+    floatFlags = array("B", map(_isIntegralFloat, coordinates))
+    return floatFlags if any(floatFlags) else None
+
+
 def pairwise(iterable):
     it = iter(iterable)
     return zip(it, it)
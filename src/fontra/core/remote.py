@@ -1,37 +1,128 @@
 import asyncio
+import json
 import logging
 import traceback
-from dataclasses import asdict, is_dataclass
+from collections import deque
 
 from aiohttp import WSMsgType
 
+from .classes import unstructure
+from .packedpath import PackedPath, packedPathToBinaryDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
+# When this many messages are waiting to be sent, droppable messages get dropped
+DEFAULT_DROP_THRESHOLD = 64
+# When this many messages are waiting to be sent, the client is disconnected
+DEFAULT_MAX_OUTGOING_QUEUE_SIZE = 1024
+
+
 class RemoteObjectConnectionException(Exception):
     pass
 
 
+class PreEncodedJSON:
+    """A value that has already been encoded as JSON. When passed as an argument
+    to a RemoteClientProxy method, the encoded text is inserted into the message
+    as is. This allows a value that is sent to many clients to be encoded only
+    once. As not all clients may be able to decode binary paths, the value is
+    encoded without them.
+    """
+
+    __slots__ = ["text"]
+
+    def __init__(self, value):
+        self.text = encodeJSON(value)
+
+
 class RemoteObjectConnection:
-    def __init__(self, websocket, path, subject, verboseErrors):
+    def __init__(
+        self,
+        websocket,
+        path,
+        subject,
+        verboseErrors,
+        *,
+        dropThreshold=DEFAULT_DROP_THRESHOLD,
+        maxOutgoingQueueSize=DEFAULT_MAX_OUTGOING_QUEUE_SIZE,
+    ):
         self.websocket = websocket
         self.path = path
         self.subject = subject
         self.verboseErrors = verboseErrors
+        self.dropThreshold = dropThreshold
+        self.maxOutgoingQueueSize = maxOutgoingQueueSize
         self.clientUUID = None
+        # Set during the handshake if the client can decode binary paths
+        self.binaryPaths = False
         self.callReturnFutures = {}
         self.getNextServerCallID = _genNextServerCallID()
+        self._outgoingMessages = deque()
+        self._outgoingMessagesEvent = asyncio.Event()
+        self._writerTask = None
+        self._closeTask = None
+        self.isClosed = False
+        self.numSentMessages = 0
+        self.numBytesSent = 0
+        self.numBytesReceived = 0
+        self.numDroppedMessages = 0
+        self.maxOutgoingQueueDepth = 0
 
     @property
     def proxy(self):
         return RemoteClientProxy(self)
 
-    async def handleConnection(self):
+    @property
+    def droppableProxy(self):
+        """A proxy for calls that may be dropped when the client can't keep up,
+        such as live changes. A dropped call returns None.
+        """
+        return RemoteClientProxy(self, droppable=True)
+
+    def getOutgoingQueueStatistics(self):
+        return dict(
+            queueDepth=len(self._outgoingMessages),
+            maxQueueDepth=self.maxOutgoingQueueDepth,
+            numSentMessages=self.numSentMessages,
+            numDroppedMessages=self.numDroppedMessages,
+        )
+
+    def getTrafficStatistics(self):
+        """Return the number of bytes sent and received. These are the sizes
+        of the messages before compression. If the websocket counts them (see
+        FontraWebSocketResponse in server.py), the number of bytes that went
+        over the wire are included as well.
+        """
+        statistics = dict(
+            numBytesSent=self.numBytesSent,
+            numBytesReceived=self.numBytesReceived,
+        )
+        for name in ["numWireBytesSent", "numWireBytesReceived"]:
+            value = getattr(self.websocket, name, None)
+            if value is not None:
+                statistics[name] = value
+        return statistics
+
+    async def receiveClientUUID(self):
         message = await anext(aiter(self.websocket))
         message = message.json()
         self.clientUUID = message.get("client-uuid")
         if self.clientUUID is None:
             raise RemoteObjectConnectionException("unrecognized message")
+        self.binaryPaths = message.get("path-encoding") == "base64"
+
+    def encodeJSON(self, value):
+        return encodeJSON(value, binaryPaths=self.binaryPaths)
+
+    async def handleConnection(self):
+        if self.clientUUID is None:
+            await self.receiveClientUUID()
         try:
             await self._handleConnection()
         # except websockets.exceptions.ConnectionClosedError as e:
@@ -41,6 +132,21 @@ class RemoteObjectConnection:
             if self.verboseErrors:
                 traceback.print_exc()
             await self.websocket.close()
+        finally:
+            self._close()
+
+    def _close(self):
+        self.isClosed = True
+        if self._writerTask is not None:
+            self._writerTask.cancel()
+        self._outgoingMessages.clear()
+        # Nobody is going to answer these calls anymore
+        for returnFuture in self.callReturnFutures.values():
+            if not returnFuture.done():
+                returnFuture.set_exception(
+                    RemoteObjectConnectionException("connection closed")
+                )
+        self.callReturnFutures.clear()
 
     async def _handleConnection(self):
         tasks = []
@@ -50,6 +156,7 @@ class RemoteObjectConnection:
                 # message.json() will fail with a TypeError.
                 # https://github.com/aio-libs/aiohttp/issues/7313#issuecomment-1586150267
                 raise message.data
+            self.numBytesReceived += _utf8Length(message.data)
             message = message.json()
 
             if message.get("connection") == "close":
@@ -83,15 +190,11 @@ class RemoteObjectConnection:
             methodHandler = getattr(subject, methodName, None)
             if getattr(methodHandler, "fontraRemoteMethod", False):
                 returnValue = await methodHandler(*arguments, connection=self)
-                if is_dataclass(returnValue):
-                    returnValue = asdict(returnValue)
-                elif (
-                    isinstance(returnValue, list)
-                    and returnValue
-                    and is_dataclass(returnValue[0])
-                ):
-                    returnValue = [asdict(item) for item in returnValue]
-                response = {"client-call-id": clientCallID, "return-value": returnValue}
+                # Encode right away: the return value may be live data, which
+                # may change before the writer task gets to send the response
+                response = self.encodeJSON(
+                    {"client-call-id": clientCallID, "return-value": returnValue}
+                )
             else:
                 response = {
                     "client-call-id": clientCallID,
@@ -102,15 +205,69 @@ class RemoteObjectConnection:
             if self.verboseErrors:
                 traceback.print_exc()
             response = {"client-call-id": clientCallID, "exception": repr(e)}
-        await self.sendMessage(response)
+        try:
+            await self.sendMessage(response)
+        except RemoteObjectConnectionException as e:
+            logger.info(f"can't send response: {e!r}")
 
-    async def sendMessage(self, message):
-        await self.websocket.send_json(message)
+    async def sendMessage(self, message, droppable=False):
+        """Queue `message` for sending. `message` is either a JSON-compatible
+        dict, or a string containing an already encoded message. This does not
+        wait for the message to be sent. Return False if the message was
+        dropped, True otherwise.
+
+        Messages are sent by a separate writer task, so a slow client doesn't
+        block whoever is sending. If the client can't keep up, droppable
+        messages get dropped, and if the queue fills up completely, the client
+        gets disconnected.
+        """
+        if self.isClosed:
+            raise RemoteObjectConnectionException("connection is closed")
+        queueDepth = len(self._outgoingMessages)
+        if droppable and queueDepth >= self.dropThreshold:
+            self.numDroppedMessages += 1
+            return False
+        if queueDepth >= self.maxOutgoingQueueSize:
+            logger.warning(
+                f"client {self.clientUUID} can't keep up with {queueDepth} "
+                "pending messages, disconnecting"
+            )
+            self._disconnect()
+            raise RemoteObjectConnectionException("client can't keep up")
+        self._outgoingMessages.append(message)
+        self.maxOutgoingQueueDepth = max(self.maxOutgoingQueueDepth, queueDepth + 1)
+        self._outgoingMessagesEvent.set()
+        if self._writerTask is None:
+            self._writerTask = asyncio.create_task(self._writeMessages())
+        return True
+
+    async def _writeMessages(self):
+        while True:
+            await self._outgoingMessagesEvent.wait()
+            self._outgoingMessagesEvent.clear()
+            while self._outgoingMessages:
+                message = self._outgoingMessages.popleft()
+                if not isinstance(message, str):
+                    message = self.encodeJSON(message)
+                try:
+                    await self.websocket.send_str(message)
+                except Exception as e:
+                    logger.info(f"error while sending message: {e!r}")
+                    self._disconnect()
+                    return
+                self.numSentMessages += 1
+                self.numBytesSent += _utf8Length(message)
+
+    def _disconnect(self):
+        if self._closeTask is None:
+            self._closeTask = asyncio.create_task(self.websocket.close())
+        self._close()
 
 
 class RemoteClientProxy:
-    def __init__(self, connection):
+    def __init__(self, connection, droppable=False):
         self._connection = connection
+        self._droppable = droppable
 
     def __getattr__(self, methodName):
         if methodName.startswith("_"):
@@ -118,19 +275,81 @@ class RemoteClientProxy:
 
         async def methodWrapper(*args):
             serverCallID = next(self._connection.getNextServerCallID)
-            message = {
-                "server-call-id": serverCallID,
-                "method-name": methodName,
-                "arguments": args,
-            }
+            if any(isinstance(arg, PreEncodedJSON) for arg in args):
+                message = _encodeMessage(
+                    serverCallID, methodName, args, self._connection.encodeJSON
+                )
+            else:
+                message = self._connection.encodeJSON(
+                    {
+                        "server-call-id": serverCallID,
+                        "method-name": methodName,
+                        "arguments": args,
+                    }
+                )
             returnFuture = asyncio.get_running_loop().create_future()
             self._connection.callReturnFutures[serverCallID] = returnFuture
-            await self._connection.sendMessage(message)
+            if not await self._connection.sendMessage(message, self._droppable):
+                del self._connection.callReturnFutures[serverCallID]
+                return None
             return await returnFuture
 
         return methodWrapper
 
 
+def _encodeMessage(serverCallID, methodName, args, encodeJSON):
+    encodedArgs = ", ".join(
+        arg.text if isinstance(arg, PreEncodedJSON) else encodeJSON(arg) for arg in args
+    )
+    return (
+        f'{{"server-call-id": {serverCallID}, '
+        f'"method-name": {encodeJSON(methodName)}, '
+        f'"arguments": [{encodedArgs}]}}'
+    )
+
+
+# encodeJSON(value) encodes `value` as a JSON string. Dataclass instances, such
+# as the ones from classes.py, are written field by field, without building
+# a deep copy first, as dataclasses.asdict() does. orjson is used if it is
+# installed, as it is much faster than json.
+#
+# With binaryPaths=True, PackedPath instances are written in the more compact
+# form returned by packedPathToBinaryDict(). Only clients that asked for that
+# during the handshake can decode it.
+
+
+def encodeJSON(value, binaryPaths=False):
+    return _encodeJSON(
+        value, default=_unstructureBinaryPaths if binaryPaths else unstructure
+    )
+
+
+def _unstructureBinaryPaths(obj):
+    if type(obj) is PackedPath:
+        return packedPathToBinaryDict(obj)
+    return unstructure(obj)
+
+
+def _encodeJSONWithJSON(value, default=unstructure):
+    return json.dumps(value, default=default)
+
+
+if orjson is not None:
+    _orjsonOptions = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+    def _encodeJSONWithOrjson(value, default=unstructure):
+        return orjson.dumps(value, default=default, option=_orjsonOptions).decode()
+
+    _encodeJSON = _encodeJSONWithOrjson
+else:
+    _encodeJSON = _encodeJSONWithJSON
+
+
+def _utf8Length(text):
+    # isascii() is cheap: it doesn't need to look at the characters
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
 def _genNextServerCallID():
     serverCallID = 0
     while True:
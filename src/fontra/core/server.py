@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import inspect
 import json
 import logging
 import mimetypes
@@ -9,7 +10,7 @@ import sys
 import traceback
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from functools import partial
+from functools import cache, partial
 from http.cookies import SimpleCookie
 from importlib import resources
 from importlib.metadata import entry_points
@@ -17,12 +18,17 @@ from typing import Any, Optional
 from urllib.parse import quote
 
 from aiohttp import WSCloseCode, web
+from aiohttp.http_websocket import WebSocketReader, WebSocketWriter
 
 from .remote import RemoteObjectConnection, RemoteObjectConnectionException
 
 logger = logging.getLogger(__name__)
 
 
+# Outgoing websocket messages smaller than this are not compressed
+DEFAULT_WEBSOCKET_COMPRESSION_THRESHOLD = 1024
+
+
 @dataclass(kw_only=True)
 class FontraServer:
     host: str
@@ -31,12 +37,16 @@ class FontraServer:
     launchWebBrowser: bool = False
     versionToken: Optional[str] = None
     cookieMaxAge: int = 7 * 24 * 60 * 60
+    websocketCompression: bool = False
+    websocketCompressionThreshold: int = DEFAULT_WEBSOCKET_COMPRESSION_THRESHOLD
     allowedFileExtensions: frozenset[str] = frozenset(
         ["css", "html", "ico", "js", "json", "svg", "woff2"]
     )
 
     def setup(self):
         self.startupTime = datetime.now(timezone.utc).replace(microsecond=0)
+        # Warn early if FontraWebSocketResponse can't do its job
+        webSocketInternalsSupported()
         self.httpApp = web.Application()
         self.viewEntryPoints = {
             ep.name: ep.value for ep in entry_points(group="fontra.views")
@@ -126,7 +136,12 @@ class FontraServer:
         cookies = {k: v.value for k, v in cookies.items()}
         token = cookies.get("fontra-authorization-token")
 
-        websocket = web.WebSocketResponse(heartbeat=55, max_msg_size=0x2000000)
+        websocket = FontraWebSocketResponse(
+            heartbeat=55,
+            max_msg_size=0x2000000,
+            compress=self.websocketCompression,
+            compressionThreshold=self.websocketCompressionThreshold,
+        )
         await websocket.prepare(request)
         self._activeWebsockets.add(websocket)
         try:
@@ -140,6 +155,8 @@ class FontraServer:
             await websocket.close()
         else:
             connection = RemoteObjectConnection(websocket, path, subject, True)
+            # The subject may need the client UUID to register the connection
+            await connection.receiveClientUUID()
             with subject.useConnection(connection):
                 await connection.handleConnection()
         finally:
@@ -261,6 +278,109 @@ class FontraServer:
         return data
 
 
+class FontraWebSocketResponse(web.WebSocketResponse):
+    """A WebSocketResponse that only compresses outgoing messages that are at
+    least `compressionThreshold` bytes long, if the client accepted
+    permessage-deflate compression. It also counts the number of bytes sent
+    and received on the wire, that is, after compression and including the
+    websocket frame headers.
+
+    aiohttp doesn't offer a way to do either, so this replaces the classes of
+    its websocket writer and reader with subclasses. That relies on aiohttp
+    internals: if they aren't what this expects, see
+    webSocketInternalsSupported(), all messages are compressed as usual, and
+    the byte counters are None.
+    """
+
+    def __init__(self, *, compressionThreshold=0, **kwargs):
+        super().__init__(**kwargs)
+        self.compressionThreshold = compressionThreshold
+        self.numWireBytesSent = None
+        self.numWireBytesReceived = None
+
+    def _pre_start(self, request):
+        protocol, writer = super()._pre_start(request)
+        if (
+            webSocketInternalsSupported()
+            and type(writer) is WebSocketWriter
+            and hasattr(writer, "compress")
+        ):
+            writer.__class__ = _FontraWebSocketWriter
+            writer.response = self
+            self.numWireBytesSent = 0
+        return protocol, writer
+
+    def _post_start(self, request, protocol, writer):
+        super()._post_start(request, protocol, writer)
+        reader = getattr(request.protocol, "_payload_parser", None)
+        if webSocketInternalsSupported() and type(reader) is WebSocketReader:
+            reader.__class__ = _FontraWebSocketReader
+            reader.response = self
+            self.numWireBytesReceived = 0
+
+
+@cache
+def webSocketInternalsSupported():
+    """Return True if the aiohttp internals that FontraWebSocketResponse
+    relies on are as expected, else log a warning and return False.
+    """
+    expectedMethods = [
+        (web.WebSocketResponse, "_pre_start"),
+        (web.WebSocketResponse, "_post_start"),
+        (WebSocketWriter, "_send_frame"),
+        (WebSocketWriter, "_write"),
+        (WebSocketReader, "feed_data"),
+    ]
+    missing = [
+        f"{cls.__name__}.{name}"
+        for cls, name in expectedMethods
+        if not callable(getattr(cls, name, None))
+    ]
+    if "compress" not in inspect.signature(WebSocketWriter.__init__).parameters:
+        missing.append("WebSocketWriter(compress=...)")
+    elif not missing:
+        sendFrameParameters = inspect.signature(WebSocketWriter._send_frame).parameters
+        if list(sendFrameParameters)[1:] != ["message", "opcode", "compress"]:
+            missing.append("WebSocketWriter._send_frame(message, opcode, compress)")
+    if missing:
+        logger.warning(
+            "unsupported aiohttp version: the websocket compression threshold "
+            "and the wire byte counters are disabled (missing: %s)",
+            ", ".join(missing),
+        )
+    return not missing
+
+
+class _FontraWebSocketWriter(WebSocketWriter):
+    async def _send_frame(self, message, opcode, compress=None):
+        if (
+            self.compress
+            and opcode < 8  # not a control frame
+            and len(message) < self.response.compressionThreshold
+        ):
+            # Send this frame uncompressed. The client only uses its
+            # decompression context for compressed frames, so this doesn't
+            # interfere with the context of the next compressed frame.
+            savedCompress = self.compress
+            self.compress = 0
+            try:
+                await super()._send_frame(message, opcode, compress)
+            finally:
+                self.compress = savedCompress
+        else:
+            await super()._send_frame(message, opcode, compress)
+
+    def _write(self, data):
+        self.response.numWireBytesSent += len(data)
+        super()._write(data)
+
+
+class _FontraWebSocketReader(WebSocketReader):
+    def feed_data(self, data):
+        self.response.numWireBytesReceived += len(data)
+        return super().feed_data(data)
+
+
 def addVersionTokenToReferences(data, versionToken, extensions):
     pattern = rf"""((['"])[./][./A-Za-z-]+)(\.({"|".join(extensions)})\2)"""
     repl = rf"\1.{versionToken}\3"
@@ -1,4 +1,5 @@
 import argparse
+import hashlib
 import logging
 import pathlib
 from importlib import resources
@@ -6,11 +7,22 @@ from importlib.metadata import entry_points
 
 from aiohttp import web
 
-from ..core.fonthandler import FontHandler
+from ..core.diskcache import GlyphDiskCache
+from ..core.fonthandler import (
+    DEFAULT_LOCAL_DATA_MAX_BYTES,
+    DEFAULT_MAX_WRITE_LATENCY,
+    DEFAULT_WRITE_DELAY,
+    FontHandler,
+)
+from ..core.journal import ChangeJournal
+from ..core.lrucache import CacheBudget
 
 logger = logging.getLogger(__name__)
 
 
+MEGABYTE = 1024 * 1024
+
+
 fileExtensions = {
     f".{ep.name}" for ep in entry_points(group="fontra.filesystem.backends")
 }
@@ -29,6 +41,49 @@ class FileSystemProjectManagerFactory:
         )
         parser.add_argument("--max-folder-depth", type=int, default=3)
         parser.add_argument("--read-only", action="store_true")
+        parser.add_argument(
+            "--cache-size",
+            type=int,
+            default=DEFAULT_LOCAL_DATA_MAX_BYTES // MEGABYTE,
+            help="The maximum size in megabytes of the glyph cache, per open font. "
+            "Default: %(default)s",
+        )
+        parser.add_argument(
+            "--total-cache-size",
+            type=int,
+            help="The maximum size in megabytes of the glyph caches of all "
+            "open fonts combined. Default: no limit",
+        )
+        parser.add_argument(
+            "--disk-cache-dir",
+            type=pathlib.Path,
+            help="A folder for persistent per-project caches, to speed up "
+            "loading glyphs after a server restart, and for journals of edits "
+            "that have not yet been written, to replay them after a crash. "
+            "Default: no disk cache and no journal",
+        )
+        parser.add_argument(
+            "--io-workers",
+            type=int,
+            help="The maximum number of threads per open font for reading and "
+            "writing font files, if the backend supports it. "
+            "Default: backend-specific",
+        )
+        parser.add_argument(
+            "--write-delay",
+            type=float,
+            default=DEFAULT_WRITE_DELAY,
+            help="The time in seconds to wait for further edits before writing "
+            "changes to disk, so rapid successive edits are written once. "
+            "Default: %(default)s",
+        )
+        parser.add_argument(
+            "--max-write-latency",
+            type=float,
+            default=DEFAULT_MAX_WRITE_LATENCY,
+            help="The maximum time in seconds that writing changes to disk may be "
+            "delayed, during continuous editing. Default: %(default)s",
+        )
 
     @staticmethod
     def getProjectManager(arguments):
@@ -36,6 +91,16 @@ class FileSystemProjectManagerFactory:
             rootPath=arguments.path,
             maxFolderDepth=arguments.max_folder_depth,
             readOnly=arguments.read_only,
+            cacheSize=arguments.cache_size * MEGABYTE,
+            totalCacheSize=(
+                arguments.total_cache_size * MEGABYTE
+                if arguments.total_cache_size
+                else None
+            ),
+            diskCacheDir=arguments.disk_cache_dir,
+            ioMaxWorkers=arguments.io_workers,
+            writeDelay=arguments.write_delay,
+            maxWriteLatency=arguments.max_write_latency,
         )
 
 
@@ -64,12 +129,37 @@ def getFileSystemBackend(path):
     return backend
 
 
+def getProjectCacheDir(diskCacheDir, projectPath):
+    projectPath = pathlib.Path(projectPath).resolve()
+    pathHash = hashlib.sha256(str(projectPath).encode("utf-8")).hexdigest()[:16]
+    return diskCacheDir / f"{projectPath.stem}-{pathHash}"
+
+
 class FileSystemProjectManager:
-    def __init__(self, rootPath, maxFolderDepth=3, readOnly=False):
+    def __init__(
+        self,
+        rootPath,
+        maxFolderDepth=3,
+        readOnly=False,
+        cacheSize=DEFAULT_LOCAL_DATA_MAX_BYTES,
+        totalCacheSize=None,
+        diskCacheDir=None,
+        ioMaxWorkers=None,
+        writeDelay=DEFAULT_WRITE_DELAY,
+        maxWriteLatency=DEFAULT_MAX_WRITE_LATENCY,
+    ):
         self.rootPath = rootPath
         self.singleFilePath = None
         self.maxFolderDepth = maxFolderDepth
         self.readOnly = readOnly
+        self.cacheSize = cacheSize
+        self.cacheBudget = (
+            CacheBudget(totalCacheSize) if totalCacheSize is not None else None
+        )
+        self.diskCacheDir = diskCacheDir
+        self.ioMaxWorkers = ioMaxWorkers
+        self.writeDelay = writeDelay
+        self.maxWriteLatency = maxWriteLatency
         if self.rootPath is not None and self.rootPath.suffix.lower() in fileExtensions:
             self.singleFilePath = self.rootPath
             self.rootPath = self.rootPath.parent
@@ -100,7 +190,25 @@ class FileSystemProjectManager:
             if projectPath is None:
                 raise FileNotFoundError(projectPath)
             backend = getFileSystemBackend(projectPath)
-            fontHandler = FontHandler(backend, readOnly=self.readOnly)
+            if self.ioMaxWorkers is not None and hasattr(backend, "ioMaxWorkers"):
+                backend.ioMaxWorkers = self.ioMaxWorkers
+            glyphDiskCache = None
+            changeJournal = None
+            if self.diskCacheDir is not None:
+                projectCacheDir = getProjectCacheDir(self.diskCacheDir, projectPath)
+                glyphDiskCache = GlyphDiskCache(projectCacheDir / "glyphs.sqlite")
+                if not self.readOnly:
+                    changeJournal = ChangeJournal(projectCacheDir / "journal.jsonl")
+            fontHandler = FontHandler(
+                backend,
+                readOnly=self.readOnly,
+                localDataMaxBytes=self.cacheSize,
+                localDataBudget=self.cacheBudget,
+                glyphDiskCache=glyphDiskCache,
+                changeJournal=changeJournal,
+                writeDelay=self.writeDelay,
+                maxWriteLatency=self.maxWriteLatency,
+            )
             await fontHandler.startTasks()
             self.fontHandlers[path] = fontHandler
         return fontHandler
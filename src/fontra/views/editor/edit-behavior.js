@@ -132,21 +132,23 @@ class EditBehavior {
       free: freeTransformFunc || transformFunc,
       constrainDelta: this.constrainDelta,
     };
-    const pathChanges = this.pointEditFuncs
-      ?.map((editFunc) => {
-        const result = editFunc(transform);
-        if (result) {
-          const [pointIndex, x, y] = result;
-          return makePointChange(pointIndex, this.roundFunc(x), this.roundFunc(y));
-        }
-      })
-      .filter((change) => change);
+    // All points are moved with a single "=xys" change
+    const pointIndices = [];
+    const coordinates = [];
+    for (const editFunc of this.pointEditFuncs || []) {
+      const result = editFunc(transform);
+      if (result) {
+        const [pointIndex, x, y] = result;
+        pointIndices.push(pointIndex);
+        coordinates.push(this.roundFunc(x), this.roundFunc(y));
+      }
+    }
     const componentChanges = this.componentEditFuncs?.map((editFunc) => {
       return editFunc(transform);
     });
     const changes = [];
-    if (pathChanges && pathChanges.length) {
-      changes.push(consolidateChanges(pathChanges, ["path"]));
+    if (pointIndices.length) {
+      changes.push(makePointsChange(pointIndices, coordinates));
     }
     if (componentChanges && componentChanges.length) {
       changes.push(consolidateChanges(componentChanges, ["components"]));
@@ -161,25 +163,24 @@ function unionIndexSets(...indexSets) {
 }
 
 function makeRollbackChange(contours, participatingPointIndices, componentRollback) {
-  const pointRollback = [];
+  const pointIndices = [];
+  const coordinates = [];
   for (let i = 0; i < contours.length; i++) {
     const contour = contours[i];
     const contourPointIndices = participatingPointIndices[i];
     if (!contour) {
       continue;
     }
-    const point = contour.points;
-    pointRollback.push(
-      ...contourPointIndices.map((pointIndex) => {
-        const point = contour.points[pointIndex];
-        return makePointChange(pointIndex + contour.startIndex, point.x, point.y);
-      })
-    );
+    for (const pointIndex of contourPointIndices) {
+      const point = contour.points[pointIndex];
+      pointIndices.push(pointIndex + contour.startIndex);
+      coordinates.push(point.x, point.y);
+    }
   }
 
   const changes = [];
-  if (pointRollback.length) {
-    changes.push(consolidateChanges(pointRollback, ["path"]));
+  if (pointIndices.length) {
+    changes.push(makePointsChange(pointIndices, coordinates));
   }
   if (componentRollback.length) {
     changes.push(consolidateChanges(componentRollback, ["components"]));
@@ -258,8 +259,8 @@ function makePointTranslateFunction(delta) {
   };
 }
 
-function makePointChange(pointIndex, x, y) {
-  return { f: "=xy", a: [pointIndex, x, y] };
+function makePointsChange(pointIndices, coordinates) {
+  return { p: ["path"], f: "=xys", a: [pointIndices, coordinates] };
 }
 
 function makeComponentOriginChange(componentIndex, x, y) {
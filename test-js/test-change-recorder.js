@@ -199,6 +199,34 @@ const testData = [
     expectedChange: { f: "=xy", a: [0, 101, 201] },
     expectedRollbackChange: { f: "=xy", a: [0, 100, 200] },
   },
+  {
+    testName: "path set point positions",
+    subject: VarPackedPath.fromUnpackedContours([
+      {
+        points: [
+          { x: 100, y: 200 },
+          { x: 110, y: 210 },
+          { x: 120, y: 220 },
+        ],
+        isClosed: false,
+      },
+    ]),
+    operation: (subject) => {
+      subject.setPointPositions([2, 0], [121, 221, 101, 201]);
+    },
+    expectedSubject: VarPackedPath.fromUnpackedContours([
+      {
+        points: [
+          { x: 101, y: 201 },
+          { x: 110, y: 210 },
+          { x: 121, y: 221 },
+        ],
+        isClosed: false,
+      },
+    ]),
+    expectedChange: { f: "=xys", a: [[2, 0], [121, 221, 101, 201]] },
+    expectedRollbackChange: { f: "=xys", a: [[2, 0], [120, 220, 100, 200]] },
+  },
 ];
 
 describe("recordChanges tests", () => {
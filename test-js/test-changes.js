@@ -10,7 +10,9 @@ import {
   filterChangePattern,
   matchChangePath,
   matchChangePattern,
+  squashChanges,
 } from "../src/fontra/client/core/changes.js";
+import { VarPackedPath } from "../src/fontra/client/core/var-path.js";
 
 import { fileURLToPath } from "url";
 import { dirname, join } from "path";
@@ -336,6 +338,216 @@ describe("consolidateChanges tests", () => {
   }
 });
 
+const squashChangesTestCases = [
+  {
+    testName: "empty",
+    changes: [],
+    squashed: {},
+  },
+  {
+    testName: "single change",
+    changes: [{ p: ["A"], f: "=", a: ["x", 1] }],
+    squashed: { p: ["A"], f: "=", a: ["x", 1] },
+  },
+  {
+    testName: "overwritten points",
+    changes: [
+      { p: ["A", "path"], f: "=xy", a: [3, 1, 2] },
+      { p: ["A", "path"], f: "=xy", a: [4, 1, 2] },
+      { p: ["A", "path"], f: "=xy", a: [3, 5, 6] },
+      { p: ["A", "path"], f: "=xy", a: [4, 5, 6] },
+    ],
+    squashed: {
+      p: ["A", "path"],
+      c: [
+        { f: "=xy", a: [3, 5, 6] },
+        { f: "=xy", a: [4, 5, 6] },
+      ],
+    },
+  },
+  {
+    testName: "point indices shifted by insertion",
+    changes: [
+      { p: ["A", "path"], f: "=xy", a: [3, 1, 2] },
+      { p: ["A", "path"], f: "insertPoint", a: [0, 0, { x: 0, y: 0 }] },
+      { p: ["A", "path"], f: "=xy", a: [3, 5, 6] },
+    ],
+    squashed: {
+      p: ["A", "path"],
+      c: [
+        { f: "=xy", a: [3, 1, 2] },
+        { f: "insertPoint", a: [0, 0, { x: 0, y: 0 }] },
+        { f: "=xy", a: [3, 5, 6] },
+      ],
+    },
+  },
+  {
+    testName: "points overwritten by multiple-point changes",
+    changes: [
+      { p: ["A", "path"], f: "=xy", a: [3, 1, 2] },
+      { p: ["A", "path"], f: "=xys", a: [[3, 4], [1, 2, 3, 4]] },
+      { p: ["A", "path"], f: "=xys", a: [[4, 3], [5, 6, 7, 8]] },
+    ],
+    squashed: { p: ["A", "path"], f: "=xys", a: [[4, 3], [5, 6, 7, 8]] },
+  },
+  {
+    testName: "multiple-point change partially overwritten",
+    changes: [
+      { p: ["A", "path"], f: "=xys", a: [[3, 4], [1, 2, 3, 4]] },
+      { p: ["A", "path"], f: "=xy", a: [3, 5, 6] },
+    ],
+    squashed: {
+      p: ["A", "path"],
+      c: [
+        { f: "=xys", a: [[3, 4], [1, 2, 3, 4]] },
+        { f: "=xy", a: [3, 5, 6] },
+      ],
+    },
+  },
+  {
+    testName: "parent overwritten",
+    changes: [
+      { p: ["A", "items", 0], f: "=", a: ["x", 1] },
+      { p: ["A"], f: "=", a: ["items", []] },
+      { p: ["B"], f: "=", a: ["x", 1] },
+    ],
+    squashed: {
+      c: [
+        { p: ["A"], f: "=", a: ["items", []] },
+        { p: ["B"], f: "=", a: ["x", 1] },
+      ],
+    },
+  },
+  {
+    testName: "insert-delete pair",
+    changes: [
+      { p: ["A", "items"], f: "+", a: [1, { x: 1 }] },
+      { p: ["B"], f: "=", a: ["x", 1] },
+      { p: ["A", "items"], f: "-", a: [1] },
+    ],
+    squashed: { p: ["B"], f: "=", a: ["x", 1] },
+  },
+];
+
+function makeSquashTestSubject() {
+  const subject = {};
+  for (const name of ["A", "B"]) {
+    subject[name] = {
+      value: 0,
+      items: [{ x: 0 }, { x: 1 }, { x: 2 }],
+      path: VarPackedPath.fromUnpackedContours([
+        {
+          points: [
+            { x: 0, y: 0 },
+            { x: 10, y: 0 },
+            { x: 10, y: 10 },
+          ],
+          isClosed: true,
+        },
+      ]),
+    };
+  }
+  return subject;
+}
+
+function makeRandomGenerator(seed) {
+  // Small deterministic PRNG (mulberry32), so failures are reproducible
+  return () => {
+    seed = (seed + 0x6d2b79f5) | 0;
+    let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+    t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+function randomSquashTestChange(random, subject) {
+  const randInt = (n) => Math.floor(random() * n);
+  const name = random() < 0.5 ? "A" : "B";
+  const items = subject[name].items;
+  const path = subject[name].path;
+  switch (randInt(5)) {
+    case 0:
+      if (random() < 0.5 && items.length) {
+        return { p: [name, "items"], f: "-", a: [randInt(items.length)] };
+      }
+      return { p: [name, "items"], f: "+", a: [randInt(items.length + 1), { x: 5 }] };
+    case 1:
+      if (items.length) {
+        return {
+          p: [name, "items", randInt(items.length)],
+          f: "=",
+          a: ["x", randInt(9)],
+        };
+      }
+      return { p: [name], f: "=", a: ["items", [{ x: 3 }]] };
+    case 2:
+      if (random() < 0.5 && path.numPoints) {
+        const pointIndices = [
+          ...new Set([randInt(path.numPoints), randInt(path.numPoints)]),
+        ];
+        const coordinates = pointIndices.flatMap(() => [randInt(9), randInt(9)]);
+        return { p: [name, "path"], f: "=xys", a: [pointIndices, coordinates] };
+      }
+      if (path.numPoints) {
+        return {
+          p: [name, "path"],
+          f: "=xy",
+          a: [randInt(path.numPoints), randInt(9), randInt(9)],
+        };
+      }
+      break;
+    case 3:
+      if (path.numContours) {
+        const contourIndex = randInt(path.numContours);
+        const numContourPoints = path.getNumPointsOfContour(contourIndex);
+        if (random() < 0.5 && numContourPoints) {
+          return {
+            p: [name, "path"],
+            f: "deletePoint",
+            a: [contourIndex, randInt(numContourPoints)],
+          };
+        }
+        return {
+          p: [name, "path"],
+          f: "insertPoint",
+          a: [contourIndex, randInt(numContourPoints + 1), { x: 7, y: 7 }],
+        };
+      }
+      break;
+  }
+  return { p: [name], f: "=", a: ["value", randInt(9)] };
+}
+
+describe("squashChanges tests", () => {
+  for (let i = 0; i < squashChangesTestCases.length; i++) {
+    const test = squashChangesTestCases[i];
+    it(`squashChanges #${i} -- ${test.testName}`, () => {
+      expect(squashChanges(test.changes)).to.deep.equal(test.squashed);
+    });
+  }
+
+  for (let seed = 0; seed < 50; seed++) {
+    it(`squashChanges random #${seed}`, () => {
+      const random = makeRandomGenerator(seed);
+      const subject = makeSquashTestSubject();
+      const changes = [];
+      for (let i = 0; i < 30; i++) {
+        const change = randomSquashTestChange(random, subject);
+        applyChange(subject, copyObject(change));
+        changes.push(change);
+      }
+
+      const squashedChange = squashChanges(copyObject(changes));
+      const squashedSubject = makeSquashTestSubject();
+      applyChange(squashedSubject, squashedChange);
+      expect(squashedSubject).to.deep.equal(subject);
+
+      // Squashing is idempotent
+      expect(squashChanges([squashedChange])).to.deep.equal(squashedChange);
+    });
+  }
+});
+
 describe("ChangeCollector tests", () => {
   it("ChangeCollector basic", () => {
     const coll = new ChangeCollector();
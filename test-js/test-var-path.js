@@ -104,6 +104,51 @@ describe("VarPackedPath Tests", () => {
     expect(p.contourInfo).to.deep.equal([{ endPoint: 3, isClosed: true }]);
   });
 
+  it("fromObject", () => {
+    const p = VarPackedPath.fromObject({
+      coordinates: [0, 0, 0, 100, 100, 100, 100, 0],
+      pointTypes: [0, 0, 0, 0],
+      contourInfo: [{ endPoint: 3, isClosed: true }],
+    });
+    expect(p).to.deep.equal(simpleTestPath());
+    expect(p.coordinates).to.be.an.instanceof(VarArray);
+  });
+
+  it("fromObject binary", () => {
+    const testData = [
+      {
+        coordinates: { type: "int16", data: "AAAAAAAAZABkAJz/ZAAAAA==" },
+        expectedCoordinates: [0, 0, 0, 100, 100, -100, 100, 0],
+      },
+      {
+        coordinates: {
+          type: "float32",
+          data: "AAAAAAAAAAAAAAAAAADIQgAAyEIAAMhCAADIQgAAAAA=",
+        },
+        expectedCoordinates: [0, 0, 0, 100, 100, 100, 100, 0],
+      },
+      {
+        coordinates: {
+          type: "float64",
+          data:
+            "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAWUBmZmZmZgZZQAAAAAAAAFlA" +
+            "AAAAAAAAWUAAAAAAAAAAAA==",
+        },
+        expectedCoordinates: [0, 0, 0, 100, 100.1, 100, 100, 0],
+      },
+    ];
+    for (const { coordinates, expectedCoordinates } of testData) {
+      const p = VarPackedPath.fromObject({
+        coordinates: coordinates,
+        pointTypes: { type: "uint8", data: "AAAAAA==" },
+        contourInfo: [{ endPoint: 3, isClosed: true }],
+      });
+      expect(p.coordinates).to.be.an.instanceof(VarArray);
+      expect(Array.from(p.coordinates)).to.deep.equal(expectedCoordinates);
+      expect(p.pointTypes).to.deep.equal([0, 0, 0, 0]);
+    }
+  });
+
   it("copy", () => {
     const p = simpleTestPath();
     const p2 = p.copy();
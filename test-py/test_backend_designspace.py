@@ -1,9 +1,12 @@
+import asyncio
 import pathlib
 import shutil
+import threading
 
 import pytest
 from fontTools.designspaceLib import DesignSpaceDocument
 
+from fontra.backends import designspace
 from fontra.backends.designspace import DesignspaceBackend, UFOBackend
 from fontra.core.classes import Layer, Source, StaticGlyph
 
@@ -123,6 +126,125 @@ async def test_addNewDenseSource(writableTestFont):
     )
 
 
+async def test_getComponentGraph(writableTestFont):
+    componentGraph = await writableTestFont.getComponentGraph()
+    glyphMap = await writableTestFont.getGlyphMap()
+    expectedComponentGraph = {}
+    for glyphName in glyphMap:
+        glyph = await writableTestFont.getGlyph(glyphName)
+        componentNames = {
+            compo.name
+            for layer in glyph.layers.values()
+            for compo in layer.glyph.components
+        }
+        if componentNames:
+            expectedComponentGraph[glyphName] = componentNames
+    assert expectedComponentGraph == componentGraph
+    assert {"A", "varcotest2"} == componentGraph["varcotest1"]
+
+    componentGraph = await writableTestFont.getComponentGraph(["Adieresis", "B"])
+    assert {"Adieresis": {"A", "dieresis"}} == componentGraph
+
+
+async def test_putGlyphs(writableTestFont, monkeypatch):
+    glyph = await writableTestFont.getGlyph("A")
+    newGlyphNames = [f"A.alt{i}" for i in range(10)]
+
+    writeContentsCalls = []
+    for ufoLayer in writableTestFont.ufoLayers:
+        glyphSet = ufoLayer.glyphSet
+        monkeypatch.setattr(
+            glyphSet,
+            "writeContents",
+            lambda glyphSet=glyphSet, writeContents=glyphSet.writeContents: (
+                writeContentsCalls.append(glyphSet),
+                writeContents(),
+            ),
+        )
+
+    await writableTestFont.putGlyphs(
+        [(glyphName, glyph, []) for glyphName in newGlyphNames]
+    )
+
+    # contents.plist is written once per affected glyph set
+    assert len(writeContentsCalls) == len(set(writeContentsCalls))
+    assert len(writeContentsCalls) == len(glyph.layers)
+
+    reopenedFont = DesignspaceBackend.fromPath(writableTestFont.dsDoc.path)
+    glyphMap = await reopenedFont.getGlyphMap()
+    for glyphName in newGlyphNames:
+        assert glyphName in glyphMap
+        newGlyph = await reopenedFont.getGlyph(glyphName)
+        assert glyph.layers.keys() == newGlyph.layers.keys()
+
+
+async def test_getGlyph_doesNotBlockEventLoop(writableTestFont, monkeypatch):
+    # A slow glyph read should not prevent other requests from being served
+    readStarted = threading.Event()
+    finishRead = threading.Event()
+    originalSerializeStaticGlyph = designspace.serializeStaticGlyph
+
+    def slowSerializeStaticGlyph(glyphSet, glyphName):
+        if glyphName == "A":
+            readStarted.set()
+            finishRead.wait(5)
+        return originalSerializeStaticGlyph(glyphSet, glyphName)
+
+    monkeypatch.setattr(designspace, "serializeStaticGlyph", slowSerializeStaticGlyph)
+
+    slowTask = asyncio.create_task(writableTestFont.getGlyph("A"))
+    while not readStarted.is_set():
+        await asyncio.sleep(0.01)
+
+    glyph = await writableTestFont.getGlyph("B")
+    assert glyph.name == "B"
+    assert not slowTask.done()
+
+    finishRead.set()
+    glyph = await slowTask
+    assert glyph.name == "A"
+    writableTestFont.close()
+
+
+async def test_rebuildContentsDuringPutGlyphs(writableTestFont, monkeypatch):
+    # The watcher rebuilds the glyph set contents when it sees new .glif files,
+    # which may be our own, written by a batch that is still in progress
+    glyph = await writableTestFont.getGlyph("A")
+    newGlyphNames = ["A.alt1", "A.alt2"]
+    firstGlyphWritten = threading.Event()
+    finishBatch = threading.Event()
+    originalWriteGlyph = writableTestFont._writeGlyph
+
+    def slowWriteGlyph(glyphName, glyph, unicodes):
+        originalWriteGlyph(glyphName, glyph, unicodes)
+        firstGlyphWritten.set()
+        finishBatch.wait(5)
+
+    monkeypatch.setattr(writableTestFont, "_writeGlyph", slowWriteGlyph)
+
+    writeTask = asyncio.create_task(
+        writableTestFont.putGlyphs(
+            [(glyphName, glyph, []) for glyphName in newGlyphNames]
+        )
+    )
+    while not firstGlyphWritten.is_set():
+        await asyncio.sleep(0.01)
+    rebuildTask = asyncio.create_task(
+        writableTestFont._runInExecutor(writableTestFont._rebuildGlyphSetContents)
+    )
+    await asyncio.sleep(0.05)
+    finishBatch.set()
+    await writeTask
+    await rebuildTask
+
+    reopenedFont = DesignspaceBackend.fromPath(writableTestFont.dsDoc.path)
+    glyphMap = await reopenedFont.getGlyphMap()
+    for glyphName in newGlyphNames:
+        assert glyphName in glyphMap
+        assert glyphName in writableTestFont.defaultUFOLayer.glyphSet
+    await writableTestFont.aclose()
+
+
 def unpackSources(sources):
     return [
         {k: getattr(s, k) for k in ["location", "styleName", "filename", "layerName"]}
@@ -0,0 +1,152 @@
+from array import array
+
+import pytest
+
+from fontra.core.bounds import getGlyphBounds, getLayerBounds
+from fontra.core.changes import applyChange
+from fontra.core.classes import (
+    Component,
+    Layer,
+    Source,
+    StaticGlyph,
+    Transformation,
+    VariableGlyph,
+)
+from fontra.core.packedpath import PackedPath
+
+
+def makePath():
+    # A curve that bulges beyond y=75: the control bounds are larger than the
+    # exact bounds
+    return PackedPath.fromUnpackedContours(
+        [
+            dict(
+                points=[
+                    dict(x=0, y=0),
+                    dict(x=50, y=100, type="cubic"),
+                    dict(x=100, y=100, type="cubic"),
+                    dict(x=150, y=0),
+                ],
+                isClosed=False,
+            )
+        ]
+    )
+
+
+def test_packedPathBounds():
+    path = makePath()
+    assert (0, 0, 150, 100) == path.getControlBounds()
+    assert (0, 0, 150, 75) == path.getBounds()
+    assert path.getBounds() is path.getBounds()
+    assert PackedPath().getControlBounds() is None
+    assert PackedPath().getBounds() is None
+    triangle = PackedPath.fromUnpackedContours(
+        [
+            dict(
+                points=[dict(x=x, y=y) for x, y in [(0, 0), (0, 5), (9, 5)]],
+                isClosed=True,
+            )
+        ]
+    )
+    assert (0, 0, 9, 5) == triangle.getBounds()
+
+
+@pytest.mark.parametrize(
+    "change, expectedControlBounds",
+    [
+        ({"f": "=xy", "a": [0, -10, 0]}, (-10, 0, 150, 100)),
+        ({"f": "=xys", "a": [[1, 2], [50, 200, 100, 200]]}, (0, 0, 150, 200)),
+        ({"f": "insertPoint", "a": [0, 4, {"x": 200, "y": 0}]}, (0, 0, 200, 100)),
+        ({"f": "deletePoint", "a": [0, 3]}, (0, 0, 100, 100)),
+        ({"f": "deleteContour", "a": [0]}, None),
+        ({"p": ["coordinates"], "f": "=", "a": [6, 300]}, (0, 0, 300, 100)),
+        ({"f": "=", "a": ["coordinates", [0, 0, 1, 1, 2, 2, 3, 3]]}, (0, 0, 3, 3)),
+    ],
+)
+def test_packedPathBoundsInvalidation(change, expectedControlBounds):
+    glyph = StaticGlyph(path=makePath())
+    assert (0, 0, 150, 100) == glyph.path.getControlBounds()
+    assert (0, 0, 150, 75) == glyph.path.getBounds()
+    applyChange(glyph, {"p": ["path"], "c": [change]})
+    assert expectedControlBounds == glyph.path.getControlBounds()
+    assert type(glyph.path.coordinates) is array
+    if expectedControlBounds is not None:
+        assert glyph.path.getBounds() != (0, 0, 150, 75)
+
+
+def makeGlyph(glyphName, path=None, components=()):
+    layers = {
+        layerName: Layer(
+            glyph=StaticGlyph(
+                path=path if path is not None else PackedPath(),
+                components=list(components),
+            )
+        )
+        for layerName in ["default", "bold"]
+    }
+    sources = [Source(name=layerName, layerName=layerName) for layerName in layers]
+    return VariableGlyph(name=glyphName, sources=sources, layers=layers)
+
+
+def makeComponent(glyphName, **transformation):
+    return Component(name=glyphName, transformation=Transformation(**transformation))
+
+
+testGlyphs = {
+    glyph.name: glyph
+    for glyph in [
+        makeGlyph("curve", makePath()),
+        makeGlyph("moved", components=[makeComponent("curve", translateX=100)]),
+        makeGlyph("mirrored", components=[makeComponent("curve", scaleX=-1, scaleY=2)]),
+        makeGlyph("rotated", components=[makeComponent("curve", rotation=90)]),
+        makeGlyph(
+            "nested",
+            path=PackedPath.fromUnpackedContours(
+                [dict(points=[dict(x=-50, y=-50), dict(x=0, y=0)], isClosed=False)]
+            ),
+            components=[makeComponent("rotated", translateY=10)],
+        ),
+        makeGlyph("cycle", components=[makeComponent("cycle"), makeComponent("curve")]),
+        makeGlyph("missing", components=[makeComponent("nonexistent")]),
+    ]
+}
+
+
+@pytest.mark.parametrize(
+    "glyphName, expectedControlBounds, expectedBounds",
+    [
+        ("curve", (0, 0, 150, 100), (0, 0, 150, 75)),
+        ("moved", (100, 0, 250, 100), (100, 0, 250, 75)),
+        ("mirrored", (-150, 0, 0, 200), (-150, 0, 0, 150)),
+        ("rotated", (-100, 0, 0, 150), (-75, 0, 0, 150)),
+        ("nested", (-100, -50, 0, 160), (-75, -50, 0, 160)),
+        ("cycle", (0, 0, 150, 100), (0, 0, 150, 75)),
+        ("missing", None, None),
+    ],
+)
+def test_getLayerBounds(glyphName, expectedControlBounds, expectedBounds):
+    controlBounds = getLayerBounds(testGlyphs, glyphName, "bold", False)
+    bounds = getLayerBounds(testGlyphs, glyphName, "bold", True)
+    assert expectedControlBounds == pytest.approx(controlBounds)
+    assert expectedBounds == pytest.approx(bounds)
+
+
+def test_getGlyphBounds():
+    glyphs = dict(testGlyphs)
+    # The component is measured in the base glyph's default layer, if it
+    # doesn't have a layer with the same name
+    glyphs["other"] = VariableGlyph(
+        name="other",
+        sources=[Source(name="other", layerName="other")],
+        layers={
+            "other": Layer(
+                glyph=StaticGlyph(components=[makeComponent("moved", translateY=5)])
+            )
+        },
+    )
+    assert {
+        "other": {"controlBounds": (100, 5, 250, 105), "bounds": (100, 5, 250, 80)},
+    } == getGlyphBounds(glyphs, "other")
+    assert {
+        "bold": {"controlBounds": (100, 0, 250, 100), "bounds": (100, 0, 250, 75)},
+    } == getGlyphBounds(glyphs, "moved", ["bold", "nonexistent"])
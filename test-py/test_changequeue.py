@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+from fontra.core.changequeue import (
+    ChangeQueueClosedError,
+    OutgoingChangeQueue,
+    getChangeTargets,
+)
+
+
+class SlowClientProxy:
+    def __init__(self):
+        self.receivedChanges = []
+        self.unblock = asyncio.Event()
+
+    async def externalChange(self, change):
+        await self.unblock.wait()
+        self.receivedChanges.append(change)
+
+
+class SlowClientConnection:
+    def __init__(self):
+        self.proxy = self.droppableProxy = SlowClientProxy()
+
+
+def setPoint(pointIndex, x, y):
+    return {"p": ["glyphs", "A", "path"], "f": "=xy", "a": [pointIndex, x, y]}
+
+
+def setPoints(*points):
+    return {
+        "p": ["glyphs", "A", "path"],
+        "c": [{"f": "=xy", "a": list(point)} for point in points],
+    }
+
+
+insertPoint = {"p": ["glyphs", "A", "path"], "f": "insertPoint", "a": [0, 0, {}]}
+
+
+@pytest.mark.parametrize(
+    "change, expectedTargets",
+    [
+        (setPoint(3, 10, 20), {(("glyphs", "A", "path"), "=xy", 3)}),
+        (
+            setPoints((3, 10, 20), (4, 10, 20)),
+            {
+                (("glyphs", "A", "path"), "=xy", 3),
+                (("glyphs", "A", "path"), "=xy", 4),
+            },
+        ),
+        (
+            {"p": ["glyphs", "A", "path"], "f": "=xys", "a": [[3, 4], [1, 2, 3, 4]]},
+            {(("glyphs", "A", "path"), "=xys", (3, 4))},
+        ),
+        (
+            {"p": ["glyphs", "A"], "f": "=", "a": ["xAdvance", 500]},
+            {(("glyphs", "A"), "=", "xAdvance")},
+        ),
+        (insertPoint, None),
+        ({"p": ["glyphs"], "c": [setPoint(0, 1, 2), insertPoint]}, None),
+    ],
+)
+def test_getChangeTargets(change, expectedTargets):
+    assert expectedTargets == getChangeTargets(change)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "liveChanges, expectedChanges",
+    [
+        (
+            # Unsent moves of the same point get replaced by newer ones
+            [setPoint(0, 1, 1), setPoint(0, 2, 2), setPoint(0, 3, 3)],
+            [setPoint(0, 1, 1), setPoint(0, 3, 3)],
+        ),
+        (
+            # Different points can't replace each other, but the waiting changes
+            # are sent as one
+            [setPoint(0, 1, 1), setPoint(0, 2, 2), setPoint(1, 3, 3)],
+            [setPoint(0, 1, 1), setPoints((0, 2, 2), (1, 3, 3))],
+        ),
+        (
+            # A change that sets a superset of the targets replaces older ones
+            [setPoint(0, 1, 1), setPoint(0, 2, 2), setPoints((0, 3, 3), (1, 3, 3))],
+            [setPoint(0, 1, 1), setPoints((0, 3, 3), (1, 3, 3))],
+        ),
+        (
+            # Don't drop changes across other kinds of changes
+            [setPoint(0, 1, 1), setPoint(0, 2, 2), insertPoint, setPoint(0, 3, 3)],
+            [
+                setPoint(0, 1, 1),
+                {
+                    "p": ["glyphs", "A", "path"],
+                    "c": [
+                        {"f": "=xy", "a": [0, 2, 2]},
+                        {"f": "insertPoint", "a": [0, 0, {}]},
+                        {"f": "=xy", "a": [0, 3, 3]},
+                    ],
+                },
+            ],
+        ),
+    ],
+)
+async def test_outgoingChangeQueue_liveChanges(liveChanges, expectedChanges):
+    connection = SlowClientConnection()
+    queue = OutgoingChangeQueue(connection)
+    for change in liveChanges:
+        queue.putLiveChange(change)
+        # Allow the first change to be "in flight"
+        await asyncio.sleep(0)
+    connection.proxy.unblock.set()
+    while queue._senderTask is not None:
+        await asyncio.sleep(0)
+    assert expectedChanges == connection.proxy.receivedChanges
+    assert len(liveChanges) - len(expectedChanges) == (
+        queue.numDroppedChanges + queue.numSquashedChanges
+    )
+
+
+@pytest.mark.asyncio
+async def test_outgoingChangeQueue_finalChange():
+    connection = SlowClientConnection()
+    queue = OutgoingChangeQueue(connection)
+    queue.putLiveChange(setPoint(0, 1, 1))
+    await asyncio.sleep(0)
+    queue.putLiveChange(setPoint(0, 2, 2))
+    finalTask = asyncio.create_task(queue.putChange(setPoint(0, 3, 3)))
+    await asyncio.sleep(0)
+    # The final change is never dropped, nor can it replace anything
+    queue.putLiveChange(setPoint(0, 4, 4))
+    queue.putLiveChange(setPoint(0, 5, 5))
+    assert not finalTask.done()
+    connection.proxy.unblock.set()
+    await finalTask
+    while queue._senderTask is not None:
+        await asyncio.sleep(0)
+    assert [
+        setPoint(0, 1, 1),
+        setPoint(0, 2, 2),
+        setPoint(0, 3, 3),
+        setPoint(0, 5, 5),
+    ] == connection.proxy.receivedChanges
+
+
+@pytest.mark.asyncio
+async def test_outgoingChangeQueue_close():
+    connection = SlowClientConnection()
+    queue = OutgoingChangeQueue(connection)
+    inFlightTask = asyncio.create_task(queue.putChange(setPoint(0, 1, 1)))
+    await asyncio.sleep(0)
+    pendingTask = asyncio.create_task(queue.putChange(setPoint(0, 2, 2)))
+    await asyncio.sleep(0)
+    queue.close()
+    # Both the change that is being sent and the waiting one fail, rather than
+    # hang or get cancelled
+    for task in [inFlightTask, pendingTask]:
+        with pytest.raises(ChangeQueueClosedError):
+            await asyncio.wait_for(task, 1)
+    with pytest.raises(ChangeQueueClosedError):
+        await queue.putChange(setPoint(0, 3, 3))
+    await asyncio.sleep(0)
+    assert queue._senderTask is None
+    assert [] == connection.proxy.receivedChanges
@@ -1,11 +1,14 @@
 import json
 import pathlib
+import random
 from copy import deepcopy
 
 import pytest
 
 from fontra.core.changes import (
+    MatchPatternIndex,
     applyChange,
+    applyChanges,
     collectChangePaths,
     filterChangePattern,
     matchChangePattern,
@@ -13,7 +16,9 @@ from fontra.core.changes import (
     patternFromPath,
     patternIntersect,
     patternUnion,
+    squashChanges,
 )
+from fontra.core.packedpath import PackedPath
 
 
 def getTestData(fileName):
@@ -45,6 +50,61 @@ def test_applyChange(testName, inputDataName, change, expectedData):
     assert subject == expectedData
 
 
+@pytest.mark.parametrize(
+    "testName, inputDataName, change, expectedData", applyChangeTestData
+)
+def test_applyChanges(testName, inputDataName, change, expectedData):
+    subject = deepcopy(applyChangeTestInputData[inputDataName])
+    applyChanges(subject, [change])
+    assert subject == expectedData
+
+
+@pytest.mark.parametrize(
+    "changes, expectedData",
+    [
+        (
+            # Consecutive changes with the same path
+            [
+                {"p": ["a", "b"], "f": "=", "a": [0, 1]},
+                {"p": ["a", "b"], "f": "=", "a": [1, 2]},
+            ],
+            {"a": {"b": [1, 2]}, "c": [0, 0]},
+        ),
+        (
+            # The object at the previous path gets replaced
+            [
+                {"p": ["a", "b"], "f": "=", "a": [0, 1]},
+                {"p": ["a"], "f": "=", "a": ["b", [5, 5]]},
+                {"p": ["a", "b"], "f": "=", "a": [1, 2]},
+            ],
+            {"a": {"b": [5, 2]}, "c": [0, 0]},
+        ),
+        (
+            # The object at the previous path gets replaced by a nested change
+            [
+                {"p": ["a", "b"], "f": "=", "a": [0, 1]},
+                {"c": [{"p": ["a"], "f": "=", "a": ["b", [5, 5]]}]},
+                {"p": ["a", "b"], "f": "=", "a": [1, 2]},
+            ],
+            {"a": {"b": [5, 2]}, "c": [0, 0]},
+        ),
+        (
+            # A change without a path in between
+            [
+                {"p": ["c"], "f": "=", "a": [0, 1]},
+                {"f": "=", "a": ["d", 3]},
+                {"p": ["c"], "f": "=", "a": [1, 2]},
+            ],
+            {"a": {"b": [0, 0]}, "c": [1, 2], "d": 3},
+        ),
+    ],
+)
+def test_applyChanges_samePath(changes, expectedData):
+    subject = {"a": {"b": [0, 0]}, "c": [0, 0]}
+    applyChanges(subject, changes)
+    assert subject == expectedData
+
+
 @pytest.mark.parametrize(
     "patternA, path, expectedPattern",
     [
@@ -175,6 +235,52 @@ def test_matchChangePattern(change, pattern, expectedResult):
     assert expectedResult == result
 
 
+@pytest.mark.parametrize(
+    "change, pattern, expectedResult",
+    getTestData("match-change-pattern-test-data.json"),
+)
+def test_matchPatternIndex(change, pattern, expectedResult):
+    index = MatchPatternIndex()
+    index.setPattern("subscriber", pattern)
+    index.setPattern("other", {"some-other-key": None})
+    result = "subscriber" in index.matchChange(change)
+    assert expectedResult == result
+
+
+def randomPath(rng):
+    return [rng.choice("abc") for i in range(rng.randint(1, 3))]
+
+
+def randomChange(rng, depth=0):
+    change = {"p": randomPath(rng)}
+    if depth < 2 and rng.random() < 0.5:
+        change["c"] = [randomChange(rng, depth + 1) for i in range(rng.randint(1, 3))]
+    return change
+
+
+def test_matchPatternIndex_subscribeUnsubscribe():
+    rng = random.Random(42)
+    subscribers = ["s1", "s2", "s3", "s4"]
+    changes = [randomChange(rng) for i in range(50)]
+    index = MatchPatternIndex()
+    for i in range(300):
+        subscriber = rng.choice(subscribers)
+        func = patternUnion if rng.random() < 0.6 else patternDifference
+        pattern = patternFromPath(randomPath(rng))
+        index.setPattern(subscriber, func(index.getPattern(subscriber), pattern))
+        for change in changes:
+            expectedSubscribers = {
+                subscriber
+                for subscriber in subscribers
+                if matchChangePattern(change, index.getPattern(subscriber))
+            }
+            assert expectedSubscribers == index.matchChange(change)
+
+    for subscriber in subscribers:
+        index.removeSubscriber(subscriber)
+    assert not index._root.children
+
+
 @pytest.mark.parametrize(
     "change, pattern, inverse, expectedResult",
     getTestData("filter-change-pattern-test-data.json"),
@@ -206,3 +312,240 @@ def test_collectChangePaths(change, depth, expectedPaths):
 def test_patternFromPath(path, expectedPattern):
     pattern = patternFromPath(path)
     assert expectedPattern == pattern
+
+
+def makeSquashTestSubject():
+    return {
+        name: {
+            "value": 0,
+            "items": [{"x": i} for i in range(3)],
+            "path": PackedPath.fromUnpackedContours(
+                [
+                    dict(points=[dict(x=i, y=i) for i in range(4)], isClosed=True)
+                    for j in range(2)
+                ]
+            ),
+        }
+        for name in ["A", "B"]
+    }
+
+
+def randomSquashTestChange(rng, subject):
+    # Return a random change that is valid for `subject`. Changes to the same
+    # targets, and insertions followed by deletions, are made likely.
+    name = rng.choice(["A", "B"])
+    items = subject[name]["items"]
+    path = subject[name]["path"]
+    numPoints = len(path.pointTypes)
+    kind = rng.choice(
+        [
+            "value",
+            "item",
+            "itemX",
+            "+",
+            "-",
+            ":",
+            "+-",
+            "d",
+            "=xy",
+            "=xys",
+            "point",
+            "contour",
+        ]
+    )
+    if kind == "value":
+        return {"p": [name], "f": "=", "a": ["value", rng.randint(0, 9)]}
+    elif kind == "item" and items:
+        index = rng.randrange(len(items))
+        return {"p": [name, "items"], "f": "=", "a": [index, {"x": rng.randint(0, 9)}]}
+    elif kind == "itemX" and items:
+        index = rng.randrange(len(items))
+        return {"p": [name, "items", index], "f": "=", "a": ["x", rng.randint(0, 9)]}
+    elif kind == "+":
+        index = rng.randint(0, len(items))
+        return {"p": [name, "items"], "f": "+", "a": [index, {"x": 100}]}
+    elif kind == "-" and items:
+        return {"p": [name, "items"], "f": "-", "a": [rng.randrange(len(items))]}
+    elif kind == ":" and items:
+        index = rng.randrange(len(items))
+        return {"p": [name, "items"], "f": ":", "a": [index, 1, {"x": 200}, {"x": 300}]}
+    elif kind == "+-":
+        index = rng.randint(0, len(items))
+        return {
+            "p": [name, "items"],
+            "c": [
+                {"f": "+", "a": [index, {"x": 400}, {"x": 500}]},
+                {"f": "-", "a": [index, 2]},
+            ],
+        }
+    elif kind == "d" and "value" in subject[name]:
+        return {"p": [name], "f": "d", "a": ["value"]}
+    elif kind == "=xy" and numPoints:
+        pointIndices = rng.sample(range(numPoints), min(numPoints, 2))
+        return {
+            "p": [name, "path"],
+            "c": [
+                {"f": "=xy", "a": [i, rng.randint(0, 9), rng.randint(0, 9)]}
+                for i in pointIndices
+            ],
+        }
+    elif kind == "=xys" and numPoints:
+        pointIndices = rng.sample(range(numPoints), rng.randint(1, min(numPoints, 3)))
+        coordinates = [rng.randint(0, 9) for i in range(2 * len(pointIndices))]
+        return {"p": [name, "path"], "f": "=xys", "a": [pointIndices, coordinates]}
+    elif kind == "point" and path.contourInfo:
+        contourIndex = rng.randrange(len(path.contourInfo))
+        numContourPoints = (
+            path.contourInfo[contourIndex].endPoint
+            + 1
+            - (path.contourInfo[contourIndex - 1].endPoint + 1 if contourIndex else 0)
+        )
+        if rng.random() < 0.5 and numContourPoints:
+            pointIndex = rng.randrange(numContourPoints)
+            return {
+                "p": [name, "path"],
+                "f": "deletePoint",
+                "a": [contourIndex, pointIndex],
+            }
+        pointIndex = rng.randint(0, numContourPoints)
+        return {
+            "p": [name, "path"],
+            "f": "insertPoint",
+            "a": [contourIndex, pointIndex, {"x": 7, "y": 7}],
+        }
+    elif kind == "contour":
+        numContours = len(path.contourInfo)
+        if rng.random() < 0.5 and numContours:
+            return {"p": [name, "path"], "f": "deleteContour", "a": [numContours - 1]}
+        contour = {"coordinates": [1, 2, 3, 4], "pointTypes": [0, 0], "isClosed": True}
+        return {"p": [name, "path"], "f": "insertContour", "a": [numContours, contour]}
+    return {"p": [name], "f": "=", "a": ["value", rng.randint(0, 9)]}
+
+
+def randomSquashTestChanges(rng, subject, numChanges):
+    subject = deepcopy(subject)
+    changes = []
+    for i in range(numChanges):
+        change = randomSquashTestChange(rng, subject)
+        if rng.random() < 0.2 and changes:
+            # Make "undo" style insert-delete pairs likely
+            previousChange = changes[-1]
+            if previousChange.get("f") in {"+", "insertPoint", "insertContour"}:
+                deleteFunction = {
+                    "+": "-",
+                    "insertPoint": "deletePoint",
+                    "insertContour": "deleteContour",
+                }[previousChange["f"]]
+                numArgs = 2 if deleteFunction == "deletePoint" else 1
+                change = {
+                    "p": previousChange["p"],
+                    "f": deleteFunction,
+                    "a": previousChange["a"][:numArgs],
+                }
+        # The subject may end up referencing argument values, so keep the
+        # changes separate from it
+        applyChange(subject, deepcopy(change))
+        changes.append(change)
+    return changes
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_squashChanges(seed):
+    rng = random.Random(seed)
+    subject = makeSquashTestSubject()
+    changes = randomSquashTestChanges(rng, subject, rng.randint(1, 40))
+
+    expectedSubject = deepcopy(subject)
+    for change in deepcopy(changes):
+        applyChange(expectedSubject, change)
+
+    squashedChange = squashChanges(deepcopy(changes))
+    squashedSubject = deepcopy(subject)
+    applyChange(squashedSubject, squashedChange)
+    assert squashedSubject == expectedSubject
+
+    # Squashing is idempotent
+    assert squashChanges([squashedChange]) == squashedChange
+
+
+@pytest.mark.parametrize(
+    "changes, expectedChange",
+    [
+        ([], {}),
+        (
+            [{"p": ["A"], "f": "=", "a": ["x", 1]}],
+            {"p": ["A"], "f": "=", "a": ["x", 1]},
+        ),
+        (
+            [
+                {"p": ["A", "path"], "f": "=xy", "a": [3, 1, 2]},
+                {"p": ["A", "path"], "f": "=xy", "a": [4, 1, 2]},
+                {"p": ["A", "path"], "f": "=xy", "a": [3, 5, 6]},
+                {"p": ["A", "path"], "f": "=xy", "a": [4, 5, 6]},
+            ],
+            {
+                "p": ["A", "path"],
+                "c": [{"f": "=xy", "a": [3, 5, 6]}, {"f": "=xy", "a": [4, 5, 6]}],
+            },
+        ),
+        (
+            [
+                {"p": ["A", "path"], "f": "=xy", "a": [3, 1, 2]},
+                {"p": ["A", "path"], "f": "insertPoint", "a": [0, 0, {"x": 0, "y": 0}]},
+                {"p": ["A", "path"], "f": "=xy", "a": [3, 5, 6]},
+            ],
+            {
+                "p": ["A", "path"],
+                "c": [
+                    {"f": "=xy", "a": [3, 1, 2]},
+                    {"f": "insertPoint", "a": [0, 0, {"x": 0, "y": 0}]},
+                    {"f": "=xy", "a": [3, 5, 6]},
+                ],
+            },
+        ),
+        (
+            [
+                {"p": ["A", "path"], "f": "=xy", "a": [3, 1, 2]},
+                {"p": ["A", "path"], "f": "=xys", "a": [[3, 4], [1, 2, 3, 4]]},
+                {"p": ["A", "path"], "f": "=xys", "a": [[4, 3], [5, 6, 7, 8]]},
+            ],
+            {"p": ["A", "path"], "f": "=xys", "a": [[4, 3], [5, 6, 7, 8]]},
+        ),
+        (
+            [
+                {"p": ["A", "path"], "f": "=xys", "a": [[3, 4], [1, 2, 3, 4]]},
+                {"p": ["A", "path"], "f": "=xy", "a": [3, 5, 6]},
+            ],
+            {
+                "p": ["A", "path"],
+                "c": [
+                    {"f": "=xys", "a": [[3, 4], [1, 2, 3, 4]]},
+                    {"f": "=xy", "a": [3, 5, 6]},
+                ],
+            },
+        ),
+        (
+            [
+                {"p": ["A", "items", 0], "f": "=", "a": ["x", 1]},
+                {"p": ["A"], "f": "=", "a": ["items", []]},
+                {"p": ["B"], "f": "=", "a": ["x", 1]},
+            ],
+            {
+                "c": [
+                    {"p": ["A"], "f": "=", "a": ["items", []]},
+                    {"p": ["B"], "f": "=", "a": ["x", 1]},
+                ]
+            },
+        ),
+        (
+            [
+                {"p": ["A", "items"], "f": "+", "a": [1, {"x": 1}]},
+                {"p": ["B"], "f": "=", "a": ["x", 1]},
+                {"p": ["A", "items"], "f": "-", "a": [1]},
+            ],
+            {"p": ["B"], "f": "=", "a": ["x", 1]},
+        ),
+    ],
+)
+def test_squashChanges_examples(changes, expectedChange):
+    assert squashChanges(changes) == expectedChange
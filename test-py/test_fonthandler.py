@@ -1,4 +1,5 @@
 import asyncio
+import json
 import logging
 import pathlib
 import shutil
@@ -7,7 +8,11 @@ from contextlib import asynccontextmanager
 import pytest
 
 from fontra.backends.designspace import DesignspaceBackend
-from fontra.core.fonthandler import FontHandler
+from fontra.core.changes import applyChange
+from fontra.core.diskcache import GlyphDiskCache
+from fontra.core.fonthandler import FontHandler, FontHandlerClosedError
+from fontra.core.journal import ChangeJournal
+from fontra.core.remote import PreEncodedJSON, RemoteObjectConnectionException
 
 
 @asynccontextmanager
@@ -117,7 +122,7 @@ async def test_fontHandler_editGlyph(testFontHandler):
 
         glyph = await testFontHandler.getGlyph("A", connection=None)
         layerName, layer = firstLayerItem(glyph)
-        assert [20, 55] == layer.glyph.path.coordinates[:2]
+        assert [20, 55] == layer.glyph.path.coordinates[:2].tolist()
 
         # give the write queue the opportunity to complete
         await testFontHandler.finishWriting()
@@ -288,3 +293,718 @@ async def test_fontHandler_new_glyph(testFontHandler):
 
 def firstLayerItem(glyph):
     return next(iter(glyph.layers.items()))
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_getCacheStatistics(testFontHandler):
+    async with asyncClosing(testFontHandler):
+        _ = await testFontHandler.getGlyph("A")
+        _ = await testFontHandler.getGlyph("A")
+        _ = await testFontHandler.getGlyph("B")
+        statistics = await testFontHandler.getCacheStatistics(connection=None)
+
+    assert 2 == statistics["numItems"]
+    assert 1 == statistics["hits"]
+    assert 2 == statistics["misses"]
+    assert 0 == statistics["evictions"]
+    assert 0 < statistics["totalBytes"] < statistics["maxBytes"]
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_getGlyphs(testFontHandler):
+    async with asyncClosing(testFontHandler):
+        glyphA = await testFontHandler.getGlyph("A")
+        glyphs = await testFontHandler.getGlyphs(["B", "A", "nonexistent", "B"])
+        statistics = await testFontHandler.getCacheStatistics(connection=None)
+
+    assert ["B", "A", "nonexistent"] == list(glyphs)
+    assert glyphA is glyphs["A"]
+    assert "B" == glyphs["B"].name
+    assert glyphs["nonexistent"] is None
+    assert 2 == statistics["numItems"]
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_getGlyphs_includeComponents(testFontHandler):
+    async with asyncClosing(testFontHandler):
+        glyphs = await testFontHandler.getGlyphs(["Adieresis"], True)
+
+    assert ["Adieresis", "A", "dieresis", "dot"] == list(glyphs)
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_getGlyphBounds(testFontHandler):
+    layerName = "MutatorSansLightWide/foreground"
+    async with asyncClosing(testFontHandler):
+        bounds = await testFontHandler.getGlyphBounds(
+            ["Adieresis", "O", "nonexistent"], [layerName, "nonexistent"]
+        )
+        allBounds = await testFontHandler.getGlyphBounds(["Adieresis"])
+
+    assert ["Adieresis", "O", "nonexistent"] == list(bounds)
+    assert {
+        layerName: {
+            # A, and dieresis (made of two dots) offset by (421, 20)
+            "controlBounds": (50, 0, 1140, 800),
+            "bounds": (50, 0, 1140, 800),
+        }
+    } == bounds["Adieresis"]
+    assert {
+        layerName: {
+            "controlBounds": (80, -10, 1241, 710),
+            "bounds": (80, -10, 1241, 710),
+        }
+    } == bounds["O"]
+    assert bounds["nonexistent"] is None
+    assert 4 == len(allBounds["Adieresis"])
+    assert bounds["Adieresis"][layerName] == allBounds["Adieresis"][layerName]
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_prefetchComponents(testFontHandler):
+    async with asyncClosing(testFontHandler):
+        _ = await testFontHandler.getGlyph("Adieresis")
+        assert ("glyphs", "dot") not in testFontHandler.localData
+        while testFontHandler._backgroundTasks:
+            await asyncio.gather(*testFontHandler._backgroundTasks)
+        for glyphName in ["A", "dieresis", "dot"]:
+            assert ("glyphs", glyphName) in testFontHandler.localData
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_glyphDiskCache(testFontPath, tmp_path):
+    cachePath = tmp_path / "cache" / "glyphs.sqlite"
+
+    def makeFontHandler():
+        backend = DesignspaceBackend.fromPath(testFontPath)
+        return FontHandler(backend, glyphDiskCache=GlyphDiskCache(cachePath))
+
+    fontHandler = makeFontHandler()
+    async with asyncClosing(fontHandler):
+        glyph = await fontHandler.getGlyph("B")
+
+    fontHandler = makeFontHandler()
+
+    async def getGlyph(glyphName):
+        raise AssertionError("glyph should come from the disk cache")
+
+    fontHandler.backend.getGlyph = getGlyph
+    async with asyncClosing(fontHandler):
+        cachedGlyph = await fontHandler.getGlyph("B")
+        assert glyph == cachedGlyph
+
+    fontHandler = makeFontHandler()
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        await asyncio.sleep(0.1)  # give the watcher a chance to start
+        validationKey = await fontHandler.backend.getGlyphValidationKey("B")
+        assert fontHandler.glyphDiskCache.get("B", validationKey) is not None
+
+        dsDoc = fontHandler.backend.dsDoc
+        glifPath = pathlib.Path(dsDoc.sources[0].path) / "glyphs" / "B_.glif"
+        glifData = glifPath.read_text()
+        glifPath.write_text(glifData.replace("<advance", "<!-- --><advance"))
+
+        await asyncio.sleep(0.3)
+
+        # The external change watcher should have dropped the entry
+        assert fontHandler.glyphDiskCache.get("B", validationKey) is None
+        # Write the original data back to keep the session test font intact
+        glifPath.write_text(glifData)
+        await asyncio.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_closeAfterWriteError(testFontPath, tmp_path, monkeypatch):
+    backend = DesignspaceBackend.fromPath(testFontPath)
+    fontHandler = FontHandler(
+        backend,
+        glyphDiskCache=GlyphDiskCache(tmp_path / "cache" / "glyphs.sqlite"),
+        changeJournal=ChangeJournal(tmp_path / "journal.jsonl"),
+    )
+    await fontHandler.startTasks()
+    closeCalls = []
+
+    async def failingFinishWriting():
+        raise ValueError("can't write")
+
+    def makeCloseSpy(name, closeFunc):
+        async def closeSpy():
+            closeCalls.append(name)
+            await closeFunc()
+
+        return closeSpy
+
+    monkeypatch.setattr(fontHandler, "finishWriting", failingFinishWriting)
+    monkeypatch.setattr(
+        fontHandler.glyphDiskCache,
+        "aclose",
+        makeCloseSpy("glyphDiskCache", fontHandler.glyphDiskCache.aclose),
+    )
+    monkeypatch.setattr(backend, "aclose", makeCloseSpy("backend", backend.aclose))
+
+    with pytest.raises(ValueError):
+        await fontHandler.close()
+    assert ["glyphDiskCache", "backend"] == closeCalls
+    assert fontHandler.changeJournal._file.closed
+    await asyncio.sleep(0)
+    assert fontHandler._processWritesTask.done()
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_getGlyphsUsedBy(testFontHandler):
+    async with asyncClosing(testFontHandler):
+        await testFontHandler.startTasks()
+        usedBy = await testFontHandler.getGlyphsUsedBy("dot")
+        usedByPeriod = await testFontHandler.getGlyphsUsedBy("period")
+        madeOf = await testFontHandler.getGlyphsMadeOf("Adieresis")
+        assert not testFontHandler.localData
+
+    assert ["Adieresis", "dieresis"] == usedBy
+    assert ["colon", "semicolon"] == usedByPeriod
+    assert ["A", "dieresis", "dot"] == madeOf
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_getGlyphsUsedBy_closed(testFontHandler, monkeypatch):
+    getComponentGraph = testFontHandler.backend.getComponentGraph
+
+    async def slowGetComponentGraph(*args):
+        await asyncio.sleep(0.5)
+        return await getComponentGraph(*args)
+
+    monkeypatch.setattr(
+        testFontHandler.backend, "getComponentGraph", slowGetComponentGraph
+    )
+    await testFontHandler.startTasks()
+    usedByTask = asyncio.create_task(testFontHandler.getGlyphsUsedBy("dot"))
+    await asyncio.sleep(0)
+    await testFontHandler.close()
+    # Pending and later calls get a clear error rather than CancelledError
+    with pytest.raises(FontHandlerClosedError):
+        await usedByTask
+    with pytest.raises(FontHandlerClosedError):
+        await testFontHandler.getGlyphsMadeOf("Adieresis")
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_batchedGlyphWrites(testFontHandler, monkeypatch):
+    async with asyncClosing(testFontHandler):
+        await testFontHandler.startTasks()
+        glyphNames = ["E", "F", "H"]
+        changes = []
+        for glyphName in glyphNames:
+            glyph = await testFontHandler.getGlyph(glyphName, connection=None)
+            layerName, layer = firstLayerItem(glyph)
+            changes.append(
+                {
+                    "p": ["glyphs", glyphName, "layers", layerName, "glyph"],
+                    "f": "=",
+                    "a": ["xAdvance", layer.glyph.xAdvance],
+                }
+            )
+        change = {"c": changes}
+
+        putGlyphsCalls = []
+        putGlyphs = testFontHandler.backend.putGlyphs
+
+        async def putGlyphsSpy(glyphs):
+            putGlyphsCalls.append([glyphName for glyphName, *_ in glyphs])
+            await putGlyphs(glyphs)
+
+        monkeypatch.setattr(testFontHandler.backend, "putGlyphs", putGlyphsSpy)
+
+        await testFontHandler.editFinal(
+            change, change, "Test edit", False, connection=None
+        )
+        await testFontHandler.finishWriting()
+
+        assert [glyphNames] == putGlyphsCalls
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_evictedBeforeWrite(testFontHandler):
+    async with asyncClosing(testFontHandler):
+        await testFontHandler.startTasks()
+        glyph = await testFontHandler.getGlyph("A", connection=None)
+        layerName, layer = firstLayerItem(glyph)
+        coordinates = list(layer.glyph.path.coordinates[:2])
+
+        change = {
+            "p": ["glyphs", "A", "layers", layerName, "glyph", "path"],
+            "f": "=xy",
+            "a": [0, 123, 456],
+        }
+        rollbackChange = {
+            "p": ["glyphs", "A", "layers", layerName, "glyph", "path"],
+            "f": "=xy",
+            "a": [0, *coordinates],
+        }
+        await testFontHandler.editFinal(
+            change, rollbackChange, "Test edit", False, connection=None
+        )
+        # The scheduled write references the live glyph, no copy was made
+        writeFunc, _ = testFontHandler._dataScheduledForWriting[("glyphs", "A")]
+        assert writeFunc.args[1] is glyph
+
+        # Simulate the glyph being evicted from the cache before it got written:
+        # we should still get the edited glyph, not the old one from the backend
+        testFontHandler.localData.clear()
+        glyph = await testFontHandler.getGlyph("A", connection=None)
+        layerName, layer = firstLayerItem(glyph)
+        assert [123, 456] == layer.glyph.path.coordinates[:2].tolist()
+
+        await testFontHandler.editFinal(
+            rollbackChange, change, "Test edit", False, connection=None
+        )
+        await testFontHandler.finishWriting()
+        assert not testFontHandler._unwrittenData
+
+
+async def nudgeGlyph(fontHandler, glyphName, numEdits, interval):
+    glyph = await fontHandler.getGlyph(glyphName, connection=None)
+    layerName, layer = firstLayerItem(glyph)
+    x, y = layer.glyph.path.coordinates[:2]
+    path = ["glyphs", glyphName, "layers", layerName, "glyph", "path"]
+    for i in range(numEdits):
+        change = {"p": path, "f": "=xy", "a": [0, x + i + 1, y]}
+        rollbackChange = {"p": path, "f": "=xy", "a": [0, x + i, y]}
+        await fontHandler.editFinal(
+            change, rollbackChange, "Test edit", False, connection=None
+        )
+        await asyncio.sleep(interval)
+    # Move the point back to where it was
+    change = {"p": path, "f": "=xy", "a": [0, x, y]}
+    await fontHandler.editFinal(change, change, "Test edit", False, connection=None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "writeDelay, maxWriteLatency, expectedNumWrites",
+    [
+        (0.2, 10, range(1, 2)),  # all edits are merged into a single write
+        (10, 0.2, range(2, 5)),  # the latency cap forces writes while editing
+    ],
+)
+async def test_fontHandler_writeDelay(
+    testFontPath, monkeypatch, writeDelay, maxWriteLatency, expectedNumWrites
+):
+    backend = DesignspaceBackend.fromPath(testFontPath)
+    fontHandler = FontHandler(
+        backend, writeDelay=writeDelay, maxWriteLatency=maxWriteLatency
+    )
+
+    writtenGlyphNames = []
+    putGlyph = backend.putGlyph
+
+    async def putGlyphSpy(glyphName, glyph, unicodes):
+        writtenGlyphNames.append(glyphName)
+        await putGlyph(glyphName, glyph, unicodes)
+
+    monkeypatch.setattr(backend, "putGlyph", putGlyphSpy)
+
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        await nudgeGlyph(fontHandler, "A", 10, 0.05)
+        await asyncio.sleep(0.4)
+        assert len(writtenGlyphNames) in expectedNumWrites
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_writeDelay_finishWriting(testFontPath, monkeypatch):
+    backend = DesignspaceBackend.fromPath(testFontPath)
+    fontHandler = FontHandler(backend, writeDelay=10, maxWriteLatency=10)
+
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        await nudgeGlyph(fontHandler, "A", 3, 0)
+        assert ("glyphs", "A") in fontHandler._dataScheduledForWriting
+        # finishWriting() should not be subject to the write delay
+        await asyncio.wait_for(fontHandler.finishWriting(), 2)
+        assert not fontHandler._dataScheduledForWriting
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_changeJournal(testFontPath, tmp_path):
+    journalPath = tmp_path / "journal.jsonl"
+    backend = DesignspaceBackend.fromPath(testFontPath)
+    fontHandler = FontHandler(
+        backend,
+        changeJournal=ChangeJournal(journalPath),
+        writeDelay=10,
+        maxWriteLatency=10,
+    )
+    await fontHandler.startTasks()
+    glyph = await fontHandler.getGlyph("A")
+    layerName, layer = firstLayerItem(glyph)
+    coordinates = list(layer.glyph.path.coordinates[:2])
+    path = ["glyphs", "A", "layers", layerName, "glyph", "path"]
+    change = {"p": path, "f": "=xy", "a": [0, 123, 456]}
+    rollbackChange = {"p": path, "f": "=xy", "a": [0, *coordinates]}
+    await fontHandler.editFinal(
+        change, rollbackChange, "Test edit", False, connection=None
+    )
+    assert ("glyphs", "A") in fontHandler._dataScheduledForWriting
+
+    # Simulate a crash: the edit never reaches the backend
+    fontHandler._processWritesTask.cancel()
+    fontHandler._watcherTask.cancel()
+    fontHandler.changeJournal.close()
+    backend.close()
+    await asyncio.sleep(0)
+
+    backend = DesignspaceBackend.fromPath(testFontPath)
+    fontHandler = FontHandler(backend, changeJournal=ChangeJournal(journalPath))
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        [entry] = fontHandler.changeJournal.getUnacknowledgedEntries()
+        assert entry["change"] == change
+        assert entry["rollbackChange"] == rollbackChange
+        await fontHandler.finishWriting()
+        assert fontHandler.changeJournal.getUnacknowledgedEntries() == []
+
+        glyph = await backend.getGlyph("A")
+        layer = glyph.layers[layerName]
+        assert [123, 456] == layer.glyph.path.coordinates[:2].tolist()
+
+        # Restore the session test font
+        await fontHandler.editFinal(
+            rollbackChange, change, "Test edit", False, connection=None
+        )
+        await fontHandler.finishWriting()
+
+    assert journalPath.read_bytes() == b""
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_changeJournal_partiallyWritten(testFontPath, tmp_path):
+    journalPath = tmp_path / "journal.jsonl"
+    backend = DesignspaceBackend.fromPath(testFontPath)
+    glyphs = {glyphName: await backend.getGlyph(glyphName) for glyphName in "AB"}
+    numPoints = {}
+    changes = []
+    rollbackChanges = []
+    for glyphName, glyph in glyphs.items():
+        layerName, layer = firstLayerItem(glyph)
+        numPoints[glyphName] = len(layer.glyph.path.pointTypes)
+        path = [glyphName, "layers", layerName, "glyph", "path"]
+        changes.append({"p": path, "f": "insertPoint", "a": [0, 0, {"x": 1, "y": 2}]})
+        rollbackChanges.append({"p": path, "f": "deletePoint", "a": [0, 0]})
+    # A change that can't be applied twice
+    change = {"p": ["glyphs"], "c": changes}
+    rollbackChange = {"p": ["glyphs"], "c": rollbackChanges}
+
+    # Simulate a crash after only glyph A was written
+    journal = ChangeJournal(journalPath)
+    entryID = await journal.addEntry(change, rollbackChange, "Test edit")
+    applyChange({"A": glyphs["A"]}, changes[0])
+    await backend.putGlyph("A", glyphs["A"], [ord("A")])
+    await journal.acknowledge([], {entryID: [["glyphs", "A"]]})
+    journal.close()
+    backend.close()
+
+    backend = DesignspaceBackend.fromPath(testFontPath)
+    fontHandler = FontHandler(backend, changeJournal=ChangeJournal(journalPath))
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        await fontHandler.finishWriting()
+        assert fontHandler.changeJournal.getUnacknowledgedEntries() == []
+        for glyphName in "AB":
+            glyph = await backend.getGlyph(glyphName)
+            layerName, layer = firstLayerItem(glyph)
+            assert numPoints[glyphName] + 1 == len(layer.glyph.path.pointTypes)
+
+        # Restore the session test font
+        await fontHandler.editFinal(
+            rollbackChange, change, "Test edit", False, connection=None
+        )
+        await fontHandler.finishWriting()
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_changeJournal_replayWriteError(
+    testFontPath, tmp_path, monkeypatch
+):
+    journalPath = tmp_path / "journal.jsonl"
+    journal = ChangeJournal(journalPath)
+    change = {"p": ["glyphs", "A"], "f": "=", "a": ["name", "A"]}
+    await journal.addEntry(change, change, "Test edit")
+    journal.close()
+
+    backend = DesignspaceBackend.fromPath(testFontPath)
+
+    async def failingPutGlyph(*args):
+        raise ValueError("can't write")
+
+    monkeypatch.setattr(backend, "putGlyph", failingPutGlyph)
+    monkeypatch.delattr(type(backend), "putGlyphs")
+    fontHandler = FontHandler(backend, changeJournal=ChangeJournal(journalPath))
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        # The write error is logged: there is no connection to report it to,
+        # but the writer must keep running
+        await fontHandler.finishWriting()
+        assert not fontHandler._processWritesTask.done()
+        assert fontHandler.changeJournal.getUnacknowledgedEntries() == []
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_sharedLoads(testFontHandler, monkeypatch):
+    backend = testFontHandler.backend
+    backendCalls = []
+
+    def makeSpy(method):
+        async def spy(*args):
+            backendCalls.append((method.__name__, *args))
+            return await method(*args)
+
+        return spy
+
+    for methodName in ["getGlyph", "getGlyphMap"]:
+        monkeypatch.setattr(backend, methodName, makeSpy(getattr(backend, methodName)))
+
+    async with asyncClosing(testFontHandler):
+        results = await asyncio.gather(
+            testFontHandler.getGlyph("A", connection=None),
+            testFontHandler.getGlyph("A", connection=None),
+            testFontHandler.getGlyphs(["A", "B"], connection=None),
+            testFontHandler.getData("glyphMap"),
+            testFontHandler.getData("glyphMap"),
+        )
+        assert results[0] is results[1]
+        assert results[0] is results[2]["A"]
+        assert results[3] is results[4]
+        assert [
+            ("getGlyph", "A"),
+            ("getGlyph", "B"),
+            ("getGlyphMap",),
+        ] == sorted(backendCalls)
+        assert not testFontHandler._loadingTasks
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_reloadDuringLoad(testFontHandler, monkeypatch):
+    backend = testFontHandler.backend
+    originalGetGlyph = backend.getGlyph
+    loadStarted = asyncio.Event()
+    finishLoad = asyncio.Event()
+    numCalls = 0
+
+    async def slowGetGlyph(glyphName):
+        nonlocal numCalls
+        numCalls += 1
+        glyph = await originalGetGlyph(glyphName)
+        if numCalls == 1:
+            # The glyph changes on disk while it is being loaded
+            loadStarted.set()
+            await finishLoad.wait()
+            glyph.name = "stale"
+        return glyph
+
+    monkeypatch.setattr(backend, "getGlyph", slowGetGlyph)
+
+    async with asyncClosing(testFontHandler):
+        staleTask = asyncio.create_task(testFontHandler.getGlyph("A", connection=None))
+        await asyncio.wait_for(loadStarted.wait(), 1)
+        await testFontHandler.reloadData({"glyphs": {"A": None}})
+        glyph = await testFontHandler.getGlyph("A", connection=None)
+        assert "A" == glyph.name
+        finishLoad.set()
+        assert "stale" == (await staleTask).name
+        # The stale result of the old load must not replace the reloaded glyph
+        glyph = await testFontHandler.getGlyph("A", connection=None)
+        assert "A" == glyph.name
+        assert 2 == numCalls
+
+
+class BlockingClientProxy:
+    def __init__(self):
+        self.receivedChanges = []
+        self.unblock = asyncio.Event()
+        self.sending = asyncio.Event()
+
+    async def externalChange(self, change):
+        self.sending.set()
+        await self.unblock.wait()
+        if isinstance(change, PreEncodedJSON):
+            change = json.loads(change.text)
+        self.receivedChanges.append(change)
+
+
+class MockConnection:
+    def __init__(self, clientUUID, proxy=None):
+        self.clientUUID = clientUUID
+        if proxy is None:
+            proxy = BlockingClientProxy()
+        self.proxy = self.droppableProxy = proxy
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_liveChangesSlowClient(testFontHandler):
+    editingConnection = MockConnection("editing-client")
+    slowConnection = MockConnection("slow-client")
+    path = ["glyphs", "A", "layers", "default", "glyph", "path"]
+    with testFontHandler.useConnection(
+        editingConnection
+    ), testFontHandler.useConnection(slowConnection):
+        await testFontHandler.subscribeChanges(
+            ["glyphs", "A"], True, connection=slowConnection
+        )
+        for x in range(10):
+            change = {"p": path, "f": "=xy", "a": [0, x, 0]}
+            # This should not wait for the slow client
+            await asyncio.wait_for(
+                testFontHandler.editIncremental(change, connection=editingConnection),
+                1,
+            )
+        slowConnection.proxy.unblock.set()
+        await asyncio.sleep(0.01)
+    assert [
+        {"p": path, "f": "=xy", "a": [0, 0, 0]},
+        {"p": path, "f": "=xy", "a": [0, 9, 0]},
+    ] == slowConnection.proxy.receivedChanges
+    assert [] == editingConnection.proxy.receivedChanges
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_disconnectDuringFinalBroadcast(testFontHandler):
+    editingConnection = MockConnection("editing-client")
+    goneConnection = MockConnection("gone-client")
+    otherConnection = MockConnection("other-client")
+    otherConnection.proxy.unblock.set()
+    async with asyncClosing(testFontHandler):
+        await testFontHandler.startTasks()
+        glyph = await testFontHandler.getGlyph("A", connection=None)
+        layerName, layer = firstLayerItem(glyph)
+        change = {
+            "p": ["glyphs", "A", "layers", layerName, "glyph"],
+            "f": "=",
+            "a": ["xAdvance", 123],
+        }
+        with testFontHandler.useConnection(
+            editingConnection
+        ), testFontHandler.useConnection(otherConnection):
+            await testFontHandler.subscribeChanges(
+                ["glyphs", "A"], False, connection=otherConnection
+            )
+            with testFontHandler.useConnection(goneConnection):
+                await testFontHandler.subscribeChanges(
+                    ["glyphs", "A"], False, connection=goneConnection
+                )
+                editTask = asyncio.create_task(
+                    testFontHandler.editFinal(
+                        change, change, "Test edit", True, connection=editingConnection
+                    )
+                )
+                # Wait until the change is being sent to the blocked client
+                await asyncio.wait_for(goneConnection.proxy.sending.wait(), 1)
+            # The client disconnected while its change was in flight: the edit
+            # must still complete
+            await asyncio.wait_for(editTask, 1)
+    assert [change] == otherConnection.proxy.receivedChanges
+    assert [] == goneConnection.proxy.receivedChanges
+
+
+class ClosableClientProxy:
+    def __init__(self):
+        self.closed = False
+        self.reloadPatterns = []
+        self.messages = []
+
+    def _checkClosed(self):
+        if self.closed:
+            raise RemoteObjectConnectionException("connection is closed")
+
+    async def externalChange(self, change):
+        self._checkClosed()
+
+    async def reloadData(self, reloadPattern):
+        self._checkClosed()
+        self.reloadPatterns.append(reloadPattern)
+
+    async def messageFromServer(self, message, detail):
+        self._checkClosed()
+        self.messages.append(message)
+
+
+class FailingPutGlyph:
+    def __init__(self, backend):
+        self.putGlyph = backend.putGlyph
+        self.failWrites = True
+        self.writtenGlyphNames = []
+
+    async def __call__(self, glyphName, glyph, unicodes):
+        if self.failWrites:
+            raise ValueError("can't write")
+        await self.putGlyph(glyphName, glyph, unicodes)
+        self.writtenGlyphNames.append(glyphName)
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_writeErrorClosedConnection(testFontPath, monkeypatch):
+    backend = DesignspaceBackend.fromPath(testFontPath)
+    failingPutGlyph = FailingPutGlyph(backend)
+    monkeypatch.setattr(backend, "putGlyph", failingPutGlyph)
+    monkeypatch.delattr(type(backend), "putGlyphs")
+    fontHandler = FontHandler(backend, writeDelay=0)
+    closedConnection = MockConnection("closed-client", ClosableClientProxy())
+    otherConnection = MockConnection("other-client", ClosableClientProxy())
+    closedConnection.proxy.closed = True
+    change = {"p": ["glyphs", "A"], "f": "=", "a": ["name", "A"]}
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        with fontHandler.useConnection(closedConnection), fontHandler.useConnection(
+            otherConnection
+        ):
+            for connection in [closedConnection, otherConnection]:
+                await fontHandler.subscribeChanges(
+                    ["glyphs", "A"], False, connection=connection
+                )
+            await fontHandler.editFinal(
+                change, change, "Test edit", False, connection=closedConnection
+            )
+            # Reporting the error to the closed connection fails, but the
+            # writer must keep running for the other clients
+            await fontHandler.finishWriting()
+            assert not fontHandler._processWritesTask.done()
+            assert [{"glyphs": {"A": None}}] == otherConnection.proxy.reloadPatterns
+
+            failingPutGlyph.failWrites = False
+            await fontHandler.editFinal(
+                change, change, "Test edit", False, connection=otherConnection
+            )
+            await fontHandler.finishWriting()
+            assert ["A"] == failingPutGlyph.writtenGlyphNames
+
+
+@pytest.mark.asyncio
+async def test_fontHandler_disconnectBeforeDelayedWriteError(testFontPath, monkeypatch):
+    backend = DesignspaceBackend.fromPath(testFontPath)
+    failingPutGlyph = FailingPutGlyph(backend)
+    monkeypatch.setattr(backend, "putGlyph", failingPutGlyph)
+    monkeypatch.delattr(type(backend), "putGlyphs")
+    fontHandler = FontHandler(backend, writeDelay=0.05, maxWriteLatency=1)
+    connection = MockConnection("leaving-client", ClosableClientProxy())
+    change = {"p": ["glyphs", "A"], "f": "=", "a": ["name", "A"]}
+    async with asyncClosing(fontHandler):
+        await fontHandler.startTasks()
+        with fontHandler.useConnection(connection):
+            await fontHandler.subscribeChanges(
+                ["glyphs", "A"], False, connection=connection
+            )
+            await fontHandler.editFinal(
+                change, change, "Test edit", False, connection=connection
+            )
+            assert ("glyphs", "A") in fontHandler._dataScheduledForWriting
+        # The client disconnects while the write is delayed, then the write
+        # fails
+        connection.proxy.closed = True
+        await asyncio.sleep(0.3)
+        assert not fontHandler._dataScheduledForWriting
+        assert not fontHandler._processWritesTask.done()
+        assert [] == connection.proxy.messages
+
+        failingPutGlyph.failWrites = False
+        await fontHandler.editFinal(change, change, "Test edit", False, connection=None)
+        await fontHandler.finishWriting()
+        assert ["A"] == failingPutGlyph.writtenGlyphNames
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from fontra.core.journal import ChangeJournal
+
+
+def makeChange(value):
+    return {"p": ["glyphs", "A"], "f": "=", "a": ["xAdvance", value]}
+
+
+@pytest.mark.asyncio
+async def test_changeJournal(tmp_path):
+    journalPath = tmp_path / "journal" / "journal.jsonl"
+    journal = ChangeJournal(journalPath)
+    assert journal.getUnacknowledgedEntries() == []
+
+    entryIDs = await asyncio.gather(
+        *[journal.addEntry(makeChange(i), makeChange(0), "edit") for i in range(3)]
+    )
+    assert entryIDs == [1, 2, 3]
+    await journal.acknowledge([2])
+    journal.close()
+
+    journal = ChangeJournal(journalPath)
+    assert journal.getUnacknowledgedEntries() == [
+        dict(
+            id=i,
+            change=makeChange(i - 1),
+            rollbackChange=makeChange(0),
+            editLabel="edit",
+            writtenPaths=[],
+        )
+        for i in [1, 3]
+    ]
+    # Entry IDs are not reused
+    assert await journal.addEntry(makeChange(4), makeChange(0), "edit") == 4
+
+    # Once everything is acknowledged, the file is emptied
+    await journal.acknowledge([1, 3, 4])
+    assert journalPath.read_bytes() == b""
+    journal.close()
+
+
+@pytest.mark.asyncio
+async def test_changeJournal_compact(tmp_path):
+    journalPath = tmp_path / "journal.jsonl"
+    journal = ChangeJournal(journalPath, compactThreshold=10)
+    firstEntryID = await journal.addEntry(makeChange(0), makeChange(0), "edit")
+    for i in range(20):
+        entryID = await journal.addEntry(makeChange(i), makeChange(0), "edit")
+        await journal.acknowledge([entryID])
+    # Only the unacknowledged entry and a few acknowledged ones are left
+    assert len(journalPath.read_bytes().splitlines()) < 20
+    journal.close()
+
+    journal = ChangeJournal(journalPath)
+    assert [entry["id"] for entry in journal.getUnacknowledgedEntries()] == [
+        firstEntryID
+    ]
+    journal.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("compactThreshold", [1, 10])
+async def test_changeJournal_writtenPaths(tmp_path, compactThreshold):
+    journalPath = tmp_path / "journal.jsonl"
+    journal = ChangeJournal(journalPath, compactThreshold=compactThreshold)
+    entryIDs = [
+        await journal.addEntry(makeChange(i), makeChange(0), "edit") for i in range(3)
+    ]
+    await journal.acknowledge([], {entryIDs[0]: [["glyphs", "A"]]})
+    await journal.acknowledge(
+        [entryIDs[1]], {entryIDs[0]: [["glyphMap"]], entryIDs[1]: [["glyphs", "B"]]}
+    )
+    journal.close()
+
+    # The written paths survive a restart, also when the file was compacted
+    journal = ChangeJournal(journalPath)
+    assert [
+        (entryIDs[0], [["glyphs", "A"], ["glyphMap"]]),
+        (entryIDs[2], []),
+    ] == [
+        (entry["id"], entry["writtenPaths"])
+        for entry in journal.getUnacknowledgedEntries()
+    ]
+    await journal.acknowledge([entryIDs[0], entryIDs[2]])
+    assert journalPath.read_bytes() == b""
+    journal.close()
+
+
+@pytest.mark.asyncio
+async def test_changeJournal_incompleteLine(tmp_path):
+    journalPath = tmp_path / "journal.jsonl"
+    journal = ChangeJournal(journalPath)
+    await journal.addEntry(makeChange(1), makeChange(0), "edit")
+    journal.close()
+
+    # Simulate a crash while writing the next line
+    with open(journalPath, "ab") as f:
+        f.write(b'{"id":2,"change":{"p":')
+
+    journal = ChangeJournal(journalPath)
+    assert [entry["id"] for entry in journal.getUnacknowledgedEntries()] == [1]
+    await journal.addEntry(makeChange(2), makeChange(0), "edit")
+    journal.close()
+
+    journal = ChangeJournal(journalPath)
+    assert [entry["id"] for entry in journal.getUnacknowledgedEntries()] == [1, 2]
+    journal.close()
@@ -1,4 +1,4 @@
-from fontra.core.lrucache import LRUCache
+from fontra.core.lrucache import CacheBudget, LRUCache, SizedLRUCache
 
 
 def test_lruCache():
@@ -19,3 +19,82 @@ def test_lruCache():
     _ = cache["a"]
     cache["f"] = None
     assert ["c", "e", "a", "f"] == list(cache.keys())
+
+
+def test_sizedLRUCache():
+    cache = SizedLRUCache(10, lambda key, value: value)
+    cache["a"] = 3
+    cache["b"] = 3
+    cache["c"] = 3
+    assert ["a", "b", "c"] == list(cache.keys())
+    assert 9 == cache.totalBytes
+    _ = cache["a"]
+    cache["d"] = 2
+    assert ["c", "a", "d"] == list(cache.keys())
+    assert 8 == cache.totalBytes
+    cache["c"] = 5
+    assert ["a", "d", "c"] == list(cache.keys())
+    assert 10 == cache.totalBytes
+    assert 5 == cache.pop("c")
+    assert 5 == cache.totalBytes
+    del cache["a"]
+    assert ["d"] == list(cache.keys())
+    assert 2 == cache.totalBytes
+
+
+def test_sizedLRUCache_dictMethods():
+    budget = CacheBudget(100)
+    cache = SizedLRUCache(10, lambda key, value: value, budget)
+    assert 3 == cache.setdefault("a", 3)
+    assert 3 == cache.setdefault("a", 4)
+    cache.update({"b": 2}, c=4)
+    assert ["a", "b", "c"] == list(cache.keys())
+    assert 9 == cache.totalBytes
+    cache.update(d=5)
+    # The size limit holds for update() too
+    assert ["c", "d"] == list(cache.keys())
+    assert 9 == cache.totalBytes
+    # popitem() removes the least recently used item
+    assert ("c", 4) == cache.popitem()
+    assert [("d", 5)] == list(cache.items())
+    assert 5 == cache.totalBytes == budget.totalBytes
+
+
+def test_sizedLRUCache_statistics():
+    cache = SizedLRUCache(10, lambda key, value: value)
+    cache["a"] = 6
+    assert 6 == cache.get("a")
+    assert None is cache.get("b")
+    cache["b"] = 6
+    assert None is cache.get("a")
+    statistics = cache.getStatistics()
+    assert {
+        "numItems": 1,
+        "totalBytes": 6,
+        "maxBytes": 10,
+        "hits": 1,
+        "misses": 2,
+        "evictions": 1,
+    } == statistics
+
+
+def test_cacheBudget():
+    budget = CacheBudget(10)
+    sizeFunc = lambda key, value: value  # noqa: E731
+    cacheA = SizedLRUCache(8, sizeFunc, budget)
+    cacheB = SizedLRUCache(8, sizeFunc, budget)
+    cacheA["a1"] = 3
+    cacheA["a2"] = 3
+    cacheB["b1"] = 2
+    assert 8 == budget.totalBytes
+    cacheB["b2"] = 3
+    # cacheA is the largest, its oldest item gets evicted
+    assert ["a2"] == list(cacheA.keys())
+    assert ["b1", "b2"] == list(cacheB.keys())
+    assert 8 == budget.totalBytes
+    cacheB["b3"] = 4
+    assert ["a2"] == list(cacheA.keys())
+    assert ["b2", "b3"] == list(cacheB.keys())
+    assert 10 == budget.totalBytes
+    assert 1 == cacheA.evictions
+    assert 1 == cacheB.evictions
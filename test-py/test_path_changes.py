@@ -1,10 +1,21 @@
 import json
 import pathlib
+import pickle
+import random
+from copy import deepcopy
+from dataclasses import asdict, fields
 
 import pytest
+from fontTools.pens.recordingPen import RecordingPointPen
 
 from fontra.core.changes import applyChange
-from fontra.core.packedpath import PackedPath
+from fontra.core.classes import unstructure
+from fontra.core.packedpath import (
+    ContourInfo,
+    PackedPath,
+    packedPathToBinaryDict,
+    packedPathToDict,
+)
 
 testDataPath = (
     pathlib.Path(__file__).parent.parent / "test-common" / "path-change-test-data.json"
@@ -32,3 +43,166 @@ def test_applyChange(testName, inputPathName, change, expectedData):
     subject = PackedPath.fromUnpackedContours(pathChangeTestInputData[inputPathName])
     applyChange(subject, change)
     assert subject == expectedData
+
+
+def makeRandomPoints(rng, x):
+    return [dict(x=x, y=rng.randrange(100)) for i in range(rng.randrange(5))]
+
+
+def packContours(contours):
+    return PackedPath.fromUnpackedContours(
+        [dict(points=points, isClosed=True) for points in contours]
+    )
+
+
+@pytest.mark.parametrize("numContours", [0, 3, 30, 300])
+@pytest.mark.parametrize("seed", range(4))
+def test_insertAndDeleteEndPoints(numContours, seed):
+    # The end points of the contours following an edit are updated lazily:
+    # compare with a path that is rebuilt from scratch after each edit
+    rng = random.Random(seed)
+    contours = [makeRandomPoints(rng, i) for i in range(numContours)]
+    path = packContours(contours)
+    for i in range(300):
+        if not contours or rng.random() < 0.2:
+            edit = "insertContour"
+        else:
+            edit = rng.choice(["insertPoint", "deletePoint", "deleteContour"])
+        contourIndex = rng.randrange(len(contours) + (edit == "insertContour"))
+        if edit == "insertContour":
+            points = makeRandomPoints(rng, -i)
+            contours.insert(contourIndex, points)
+            newPath = packContours([points])
+            contour = dict(
+                coordinates=list(newPath.coordinates),
+                pointTypes=list(newPath.pointTypes),
+                isClosed=True,
+            )
+            path.insertContour(contourIndex, contour)
+        elif edit == "deleteContour":
+            del contours[contourIndex]
+            path.deleteContour(contourIndex)
+        elif edit == "insertPoint":
+            contourPointIndex = rng.randrange(len(contours[contourIndex]) + 1)
+            point = dict(x=i, y=-i)
+            contours[contourIndex].insert(contourPointIndex, point)
+            path.insertPoint(contourIndex, contourPointIndex, point)
+        elif contours[contourIndex]:
+            contourPointIndex = rng.randrange(len(contours[contourIndex]))
+            del contours[contourIndex][contourPointIndex]
+            path.deletePoint(contourIndex, contourPointIndex)
+        # Comparing the coordinates doesn't sync the contour info
+        assert path.coordinates == packContours(contours).coordinates
+    expectedPath = packContours(contours)
+    assert deepcopy(path) == expectedPath
+    assert path == expectedPath
+    assert path.unpackedContours() == expectedPath.unpackedContours()
+
+
+def makeEditedPath():
+    path = packContours([[dict(x=i, y=i)] * 3 for i in range(20)])
+    path.insertPoint(1, 0, dict(x=5, y=5))
+    path.deletePoint(7, 2)
+    return path
+
+
+def test_pendingEndPointShifts():
+    expectedPath = makeEditedPath()
+    assert expectedPath.contourInfo[6].endPoint == 21
+    assert expectedPath.contourInfo[7].endPoint == 23
+
+    assert makeEditedPath() == expectedPath
+    assert deepcopy(makeEditedPath()).contourInfo == expectedPath.contourInfo
+    assert makeEditedPath().unpackedContours() == expectedPath.unpackedContours()
+    assert packedPathToDict(makeEditedPath()) == packedPathToDict(expectedPath)
+    assert packedPathToBinaryDict(makeEditedPath()) == packedPathToBinaryDict(
+        expectedPath
+    )
+
+    # The pending shifts must not be applied to replaced contour info items
+    path = makeEditedPath()
+    change = {"f": "=", "a": ["contourInfo", deepcopy(expectedPath.contourInfo)]}
+    applyChange(path, change)
+    assert path == expectedPath
+    path = makeEditedPath()
+    change = {"p": [6], "f": "=", "a": ["endPoint", 21]}
+    applyChange(path, {"p": ["contourInfo"], "c": [change]})
+    assert path == expectedPath
+
+
+def test_pendingEndPointShiftsPublicAccess():
+    expectedPath = makeEditedPath()
+    expectedContourInfo = [asdict(info) for info in expectedPath.contourInfo]
+    assert "contourInfo" in [f.name for f in fields(PackedPath)]
+
+    path = makeEditedPath()
+    assert path._endPointShifts
+    assert asdict(path)["contourInfo"] == expectedContourInfo
+
+    path = makeEditedPath()
+    # The items of contourInfo are left as they are
+    contourInfo = unstructure(path)["contourInfo"]
+    assert [asdict(info) for info in contourInfo] == expectedContourInfo
+
+    path = pickle.loads(pickle.dumps(makeEditedPath()))
+    assert [asdict(info) for info in path.contourInfo] == expectedContourInfo
+    path.insertPoint(0, 0, dict(x=1, y=1))
+    assert path.contourInfo[-1].endPoint == expectedContourInfo[-1]["endPoint"] + 1
+
+
+def drawnCoordinates(path):
+    pen = RecordingPointPen()
+    path.drawPoints(pen)
+    return [
+        c for method, args, kwargs in pen.value if method == "addPoint" for c in args[0]
+    ]
+
+
+@pytest.mark.parametrize(
+    "change, expectedCoordinates",
+    [
+        (
+            {"f": "=xy", "a": [-1, 5.0, 6.0]},
+            [0.0, 1.0, 2, 3, 4, 5, 5.0, 6.0],
+        ),
+        (
+            {"f": "=xy", "a": [-4, 7, 8]},
+            [7, 8, 2, 3, 4, 5, 6, 7],
+        ),
+        (
+            {"f": "=xys", "a": [[-1, 1], [5.0, 6.0, 9, 10.0]]},
+            [0.0, 1.0, 9, 10.0, 4, 5, 5.0, 6.0],
+        ),
+        (
+            {"f": "=xys", "a": [[-4, -2], [7, 8.0, 9.0, 10]]},
+            [7, 8.0, 2, 3, 9.0, 10, 6, 7],
+        ),
+    ],
+)
+def test_setPointPositionsNegativeIndices(change, expectedCoordinates):
+    path = PackedPath(
+        [0.0, 1.0, 2, 3, 4, 5, 6, 7], [0, 0, 0, 0], [ContourInfo(3, True)]
+    )
+    applyChange(path, change)
+    coordinates = drawnCoordinates(path)
+    assert coordinates == expectedCoordinates
+    assert [type(c) for c in coordinates] == [type(c) for c in expectedCoordinates]
+    assert len(path._floatFlags) == len(path.coordinates)
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"f": "=xy", "a": [4, 0, 0]},
+        {"f": "=xy", "a": [-5, 0, 0]},
+        {"f": "=xys", "a": [[0, -5], [0, 0, 0, 0]]},
+    ],
+)
+def test_setPointPositionsOutOfBounds(change):
+    path = PackedPath(
+        [0.0, 1.0, 2, 3, 4, 5, 6, 7], [0, 0, 0, 0], [ContourInfo(3, True)]
+    )
+    with pytest.raises(IndexError):
+        applyChange(path, change)
+    assert path.coordinates.tolist() == [0, 1, 2, 3, 4, 5, 6, 7]
+    assert len(path._floatFlags) == len(path.coordinates)
@@ -1,9 +1,19 @@
+import base64
+import sys
+from array import array
+from copy import deepcopy
 from dataclasses import asdict
 
 import pytest
+from fontTools.pens.recordingPen import RecordingPointPen
 
 from fontra.core.classes import from_dict
-from fontra.core.packedpath import PackedPath, PackedPathPointPen
+from fontra.core.packedpath import (
+    PackedPath,
+    PackedPathPointPen,
+    packedPathToBinaryDict,
+    packedPathToDict,
+)
 
 pathTestData = [
     {
@@ -129,6 +139,49 @@ async def test_packedPathPointPenRoundTrip(path):
     assert asdict(path) == asdict(repackedPath)
 
 
+@pytest.mark.parametrize(
+    "segmentTypes, expectedPointTypes, expectedIsClosed",
+    [
+        ([None, None, None], [1, 1, 1], True),
+        (["line", None, None, "qcurve"], [0, 1, 1, 0], True),
+        ([None, "qcurve", None, None], [1, 0, 1, 1], True),
+        ([None, "line", None, "qcurve"], [2, 0, 1, 0], True),
+        (["move", None, None, "qcurve", None], [0, 1, 1, 0, 2], False),
+        (["move", None, "curve", None, None, "qcurve"], [0, 2, 0, 1, 1, 0], False),
+        (["curve", None, None, "line"], [0, 2, 2, 0], True),
+    ],
+)
+def test_packedPathPointPenPointTypes(
+    segmentTypes, expectedPointTypes, expectedIsClosed
+):
+    pen = PackedPathPointPen()
+    for i in range(2):
+        pen.beginPath()
+        for j, segmentType in enumerate(segmentTypes):
+            pen.addPoint((i, j), segmentType=segmentType)
+        pen.endPath()
+    path = pen.getPath()
+    assert path.pointTypes.tolist() == expectedPointTypes * 2
+    assert path.coordinates.tolist() == [
+        c for i in range(2) for j in range(len(segmentTypes)) for c in (i, j)
+    ]
+    numPoints = len(segmentTypes)
+    assert [asdict(info) for info in path.contourInfo] == [
+        {"endPoint": numPoints - 1, "isClosed": expectedIsClosed},
+        {"endPoint": 2 * numPoints - 1, "isClosed": expectedIsClosed},
+    ]
+
+
+def test_packedPathPointPenErrors():
+    pen = PackedPathPointPen()
+    pen.beginPath()
+    pen.endPath()
+    assert pen.getPath() == PackedPath()
+    pen.beginPath()
+    with pytest.raises(TypeError, match="unexpected segment type"):
+        pen.addPoint((0, 0), segmentType="bogus")
+
+
 @pytest.mark.parametrize("path", pathTestData)
 async def test_unpackPathRoundTrip(path):
     path = from_dict(PackedPath, path)
@@ -136,3 +189,114 @@ async def test_unpackPathRoundTrip(path):
     repackedPath = PackedPath.fromUnpackedContours(unpackedPath)
     assert path == repackedPath
     assert asdict(path) == asdict(repackedPath)
+
+
+@pytest.mark.parametrize("path", pathTestData)
+def test_packedPathDeepCopy(path):
+    packedPath = from_dict(PackedPath, path)
+    packedPathCopy = deepcopy(packedPath)
+    assert packedPath == packedPathCopy
+    assert packedPath.coordinates is not packedPathCopy.coordinates
+    assert packedPath.pointTypes is not packedPathCopy.pointTypes
+    for info, infoCopy in zip(packedPath.contourInfo, packedPathCopy.contourInfo):
+        assert info is not infoCopy
+
+
+@pytest.mark.parametrize("path", pathTestData)
+def test_packedPathArrays(path):
+    packedPath = from_dict(PackedPath, path)
+    assert packedPath.coordinates == array("d", path["coordinates"])
+    assert packedPath.pointTypes == array("B", path["pointTypes"])
+    assert packedPath == PackedPath(
+        path["coordinates"], path["pointTypes"], packedPath.contourInfo
+    )
+    assert from_dict(PackedPath, packedPath) is packedPath
+
+    pathDict = packedPathToDict(packedPath)
+    assert pathDict["coordinates"] == path["coordinates"]
+    assert all(type(c) is int for c in pathDict["coordinates"])
+    assert pathDict["pointTypes"] == path["pointTypes"]
+
+
+def drawnCoordinates(path):
+    pen = RecordingPointPen()
+    path.drawPoints(pen)
+    return [
+        c for method, args, kwargs in pen.value if method == "addPoint" for c in args[0]
+    ]
+
+
+def test_packedPathIntegralFloats():
+    pen = PackedPathPointPen()
+    pen.beginPath()
+    pen.addPoint((0, 0.0), segmentType="line")
+    pen.addPoint((10.5, 20), segmentType="line")
+    pen.addPoint((30.0, 40), segmentType="line")
+    pen.endPath()
+    path = pen.getPath()
+    coordinates = drawnCoordinates(path)
+    assert coordinates == [0, 0.0, 10.5, 20, 30.0, 40]
+    assert [type(c) for c in coordinates] == [int, float, float, int, float, int]
+
+    pathCopy = deepcopy(path)
+    assert drawnCoordinates(pathCopy) == coordinates
+    assert [type(c) for c in drawnCoordinates(pathCopy)] == [
+        type(c) for c in coordinates
+    ]
+
+    path.insertPoint(0, 1, dict(x=5.0, y=6))
+    path.setPointPosition(3, 30, 40.0)
+    path.deletePoint(0, 0)
+    coordinates = drawnCoordinates(path)
+    assert coordinates == [5.0, 6, 10.5, 20, 30, 40.0]
+    assert [type(c) for c in coordinates] == [float, int, float, int, int, float]
+
+    path = PackedPath.fromUnpackedContours(path.unpackedContours())
+    assert [type(c) for c in drawnCoordinates(path)] == [
+        float,
+        int,
+        float,
+        int,
+        int,
+        float,
+    ]
+
+
+def decodeTypedArray(encoded):
+    typecode = {"int16": "h", "float32": "f", "float64": "d", "uint8": "B"}[
+        encoded["type"]
+    ]
+    values = array(typecode, base64.b64decode(encoded["data"]))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+@pytest.mark.parametrize(
+    "coordinates, expectedType",
+    [
+        ([0, 0, 100, 200, -300, 32767], "int16"),
+        ([0, 0, 100, 200, -300, 32768], "float32"),
+        ([0, 0, 100, 200, -300.5, 0.25], "float32"),
+        ([0, 0, 100, 200, -300.5, 0.1], "float64"),
+        ([0, 0, 100, 200, -300.5, 2**24 + 1], "float64"),
+    ],
+)
+def test_packedPathToBinaryDict(coordinates, expectedType):
+    path = PackedPath.fromUnpackedContours(
+        [
+            dict(
+                points=[
+                    dict(x=x, y=y, type="cubic" if i == 1 else None, smooth=i == 2)
+                    for i, (x, y) in enumerate(zip(coordinates[::2], coordinates[1::2]))
+                ],
+                isClosed=True,
+            )
+        ]
+    )
+    binaryPath = packedPathToBinaryDict(path)
+    assert binaryPath["coordinates"]["type"] == expectedType
+    assert binaryPath["pointTypes"]["type"] == "uint8"
+    assert decodeTypedArray(binaryPath["coordinates"]) == coordinates
+    assert decodeTypedArray(binaryPath["pointTypes"]) == path.pointTypes.tolist()
+    assert binaryPath["contourInfo"] == path.contourInfo
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import pathlib
+from dataclasses import asdict
+
+import pytest
+
+from fontra.backends.designspace import DesignspaceBackend
+from fontra.core import remote
+from fontra.core.classes import Font, GlobalAxis, StaticGlyph
+from fontra.core.fonthandler import remoteMethod
+from fontra.core.packedpath import PackedPath, packedPathToBinaryDict
+from fontra.core.remote import (
+    PreEncodedJSON,
+    RemoteObjectConnection,
+    RemoteObjectConnectionException,
+)
+
+mutatorSansPath = (
+    pathlib.Path(__file__).resolve().parent
+    / "data"
+    / "mutatorsans"
+    / "MutatorSans.designspace"
+)
+
+encodeFuncs = [remote._encodeJSONWithJSON]
+if remote.orjson is not None:
+    encodeFuncs.append(remote._encodeJSONWithOrjson)
+
+
+def asJSONDict(obj):
+    # asdict(), with the arrays of PackedPath converted to lists, as in JSON
+    return json.loads(json.dumps(asdict(obj), default=lambda value: value.tolist()))
+
+
+class StalledWebSocket:
+    def __init__(self):
+        self.sentMessages = []
+        self.unblock = asyncio.Event()
+        self.closed = False
+
+    async def send_str(self, message):
+        await self.unblock.wait()
+        self.sentMessages.append(json.loads(message))
+
+    async def close(self):
+        self.closed = True
+
+
+def makeConnection(websocket):
+    return RemoteObjectConnection(
+        websocket, "/", None, False, dropThreshold=2, maxOutgoingQueueSize=4
+    )
+
+
+@pytest.mark.asyncio
+async def test_outgoingQueue():
+    websocket = StalledWebSocket()
+    connection = makeConnection(websocket)
+
+    # Sending doesn't wait for the client
+    for i in range(3):
+        assert await connection.sendMessage({"message": i})
+
+    # Beyond the drop threshold, droppable messages are dropped
+    assert not await connection.sendMessage({"message": "dropped"}, droppable=True)
+    assert await connection.sendMessage({"message": 3})
+    assert (
+        dict(queueDepth=4, maxQueueDepth=4, numSentMessages=0, numDroppedMessages=1)
+        == connection.getOutgoingQueueStatistics()
+    )
+
+    websocket.unblock.set()
+    await asyncio.sleep(0)
+    assert [{"message": i} for i in range(4)] == websocket.sentMessages
+    assert (
+        dict(queueDepth=0, maxQueueDepth=4, numSentMessages=4, numDroppedMessages=1)
+        == connection.getOutgoingQueueStatistics()
+    )
+    assert (
+        dict(
+            numBytesSent=sum(len(remote.encodeJSON({"message": i})) for i in range(4)),
+            numBytesReceived=0,
+        )
+        == connection.getTrafficStatistics()
+    )
+    connection._close()
+
+
+@pytest.mark.asyncio
+async def test_outgoingQueue_droppedCall():
+    websocket = StalledWebSocket()
+    connection = makeConnection(websocket)
+    for i in range(2):
+        await connection.sendMessage({"message": i})
+    # A dropped call returns None right away
+    result = await connection.droppableProxy.externalChange({"p": []})
+    assert result is None
+    assert not connection.callReturnFutures
+    connection._close()
+
+
+@pytest.mark.asyncio
+async def test_outgoingQueue_disconnectSlowClient():
+    websocket = StalledWebSocket()
+    connection = makeConnection(websocket)
+    pendingCall = asyncio.create_task(connection.proxy.reloadData({}))
+    await asyncio.sleep(0)
+    for i in range(3):
+        await connection.sendMessage({"message": i})
+
+    with pytest.raises(RemoteObjectConnectionException):
+        await connection.sendMessage({"message": "one too many"})
+    await asyncio.sleep(0)
+
+    assert websocket.closed
+    assert connection.isClosed
+    # Calls waiting for a response from the client fail
+    with pytest.raises(RemoteObjectConnectionException):
+        await pendingCall
+    with pytest.raises(RemoteObjectConnectionException):
+        await connection.sendMessage({"message": "too late"})
+
+
+@pytest.mark.asyncio
+async def test_preEncodedArguments():
+    websocket = StalledWebSocket()
+    websocket.unblock.set()
+    connection = makeConnection(websocket)
+    change = {"p": ["glyphs", "A"], "f": "=", "a": ["xAdvance", 500]}
+    encodedChange = PreEncodedJSON(change)
+    calls = [
+        asyncio.create_task(
+            connection.proxy.externalChange(encodedChange, "other argument")
+        )
+        for i in range(2)
+    ]
+    await asyncio.sleep(0.01)
+    assert [
+        {
+            "server-call-id": i,
+            "method-name": "externalChange",
+            "arguments": [change, "other argument"],
+        }
+        for i in range(2)
+    ] == websocket.sentMessages
+    connection._close()
+    for call in calls:
+        with pytest.raises(RemoteObjectConnectionException):
+            await call
+
+
+@pytest.mark.parametrize("encodeJSON", encodeFuncs)
+@pytest.mark.asyncio
+async def test_encodeJSON(encodeJSON):
+    backend = DesignspaceBackend.fromPath(mutatorSansPath)
+    try:
+        glyph = await backend.getGlyph("B")
+    finally:
+        backend.close()
+    assert json.loads(encodeJSON(glyph)) == asJSONDict(glyph)
+
+    axis = GlobalAxis(
+        name="wght",
+        label="Weight",
+        tag="wght",
+        minValue=100,
+        defaultValue=400,
+        maxValue=900,
+    )
+    font = Font(axes=[axis])
+    font._trackAssignedAttributeNames()
+    font.unitsPerEm = 2048
+    expected = {"font": asdict(font), "glyphs": [asJSONDict(glyph)], "1": None}
+    value = {"font": font, "glyphs": [glyph], 1: None}
+    assert json.loads(encodeJSON(value)) == expected
+
+    with pytest.raises(TypeError):
+        encodeJSON({"not serializable": {1, 2, 3}})
+
+
+rectangleContour = dict(
+    points=[
+        dict(x=0, y=0),
+        dict(x=0, y=100),
+        dict(x=100.5, y=100),
+        dict(x=100.5, y=0),
+    ],
+    isClosed=True,
+)
+
+
+class HandshakeMessage:
+    def __init__(self, message):
+        self.message = message
+
+    def json(self):
+        return self.message
+
+
+class HandshakeWebSocket(StalledWebSocket):
+    def __init__(self, handshakeMessage):
+        super().__init__()
+        self.handshakeMessage = handshakeMessage
+
+    async def __aiter__(self):
+        yield HandshakeMessage(self.handshakeMessage)
+
+
+class GlyphSubject:
+    def __init__(self, glyph):
+        self.glyph = glyph
+
+    @remoteMethod
+    async def getGlyph(self, *, connection):
+        return self.glyph
+
+
+@pytest.mark.parametrize("binaryPaths", [False, True])
+@pytest.mark.asyncio
+async def test_binaryPathsHandshake(binaryPaths):
+    handshakeMessage = {"client-uuid": "some-uuid"}
+    if binaryPaths:
+        handshakeMessage["path-encoding"] = "base64"
+    websocket = HandshakeWebSocket(handshakeMessage)
+    websocket.unblock.set()
+    glyph = StaticGlyph(path=PackedPath.fromUnpackedContours([rectangleContour]))
+    connection = RemoteObjectConnection(websocket, "/", GlyphSubject(glyph), False)
+    await connection.receiveClientUUID()
+    assert connection.clientUUID == "some-uuid"
+    assert connection.binaryPaths == binaryPaths
+
+    await connection._performCall(
+        {"client-call-id": 0, "method-name": "getGlyph"}, connection.subject
+    )
+    await asyncio.sleep(0.01)
+    [message] = websocket.sentMessages
+    path = message["return-value"]["path"]
+    if binaryPaths:
+        assert path == packedPathToBinaryDict(glyph.path) | {
+            "contourInfo": [asdict(info) for info in glyph.path.contourInfo]
+        }
+    else:
+        assert path == asJSONDict(glyph.path)
+
+    # Pre-encoded values must be readable by all clients
+    assert json.loads(PreEncodedJSON(glyph).text)["path"] == asJSONDict(glyph.path)
+    connection._close()
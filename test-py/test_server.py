@@ -0,0 +1,101 @@
+import logging
+
+import pytest
+from aiohttp import web
+from aiohttp.http_websocket import WebSocketWriter
+from aiohttp.test_utils import TestClient, TestServer
+
+from fontra.core import server
+from fontra.core.server import FontraWebSocketResponse, webSocketInternalsSupported
+
+smallMessage = "small message"
+largeMessage = "large message " * 1000
+
+
+async def websocketHandler(request):
+    websocket = FontraWebSocketResponse(compress=True, compressionThreshold=1024)
+    request.app["websockets"].append(websocket)
+    # Record the raw data the server sends, independently of the counters
+    transport = request.transport
+    transportWrite = transport.write
+    transport.write = lambda data: (
+        request.app["sentData"].append(bytes(data)),
+        transportWrite(data),
+    )
+    await websocket.prepare(request)
+    async for message in websocket:
+        await websocket.send_str(message.data)
+    return websocket
+
+
+@pytest.mark.parametrize("clientCompress", [0, 15])
+@pytest.mark.asyncio
+async def test_websocketCompression(clientCompress):
+    app = web.Application()
+    app["websockets"] = []
+    app["sentData"] = []
+    app.router.add_get("/websocket", websocketHandler)
+    async with TestClient(TestServer(app)) as client:
+        websocket = await client.ws_connect("/websocket", compress=clientCompress)
+        [serverWebSocket] = app["websockets"]
+
+        await websocket.send_str(smallMessage)
+        assert await websocket.receive_str() == smallMessage
+        # The small message is sent uncompressed: two bytes of frame header
+        assert serverWebSocket.numWireBytesSent == len(smallMessage) + 2
+
+        serverWebSocket.numWireBytesSent = 0
+        serverWebSocket.numWireBytesReceived = 0
+        app["sentData"].clear()
+        await websocket.send_str(largeMessage)
+        assert await websocket.receive_str() == largeMessage
+        # The large message is compressed, if the client accepted that
+        sentData = b"".join(app["sentData"])
+        # The RSV1 bit of the frame header marks a compressed frame
+        assert bool(sentData[0] & 0x40) == bool(clientCompress)
+        assert serverWebSocket.numWireBytesSent == len(sentData)
+        if clientCompress:
+            assert serverWebSocket.numWireBytesSent < len(largeMessage) / 10
+            assert serverWebSocket.numWireBytesReceived < len(largeMessage) / 10
+        else:
+            assert serverWebSocket.numWireBytesSent > len(largeMessage)
+            assert serverWebSocket.numWireBytesReceived > len(largeMessage)
+
+        # Mixing uncompressed and compressed messages works
+        for message in [smallMessage, largeMessage, smallMessage]:
+            await websocket.send_str(message)
+            assert await websocket.receive_str() == message
+        await websocket.close()
+
+
+def test_webSocketInternalsSupported(monkeypatch, caplog):
+    assert webSocketInternalsSupported()
+
+    # Pretend to run on an aiohttp version with different internals
+    webSocketInternalsSupported.cache_clear()
+    monkeypatch.delattr(WebSocketWriter, "_send_frame")
+    try:
+        with caplog.at_level(logging.WARNING):
+            assert not webSocketInternalsSupported()
+        assert "WebSocketWriter._send_frame" in caplog.text
+    finally:
+        webSocketInternalsSupported.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_websocketCompression_unsupported(monkeypatch):
+    # The websocket still works, with aiohttp's own compression, and the byte
+    # counters are None rather than 0
+    monkeypatch.setattr(server, "webSocketInternalsSupported", lambda: False)
+    app = web.Application()
+    app["websockets"] = []
+    app["sentData"] = []
+    app.router.add_get("/websocket", websocketHandler)
+    async with TestClient(TestServer(app)) as client:
+        websocket = await client.ws_connect("/websocket", compress=15)
+        [serverWebSocket] = app["websockets"]
+        await websocket.send_str(smallMessage)
+        assert await websocket.receive_str() == smallMessage
+        assert serverWebSocket.numWireBytesSent is None
+        assert serverWebSocket.numWireBytesReceived is None
+        await websocket.close()